@@ -175,8 +175,11 @@ def setup_background_jobs():
         Update if a club is open for applying or recruiting.
         """
         right_now_dt = pst_right_now()
+        any_status_changed = False
 
         for officer_user in NewOfficerUser.objects:
+            previous_new_members = officer_user.club.new_members
+
             if officer_user.club.app_required and officer_user.club.apply_deadline_start and officer_user.club.apply_deadline_end:
                 apply_deadline_in_range = officer_user.club.apply_deadline_start < right_now_dt and officer_user.club.apply_deadline_end > right_now_dt
                 officer_user.club.new_members = apply_deadline_in_range
@@ -186,15 +189,29 @@ def setup_background_jobs():
                 officer_user.club.new_members = recruiting_period_in_range
                 officer_user.save()
 
+            any_status_changed = any_status_changed or officer_user.club.new_members != previous_new_members
+
+        # The statuses are part of the catalog, so it has to be rebuilt if any of them changed
+        if any_status_changed:
+            flask_exts.catalog_snapshot.invalidate()
+
+    def update_club_recommender_model():
+        """
+        Incrementally update the similar clubs recommender model with the clubs that changed since it was built.
+        This runs in a separate process, so that it doesn't slow down the requests being served.
+        """
+        flask_exts.club_recommender.train_in_subprocess('incremental')
+
     def retrain_club_recommender_model():
         """
-        Retrain the similar clubs recommender model.
+        Fully retrain the similar clubs recommender model, including the word embeddings, in a separate process.
         """
-        flask_exts.club_recommender.train_or_load_model(force_train=True)
+        flask_exts.club_recommender.train_in_subprocess('full')
 
 
     job = scheduler.add_job(update_apply_required_or_recruiting_statuses, 'cron', minute='*/1')
-    job = scheduler.add_job(retrain_club_recommender_model, 'cron', hour='*/4')
+    job = scheduler.add_job(update_club_recommender_model, 'cron', minute='*/15')
+    job = scheduler.add_job(retrain_club_recommender_model, 'cron', hour='4')
     scheduler.start()
 
     # Register a shutdown handler to gracefully terminate and running jobs.
@@ -35,6 +35,7 @@ class BaseConfig(object):
     SECRET_KEY = os.getenv('SECRET_KEY')
     FLASK_SECRET = os.getenv('SECRET_KEY')
     JSON_ADD_STATUS = False
+    JSON_ENCODER_BACKEND = os.getenv('JSON_ENCODER_BACKEND', 'auto') # 'auto', 'orjson' or 'stdlib'
     CORS_HEADERS = '*' # TODO: [Security] - Tweak headers "specifically"
     UPLOAD_FOLDER = 'uploads'
     ALLOWED_IMG_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
@@ -72,6 +73,16 @@ class BaseConfig(object):
     GOOGLE_OAUTH_CLIENT_ID     = os.getenv('GOOGLE_OAUTH_CLIENT_ID')
     GOOGLE_OAUTH_CLIENT_SECRET = os.getenv('GOOGLE_OAUTH_CLIENT_SECRET')
 
+    # Similar clubs recommender settings
+    RECOMMENDER_TRAINING_WORKERS = int(os.getenv('RECOMMENDER_TRAINING_WORKERS', '1'))
+
+    # Catalog settings
+    CATALOG_SNAPSHOT_MAX_AGE = datetime.timedelta(seconds=int(os.getenv('CATALOG_SNAPSHOT_MAX_AGE', '60')))
+
+    # HTTP caching settings, for how long the rarely changing metadata (e.g tags and majors) is reused by the app
+    # and by browsers and CDNs
+    METADATA_CACHE_MAX_AGE = datetime.timedelta(seconds=int(os.getenv('METADATA_CACHE_MAX_AGE', '300')))
+
 """
 README: If you want to add a new configuration environment, add a new class like the examples below.
 """
@@ -0,0 +1,169 @@
+"""
+This file is a CLI script to benchmark offset pagination against cursor (keyset) pagination of the organizations
+catalog, at increasing page depths. It measures both:
+
+* MongoDB queries, if a MongoDB server is given ('--mongo-uri'): 'skip'/'limit' over the clubs sorted by name
+  (plus the count that was run for every page) against resuming from the last page's name and ID, with the
+  'club-name-and-id' index (see 'db_admin/db_indices.py'). The clubs are inserted into a scratch database, which
+  is dropped afterwards. With offsets, the server walks all the skipped entries, so pages get slower with depth,
+  while with cursors every page is a single index seek.
+* The in-memory catalog snapshot (see 'flask_utils/catalog_snapshot.py'), where offsets are list slicing and
+  cursors are found by binary search, so both stay flat.
+
+To use it, run the command 'python -m benchmarks.catalog_pagination [--mongo-uri mongodb://localhost:27017]' from
+the root of the project.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pymongo
+
+from flask_utils.catalog_snapshot import CatalogSnapshot
+
+SCRATCH_DATABASE_NAME = 'catalog-pagination-benchmark'
+CATALOG_QUERY = {'role': 'officer', 'confirmed': True, 'club.reactivated': True}
+CATALOG_PROJECTION = {'club.name': 1, 'club.link_name': 1, 'club.about_us': 1, 'club.tags': 1}
+
+
+def generate_users(num_clubs, seed = 42):
+    """
+    Generates the officer user documents of clubs with random names (some of them shared, to exercise the ties).
+    """
+
+    rng = np.random.default_rng(seed)
+    names = [f'Club {name_id:06d}' for name_id in rng.integers(0, num_clubs // 2 + 1, size=num_clubs)]
+
+    return [{
+        'role': 'officer',
+        'confirmed': True,
+        'club': {
+            'name': name,
+            'link_name': f'club-{i}',
+            'about_us': 'We are a club at UC Berkeley.',
+            'tags': [int(tag) for tag in rng.choice(40, size=2, replace=False)],
+            'reactivated': True,
+        },
+    } for (i, name) in enumerate(names)]
+
+
+def _time_ms(func, num_repeats):
+    func()
+
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        func()
+
+    return (time.perf_counter() - start) * 1000 / num_repeats
+
+
+def mongo_offset_page(collection, skip, limit):
+    cursor = collection.find(CATALOG_QUERY, CATALOG_PROJECTION).sort([('club.name', 1), ('_id', 1)]).skip(skip).limit(limit)
+    return list(cursor), collection.count_documents(CATALOG_QUERY)
+
+
+def mongo_keyset_page(collection, after, limit):
+    """
+    Fetches the page of clubs right after the given (name, ID) sort key, or the first page if it's None.
+    """
+
+    query = dict(CATALOG_QUERY)
+    if after is not None:
+        query['$or'] = [
+            {'club.name': {'$gt': after[0]}},
+            {'club.name': after[0], '_id': {'$gt': after[1]}},
+        ]
+
+    return list(collection.find(query, CATALOG_PROJECTION).sort([('club.name', 1), ('_id', 1)]).limit(limit))
+
+
+def benchmark_mongo(mongo_uri, num_clubs, depths, limit, num_repeats):
+    mongo_client = pymongo.MongoClient(mongo_uri)
+    collection = mongo_client[SCRATCH_DATABASE_NAME]['new_base_user']
+
+    try:
+        collection.drop()
+        collection.insert_many(generate_users(num_clubs))
+        collection.create_index([('club.name', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)], name='club-name-and-id')
+
+        # The sort keys of every club, to start the keyset pages from the same clubs as the offset pages
+        sort_keys = [
+            (user['club']['name'], user['_id'])
+            for user in collection.find(CATALOG_QUERY, {'club.name': 1}).sort([('club.name', 1), ('_id', 1)])
+        ]
+
+        results = []
+        for depth in depths:
+            after = sort_keys[depth - 1] if depth > 0 else None
+
+            assert [user['_id'] for user in mongo_offset_page(collection, depth, limit)[0]] \
+                == [user['_id'] for user in mongo_keyset_page(collection, after, limit)]
+
+            results += [{
+                'depth': depth,
+                'offset_ms': _time_ms(lambda: mongo_offset_page(collection, depth, limit), num_repeats),
+                'cursor_ms': _time_ms(lambda: mongo_keyset_page(collection, after, limit), num_repeats),
+            }]
+
+        return results
+    finally:
+        mongo_client.drop_database(SCRATCH_DATABASE_NAME)
+        mongo_client.close()
+
+
+class _GeneratedCatalogSnapshot(CatalogSnapshot):
+    """
+    A catalog snapshot of generated clubs, instead of the ones in the database.
+    """
+
+    def __init__(self, users):
+        super().__init__()
+
+        self.users = sorted(users, key=lambda user: (user['club']['name'], user['club']['link_name']))
+
+
+    def _fetch_clubs(self):
+        return [user['club'] for user in self.users], [(user['club']['name'], user['club']['link_name']) for user in self.users]
+
+
+def benchmark_snapshot(num_clubs, depths, limit, num_repeats):
+    catalog_snapshot = _GeneratedCatalogSnapshot(generate_users(num_clubs))
+
+    results = []
+    for depth in depths:
+        _, _, cursor = catalog_snapshot.page(0, depth) if depth > 0 else (None, None, None)
+
+        assert catalog_snapshot.page(depth, limit)[0] == catalog_snapshot.page_after(cursor, limit)[0]
+
+        results += [{
+            'depth': depth,
+            'offset_ms': _time_ms(lambda: catalog_snapshot.page(depth, limit), num_repeats),
+            'cursor_ms': _time_ms(lambda: catalog_snapshot.page_after(cursor, limit), num_repeats),
+        }]
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark offset against cursor pagination of the catalog')
+    parser.add_argument('--mongo-uri', default=None, help='A MongoDB server to benchmark the queries on')
+    parser.add_argument('--clubs', type=int, default=50000)
+    parser.add_argument('--depths', type=int, nargs='+', default=[0, 1000, 5000, 20000, 45000])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    depths = [depth for depth in args.depths if depth < args.clubs]
+
+    benchmarks = [('snapshot', benchmark_snapshot(args.clubs, depths, args.limit, args.repeats))]
+    if args.mongo_uri is not None:
+        benchmarks += [('mongodb', benchmark_mongo(args.mongo_uri, args.clubs, depths, args.limit, args.repeats))]
+    else:
+        print('No MongoDB server given (--mongo-uri), so only the snapshot is benchmarked\n')
+
+    print(f"{'source':<10} {'depth':>8} {'offset (ms)':>12} {'cursor (ms)':>12}")
+
+    for (source, results) in benchmarks:
+        for result in results:
+            print(f"{source:<10} {result['depth']:>8} {result['offset_ms']:>12.3f} {result['cursor_ms']:>12.3f}")
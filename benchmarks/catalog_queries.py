@@ -0,0 +1,124 @@
+"""
+This file is a CLI script to benchmark the read-only catalog queries (see 'flask_utils/catalog_queries.py'), which
+read raw documents straight from pymongo, against reading the same clubs through mongoengine the way the catalog
+used to: by loading the officer's document for a club's page, and by serializing the query with
+'mongoengine_goodjson' and parsing it back for the catalog. It checks that both give the exact same output, and
+reports how many documents per second each one reads for:
+
+* A club's page, i.e fetching a single club with all of its information by link name.
+* The catalog, i.e the catalog info of every club.
+
+It needs a MongoDB server ('--mongo-uri'). The clubs (see 'benchmarks/query_objects.py') are inserted into a
+scratch database, which is dropped afterwards.
+
+To use it, run the command 'python -m benchmarks.catalog_queries --mongo-uri mongodb://localhost:27017' from the
+root of the project.
+"""
+
+import argparse
+import json
+import time
+
+import mongoengine as mongo
+
+from models import NewOfficerUser
+from flask_utils.mongo_objects import query_to_objects
+from flask_utils.catalog_queries import CATALOG_VIEW_FIELDS, fetch_catalog_clubs, fetch_catalog_club
+from benchmarks.query_objects import TAGS, NUM_USERS_TAGS, generate_officer
+
+SCRATCH_DATABASE_NAME = 'catalog-queries-benchmark'
+
+
+def mongoengine_catalog_club(link_name):
+    """
+    Fetches a club's page the way it used to be, by loading its officer's document.
+    """
+
+    user = NewOfficerUser.objects(club__link_name=link_name, confirmed=True, club__reactivated=True).first()
+    return query_to_objects(user.club) if user is not None else None
+
+
+def mongoengine_catalog_clubs():
+    """
+    Fetches the catalog the way it used to be, by serializing the query with 'mongoengine_goodjson' and parsing it
+    back.
+    """
+
+    query = NewOfficerUser.objects \
+        .filter(confirmed=True) \
+        .filter(club__reactivated=True) \
+        .only(*CATALOG_VIEW_FIELDS) \
+        .order_by('club.name', 'id')
+
+    objs = json.loads(query.to_json())
+    return [obj['club'] for obj in objs], [(obj['club']['name'], obj['id']) for obj in objs]
+
+
+def _docs_per_sec(func, num_docs, num_repeats):
+    func()
+
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        func()
+
+    return num_docs * num_repeats / (time.perf_counter() - start)
+
+
+def _benchmark(name, mongoengine_func, raw_func, num_docs, num_repeats):
+    assert json.dumps(mongoengine_func()) == json.dumps(raw_func()), f'The outputs of "{name}" differ'
+
+    return {
+        'name': name,
+        'mongoengine_docs_per_sec': _docs_per_sec(mongoengine_func, num_docs, num_repeats),
+        'raw_docs_per_sec': _docs_per_sec(raw_func, num_docs, num_repeats),
+    }
+
+
+def benchmark(mongo_uri, num_clubs, num_lookups, num_repeats):
+    mongo.connect(SCRATCH_DATABASE_NAME, host=mongo_uri, alias='default')
+
+    try:
+        for tag in TAGS + NUM_USERS_TAGS:
+            tag.save()
+
+        NewOfficerUser.objects.insert([generate_officer(i) for i in range(num_clubs)], load_bulk=False)
+        NewOfficerUser._get_collection().create_index('club.link_name')
+
+        link_names = [f'club-{i * num_clubs // num_lookups}' for i in range(num_lookups)]
+
+        return [
+            _benchmark(
+                'club page',
+                lambda: [mongoengine_catalog_club(link_name) for link_name in link_names],
+                lambda: [fetch_catalog_club(link_name) for link_name in link_names],
+                num_lookups,
+                num_repeats
+            ),
+            _benchmark(
+                f'catalog ({num_clubs} clubs)',
+                mongoengine_catalog_clubs,
+                fetch_catalog_clubs,
+                num_clubs,
+                num_repeats
+            ),
+        ]
+    finally:
+        mongo.get_connection().drop_database(SCRATCH_DATABASE_NAME)
+        mongo.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the raw catalog queries against mongoengine documents')
+    parser.add_argument('--mongo-uri', default='mongodb://localhost:27017', help='The MongoDB server to benchmark on')
+    parser.add_argument('--clubs', type=int, default=1000)
+    parser.add_argument('--lookups', type=int, default=100)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    results = benchmark(args.mongo_uri, args.clubs, min(args.lookups, args.clubs), args.repeats)
+
+    print(f"{'query':<24} {'mongoengine (docs/sec)':>23} {'raw (docs/sec)':>15} {'speedup':>8}")
+
+    for result in results:
+        speedup = result['raw_docs_per_sec'] / result['mongoengine_docs_per_sec']
+        print(f"{result['name']:<24} {result['mongoengine_docs_per_sec']:>23.0f} {result['raw_docs_per_sec']:>15.0f} {speedup:>7.1f}x")
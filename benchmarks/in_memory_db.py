@@ -0,0 +1,168 @@
+"""
+This file contains a minimal in-memory stand-in for a pymongo database, so that the benchmarks can run the real
+data access code without a live MongoDB server. It only supports what the app's queries use:
+
+* Filters with dotted field paths, matched either by equality (including matching an element of a list) or with
+  the '$in', '$gt', '$gte', '$lt', '$lte' and '$ne' operators
+* Inclusion projections with dotted field paths (and '_id': 0)
+* Cursors with 'sort', 'skip' and 'limit'
+
+Example:
+
+db = InMemoryDatabase()
+db['new_base_user'].insert_many(users)
+
+for user in db['new_base_user'].find({'role': 'officer'}, {'club.name': 1}).sort('club.name').limit(10):
+    ...
+"""
+
+import copy
+
+import bson
+
+_MISSING = object()
+
+
+def _get_path(document, path):
+    """
+    Returns the value at a dotted field path of a document, or _MISSING if it doesn't exist.
+    """
+
+    value = document
+    for key in path.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return _MISSING
+        value = value[key]
+
+    return value
+
+
+def _matches_value(value, condition):
+    if isinstance(condition, dict) and any(key.startswith('$') for key in condition):
+        for (operator, operand) in condition.items():
+            if operator == '$in':
+                values = value if isinstance(value, list) else [value]
+                if not any(v in operand for v in values):
+                    return False
+            elif operator == '$ne':
+                if value == operand:
+                    return False
+            elif value is _MISSING or value is None:
+                return False
+            elif operator == '$gt' and not value > operand:
+                return False
+            elif operator == '$gte' and not value >= operand:
+                return False
+            elif operator == '$lt' and not value < operand:
+                return False
+            elif operator == '$lte' and not value <= operand:
+                return False
+
+        return True
+
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+
+    return value == condition
+
+
+def _matches(document, query):
+    return all(_matches_value(_get_path(document, path), condition) for (path, condition) in query.items())
+
+
+def _project(document, projection):
+    """
+    Copies only the projected fields of a document (along with its '_id', unless it's excluded).
+    """
+
+    if not projection:
+        return copy.deepcopy(document)
+
+    projected = {}
+    included_paths = [path for (path, included) in projection.items() if included and path != '_id']
+
+    if projection.get('_id', 1) and '_id' in document:
+        projected['_id'] = document['_id']
+
+    for path in included_paths:
+        value = _get_path(document, path)
+        if value is _MISSING:
+            continue
+
+        keys = path.split('.')
+        target = projected
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = copy.deepcopy(value)
+
+    return projected
+
+
+class InMemoryCursor:
+    """
+    A cursor over the results of 'InMemoryCollection.find', which is only evaluated once it's iterated.
+    """
+
+    def __init__(self, documents, projection):
+        self.documents = documents
+        self.projection = projection
+        self.sort_keys = []
+        self.num_skip = 0
+        self.num_limit = 0
+
+
+    def sort(self, key_or_list, direction = 1):
+        self.sort_keys = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+
+
+    def skip(self, num_skip):
+        self.num_skip = num_skip
+        return self
+
+
+    def limit(self, num_limit):
+        self.num_limit = num_limit
+        return self
+
+
+    def __iter__(self):
+        documents = self.documents
+
+        for (key, direction) in reversed(self.sort_keys):
+            documents = sorted(documents, key=lambda document: _get_path(document, key), reverse=direction < 0)
+
+        documents = documents[self.num_skip:]
+        if self.num_limit > 0:
+            documents = documents[:self.num_limit]
+
+        return (_project(document, self.projection) for document in documents)
+
+
+class InMemoryCollection:
+    def __init__(self):
+        self.documents = []
+
+
+    def insert_many(self, documents):
+        for document in documents:
+            document.setdefault('_id', bson.ObjectId())
+            self.documents += [document]
+
+
+    def find(self, query = None, projection = None, batch_size = None, **kwargs):
+        query = query or {}
+        return InMemoryCursor([document for document in self.documents if _matches(document, query)], projection)
+
+
+    def count_documents(self, query):
+        return sum(1 for document in self.documents if _matches(document, query))
+
+
+class InMemoryDatabase:
+    def __init__(self):
+        self.collections = {}
+
+
+    def __getitem__(self, collection_name):
+        return self.collections.setdefault(collection_name, InMemoryCollection())
@@ -0,0 +1,133 @@
+"""
+This file is a CLI script to benchmark encoding the API's responses with orjson ('ORJSONEncoder') against the
+standard library's 'json' module ('APIJSONEncoder'), see 'flask_utils/json_encoder.py'. The responses are built
+with 'jsonify' inside a Flask app configured like the real one, and have the same shapes as:
+
+* A club's page, with its events, recruiting events, gallery media, resources and FAQ, with and without non-ASCII
+  text (which is escaped).
+* A page of the catalog and the whole catalog (e.g a search without a limit).
+* A student's profile with its references followed.
+* The admin's club list and RSO list.
+* An error response, from a 'JsonError'.
+
+It checks that both give the exact same output, and reports how many responses and megabytes per second each one
+encodes.
+
+To use it, run the command 'python -m benchmarks.json_encoding' from the root of the project.
+"""
+
+import argparse
+import time
+
+from flask import Flask, jsonify
+from flask_json import FlaskJSON, JsonError, json_response
+
+from flask_utils.json_encoder import APIJSONEncoder, ORJSONEncoder, orjson
+from flask_utils.mongo_objects import query_to_objects, query_to_objects_full
+from flask_utils.catalog_queries import CATALOG_VIEW_FIELDS
+from benchmarks.query_objects import generate_club, generate_student
+
+
+def _catalog_info(club):
+    return {field: club[field] for field in (name[len('club.'):] for name in CATALOG_VIEW_FIELDS) if field in club}
+
+
+def generate_responses(num_clubs):
+    """
+    Generates the payloads of the benchmarked responses.
+
+    Output: A list of tuples of each response's name and payload
+    """
+
+    clubs = [query_to_objects(generate_club(i)) for i in range(num_clubs)]
+    catalog = [_catalog_info(club) for club in clubs]
+
+    non_ascii_club = dict(clubs[0], name='Café Society ☕', about_us='Nous sommes une association étudiante. 🎉 ' * 20)
+
+    return [
+        ('club page', clubs[0]),
+        ('club page (non-ASCII)', non_ascii_club),
+        ('catalog page (50 clubs)', {'results': catalog[:50], 'num_results': num_clubs, 'next_cursor': 'Q2x1YiA0OQ=='}),
+        (f'catalog ({num_clubs} clubs)', {'results': catalog, 'num_results': num_clubs, 'next_cursor': None}),
+        ('student profile (full)', query_to_objects_full(generate_student())),
+        (f'club list ({num_clubs} clubs)', [
+            {'name': club['name'], 'email': f'{club["link_name"]}@berkeley.edu', 'confirmed': True, 'reactivated': i % 4 != 0}
+            for (i, club) in enumerate(clubs)
+        ]),
+        (f'RSO list ({num_clubs} emails)', [
+            {'email': f'{club["link_name"]}@berkeley.edu', 'registered': i % 3 != 0, 'confirmed': i % 3 == 1}
+            for (i, club) in enumerate(clubs)
+        ]),
+        ('error', JsonError(status='error', reason='The requested organization could not be found!', status_=404)),
+    ]
+
+
+def _make_app(json_encoder):
+    app = Flask('json-encoding-benchmark')
+    app.config.update(JSON_ADD_STATUS=False)
+
+    FlaskJSON(app)
+    app.json_encoder = json_encoder
+
+    return app
+
+
+def _encode(app, payload):
+    # Same as the response of the 'JsonError' handler
+    if isinstance(payload, JsonError):
+        return json_response(payload.status, payload.headers, **payload.data).get_data()
+
+    return jsonify(payload).get_data()
+
+
+def _benchmark(name, payload, apps, num_repeats):
+    outputs = {}
+    results = {'name': name}
+
+    for (backend, app) in apps.items():
+        with app.test_request_context():
+            outputs[backend] = _encode(app, payload)
+
+            start = time.perf_counter()
+            for _ in range(num_repeats):
+                _encode(app, payload)
+            secs = time.perf_counter() - start
+
+        results[f'{backend}_per_sec'] = num_repeats / secs
+        results[f'{backend}_mb_per_sec'] = num_repeats * len(outputs[backend]) / secs / 1e6
+
+    assert len(set(outputs.values())) == 1, f'The outputs of "{name}" differ'
+    return results
+
+
+def benchmark(num_clubs, num_repeats):
+    apps = {'stdlib': _make_app(APIJSONEncoder), 'orjson': _make_app(ORJSONEncoder)}
+
+    results = []
+    for (name, payload) in generate_responses(num_clubs):
+        # The larger responses are encoded fewer times, so that each one takes about as long
+        repeats = num_repeats if name in ('club page', 'club page (non-ASCII)', 'catalog page (50 clubs)', 'student profile (full)', 'error') \
+            else max(1, num_repeats * 50 // num_clubs)
+
+        results += [_benchmark(name, payload, apps, repeats)]
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark encoding the API responses with orjson and the standard library')
+    parser.add_argument('--clubs', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=500)
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit('orjson is not installed, so there is nothing to compare the standard library with')
+
+    results = benchmark(args.clubs, args.repeats)
+
+    print(f"{'response':<28} {'stdlib (per sec)':>17} {'orjson (per sec)':>17} {'speedup':>8} {'stdlib (MB/s)':>14} {'orjson (MB/s)':>14}")
+
+    for result in results:
+        speedup = result['orjson_per_sec'] / result['stdlib_per_sec']
+        print(f"{result['name']:<28} {result['stdlib_per_sec']:>17.0f} {result['orjson_per_sec']:>17.0f} {speedup:>7.1f}x "
+              f"{result['stdlib_mb_per_sec']:>14.1f} {result['orjson_mb_per_sec']:>14.1f}")
@@ -0,0 +1,171 @@
+"""
+This file is a CLI script to compare the legacy recommender model (a pickled pandas DataFrame with the similarity
+between each and every club) against the current model artifact (see 'club_model.py'), saved with either float32
+or float16 vectors and scores, using randomly generated clubs.
+
+For each number of clubs, it reports each format's size on disk, how long it takes to load (memory-mapped or read
+in, for the artifact) and how much memory the loaded model takes. It also converts the legacy model with
+'legacy_model.py' and reports the fraction of each club's true 'k' nearest neighbors that the converted model keeps.
+
+To use it, run the command 'python -m benchmarks.model_artifact' from the root of the project.
+"""
+
+import os
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from recommenders.similarity import normalize_vectors
+from recommenders.neighbor_index import ExactNeighborIndex
+from recommenders.club_model import ClubModel
+from recommenders.legacy_model import read_legacy_table, convert_legacy_model
+
+VECTOR_SIZE = 100
+NUM_TAGS = 40
+
+
+def generate_clubs(num_clubs, rng, clubs_per_topic = 50, spread = 0.6):
+    """
+    Generates a table of clubs (link names, tags and info) along with their normalized vectors, which are
+    scattered around random topic vectors.
+    """
+
+    num_topics = max(1, num_clubs // clubs_per_topic)
+    topics = rng.standard_normal((num_topics, VECTOR_SIZE)).astype(np.float32)
+
+    vectors = topics[rng.integers(0, num_topics, size=num_clubs)]
+    vectors += spread * rng.standard_normal((num_clubs, VECTOR_SIZE)).astype(np.float32)
+
+    clubs_table = pd.DataFrame({
+        'link_name': [f'club-{i}' for i in range(num_clubs)],
+        'name': [f'Club {i}' for i in range(num_clubs)],
+        'tags': [sorted(rng.choice(NUM_TAGS, size=rng.integers(1, 4), replace=False).tolist()) for _ in range(num_clubs)],
+        'logo_url': [None] * num_clubs,
+        'about_us': ['We are a club at UC Berkeley.'] * num_clubs,
+    })
+
+    return clubs_table, normalize_vectors(vectors)
+
+
+def _generate_cards(clubs_table):
+    return clubs_table[['link_name', 'name', 'logo_url', 'about_us']].to_dict('records')
+
+
+def _folder_size(folder):
+    return sum(os.path.getsize(os.path.join(folder, file_name)) for file_name in os.listdir(folder))
+
+
+def _model_bytes(model):
+    arrays = [model.vectors, model.neighbor_indices, model.neighbor_scores, model.tag_index.membership]
+    return sum(array.nbytes for array in arrays)
+
+
+def _time_load(load_func, num_repeats):
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        loaded = load_func()
+    return loaded, (time.perf_counter() - start) * 1000 / num_repeats
+
+
+def _recall(true_indices, found_indices):
+    return float(np.mean([
+        len(set(true_row) & set(found_row)) / len(true_row)
+        for (true_row, found_row) in zip(true_indices.tolist(), found_indices.tolist())
+    ]))
+
+
+def benchmark(num_clubs, k, num_repeats, seed = 42):
+    """
+    Compares the legacy and current model formats for the given number of clubs.
+
+    Output: A list of dictionaries with the results of each format
+    """
+
+    rng = np.random.default_rng(seed)
+    clubs_table, vectors = generate_clubs(num_clubs, rng)
+    link_names = clubs_table['link_name'].tolist()
+
+    neighbor_indices, neighbor_scores = ExactNeighborIndex(vectors).all_neighbors(k)
+
+    model = ClubModel(
+        link_names=link_names,
+        club_tags=clubs_table['tags'].tolist(),
+        cards=_generate_cards(clubs_table),
+        vectors=vectors,
+        neighbor_indices=neighbor_indices,
+        neighbor_scores=neighbor_scores,
+    )
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as folder:
+        # The legacy model was the full float64 similarity table, labeled by link name on both axes
+        pickle_file_loc = os.path.join(folder, 'club-model.pkl')
+        legacy_table = pd.DataFrame(vectors.astype(np.float64) @ vectors.astype(np.float64).T, index=link_names, columns=link_names)
+        legacy_table.to_pickle(pickle_file_loc)
+        del legacy_table
+
+        loaded_table, load_ms = _time_load(lambda: pd.read_pickle(pickle_file_loc), num_repeats)
+
+        results += [{
+            'format': 'legacy pickle',
+            'disk_bytes': os.path.getsize(pickle_file_loc),
+            'load_ms': load_ms,
+            'memory_bytes': int(loaded_table.memory_usage(index=True, deep=True).sum()),
+        }]
+        del loaded_table
+
+        for float_dtype in ['float32', 'float16']:
+            model_folder = os.path.join(folder, float_dtype)
+            os.makedirs(model_folder)
+            model.save(model_folder, float_dtype)
+
+            for mmap_mode in ['r', None]:
+                loaded_model, load_ms = _time_load(lambda: ClubModel.load(model_folder, mmap_mode=mmap_mode), num_repeats)
+
+                results += [{
+                    'format': f"{float_dtype} artifact{' (mmap)' if mmap_mode else ''}",
+                    'disk_bytes': _folder_size(model_folder),
+                    'load_ms': load_ms,
+                    'memory_bytes': _model_bytes(loaded_model),
+                }]
+
+        legacy_link_names, similarities = read_legacy_table(pickle_file_loc)
+
+        start = time.perf_counter()
+        converted_model = convert_legacy_model(legacy_link_names, similarities, clubs_table, _generate_cards(clubs_table), k)
+        convert_secs = time.perf_counter() - start
+
+    for result in results:
+        result['num_clubs'] = num_clubs
+        result['convert_secs'] = convert_secs
+        result['converted_recall'] = _recall(neighbor_indices, converted_model.neighbor_indices)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the legacy pickled recommender model against the current artifact')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 3000, 5000])
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'clubs':>8} {'format':<24} {'disk (MB)':>10} {'load (ms)':>10} {'memory (MB)':>12}")
+
+    for num_clubs in args.sizes:
+        results = benchmark(num_clubs, args.k, args.repeats)
+
+        for result in results:
+            print(
+                f"{result['num_clubs']:>8} {result['format']:<24} {result['disk_bytes'] / 1e6:>10.2f} "
+                f"{result['load_ms']:>10.2f} {result['memory_bytes'] / 1e6:>12.2f}"
+            )
+
+        print(
+            f"{num_clubs:>8} converted the legacy model in {results[0]['convert_secs']:.2f}s, "
+            f"keeping {results[0]['converted_recall']:.3f} of the top {args.k} neighbors"
+        )
@@ -0,0 +1,115 @@
+"""
+This file is a CLI script to benchmark the approximate (IVF) neighbor index against the exact one, using randomly
+generated club vectors that are grouped around a number of "topics", like real club descriptions are.
+
+For each number of clubs, it reports how long each index takes to build the neighbors table of every club and how
+long a single lookup takes, along with the recall of both (i.e the fraction of the true 'k' nearest neighbors that
+are found) for a few numbers of probes. The recall is measured over a sample of clubs ('--queries').
+
+To use it, run the command 'python -m benchmarks.neighbor_index' from the root of the project.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from recommenders.neighbor_index import ExactNeighborIndex, IVFNeighborIndex
+
+VECTOR_SIZE = 100
+
+
+def generate_vectors(num_clubs, rng, clubs_per_topic = 50, spread = 0.6):
+    """
+    Generates club vectors scattered around random topic vectors.
+    """
+
+    num_topics = max(1, num_clubs // clubs_per_topic)
+    topics = rng.standard_normal((num_topics, VECTOR_SIZE)).astype(np.float32)
+
+    vectors = topics[rng.integers(0, num_topics, size=num_clubs)]
+    vectors += spread * rng.standard_normal((num_clubs, VECTOR_SIZE)).astype(np.float32)
+
+    return vectors
+
+
+def recall(true_indices, found_indices):
+    """
+    Returns the average fraction of the true neighbors of each club that were found.
+    """
+
+    hits = [len(np.intersect1d(true_row, found_row[found_row >= 0])) for (true_row, found_row) in zip(true_indices, found_indices)]
+    return np.sum(hits) / true_indices.size
+
+
+def time_search(index, rows, k):
+    """
+    Returns the average time (in milliseconds) that a single club's lookup takes.
+    """
+
+    start = time.perf_counter()
+    for row in rows:
+        index.search([row], k)
+
+    return (time.perf_counter() - start) * 1000 / len(rows)
+
+
+def benchmark(num_clubs, k, num_queries, probes_list, seed = 42):
+    """
+    Benchmarks both indices for a synthetic set of 'num_clubs' clubs and returns the results as a list of rows.
+    """
+
+    rng = np.random.default_rng(seed)
+    vectors = generate_vectors(num_clubs, rng)
+    query_rows = rng.choice(num_clubs, min(num_queries, num_clubs), replace=False)
+
+    start = time.perf_counter()
+    exact_index = ExactNeighborIndex(vectors)
+    true_indices, _ = exact_index.all_neighbors(k)
+    exact_build_secs = time.perf_counter() - start
+
+    results = [{
+        'num_clubs': num_clubs,
+        'index': 'exact',
+        'build_secs': exact_build_secs,
+        'lookup_ms': time_search(exact_index, query_rows[:100], k),
+        'table_recall': 1.0,
+        'lookup_recall': 1.0,
+    }]
+
+    for num_probes in probes_list:
+        start = time.perf_counter()
+        ivf_index = IVFNeighborIndex(vectors, num_probes=num_probes)
+        table_indices, _ = ivf_index.all_neighbors(k)
+        ivf_build_secs = time.perf_counter() - start
+
+        found_indices, _ = ivf_index.search(query_rows, k)
+
+        results += [{
+            'num_clubs': num_clubs,
+            'index': f'ivf ({ivf_index.num_lists} lists, {num_probes} probes)',
+            'build_secs': ivf_build_secs,
+            'lookup_ms': time_search(ivf_index, query_rows[:100], k),
+            'table_recall': recall(true_indices[query_rows], table_indices[query_rows]),
+            'lookup_recall': recall(true_indices[query_rows], found_indices),
+        }]
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the approximate neighbor index against the exact one')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 50000])
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--probes', type=int, nargs='+', default=[4, 8, 16])
+    args = parser.parse_args()
+
+    print(f"{'clubs':>8} {'index':<28} {'build (s)':>10} {'table recall':>13} {'lookup (ms)':>12} {'lookup recall':>14}")
+
+    for num_clubs in args.sizes:
+        for result in benchmark(num_clubs, args.k, args.queries, args.probes):
+            print(
+                f"{result['num_clubs']:>8} {result['index']:<28} {result['build_secs']:>10.2f} "
+                f"{result['table_recall']:>13.3f} {result['lookup_ms']:>12.3f} {result['lookup_recall']:>14.3f}"
+            )
@@ -0,0 +1,198 @@
+"""
+This file is a CLI script to benchmark converting MongoDB documents into JSON-ready dictionaries with
+'query_to_objects' (see 'flask_utils/mongo_objects.py') against serializing them with 'mongoengine_goodjson' and
+parsing the JSON back, which is what it used to do. It checks that both give the exact same output, and measures:
+
+* A club's full profile (with events, recruiting events, gallery media, resources and FAQ), as served by the club
+  page and the officers' profile page.
+* A student's profile with its references followed (majors, minors and interests), as served by the student
+  profile page ('query_to_objects_full').
+* The catalog query (the catalog info of every club), if a MongoDB server is given ('--mongo-uri'). The clubs are
+  inserted into a scratch database, which is dropped afterwards.
+
+To use it, run the command 'python -m benchmarks.query_objects [--mongo-uri mongodb://localhost:27017]' from the
+root of the project.
+"""
+
+import argparse
+import datetime
+import json
+import time
+
+import mongoengine as mongo
+
+from models import *
+from models.officer import Question
+from flask_utils.mongo_objects import query_to_objects, query_to_objects_full
+from flask_utils.catalog_queries import CATALOG_VIEW_FIELDS
+
+SCRATCH_DATABASE_NAME = 'query-objects-benchmark'
+
+TAGS = [Tag(id=i, name=f'Tag {i}') for i in range(10)]
+NUM_USERS_TAGS = [NumUsersTag(id=i, value=f'{i * 10}-{i * 10 + 9}') for i in range(3)]
+
+
+def generate_club(i, num_events = 20):
+    """
+    Generates a club with a realistic amount of content, whose dates are spread over a semester.
+    """
+
+    start = datetime.datetime(2021, 1, 19, 18, 0)
+
+    def event(event_class, j, **kwargs):
+        return event_class(
+            id=f'event-{j}',
+            name=f'General meeting #{j}',
+            links=[f'https://www.example.com/club-{i}/events/{j}'],
+            location='Sproul Plaza',
+            event_start=start + datetime.timedelta(days=7 * j),
+            event_end=start + datetime.timedelta(days=7 * j, hours=2),
+            tags=TAGS[j % 3:j % 3 + 2],
+            **kwargs
+        )
+
+    return NewClub(
+        name=f'Club {i}',
+        link_name=f'club-{i}',
+        tags=TAGS[i % 8:i % 8 + 3],
+        app_required=i % 2 == 0,
+        new_members=i % 3 != 0,
+        num_users=NUM_USERS_TAGS[i % 3],
+        logo_url=f'https://www.example.com/club-{i}/logo.png',
+        banner_url=f'https://www.example.com/club-{i}/banner.png',
+        gallery_media=[
+            GalleryPic(id=f'pic-{j}', url=f'https://www.example.com/club-{i}/gallery/{j}.png', caption=f'Picture {j}')
+            for j in range(5)
+        ],
+        about_us='We are a student organization at UC Berkeley. ' * 20,
+        get_involved='Come to any of our general meetings! ' * 10,
+        apply_link=f'https://www.example.com/club-{i}/apply',
+        apply_deadline_start=start,
+        apply_deadline_end=start + datetime.timedelta(days=14),
+        recruiting_start=start,
+        recruiting_end=start + datetime.timedelta(days=21),
+        resources=[
+            Resource(id=f'resource-{j}', name=f'Resource {j}', link=f'https://www.example.com/club-{i}/resources/{j}')
+            for j in range(10)
+        ],
+        events=[event(Event, j, description='Our weekly general meeting. ' * 10, invite_only=False) for j in range(num_events)],
+        recruiting_events=[event(RecruitingEvent, j, description='Info session', invite_only=j % 2 == 0) for j in range(5)],
+        social_media_links=SocialMediaLinks(
+            contact_email=f'club-{i}@berkeley.edu',
+            website=f'https://www.example.com/club-{i}',
+            instagram=f'https://www.instagram.com/club{i}',
+        ),
+        faq=[Question(id=f'question-{j}', question=f'Question {j}?', answer='An answer. ' * 10) for j in range(5)],
+        last_updated=start + datetime.timedelta(days=30, microseconds=123000),
+    )
+
+
+def generate_officer(i):
+    return NewOfficerUser(
+        email=f'club-{i}@berkeley.edu',
+        password='hashed password',
+        has_usable_password=True,
+        confirmed=True,
+        club=generate_club(i),
+    )
+
+
+def generate_student():
+    return NewStudentUser(
+        email='student@berkeley.edu',
+        password='hashed password',
+        confirmed=True,
+        majors=[Major(id=i, major=f'Major {i}') for i in range(2)],
+        minors=[Minor(id=0, minor='Minor 0')],
+        interests=TAGS[:3],
+        favorited_clubs=[f'club-{i}' for i in range(10)],
+        visited_clubs=[f'club-{i}' for i in range(30)],
+        club_board=StudentKanbanBoard(interested_clubs=['club-1', 'club-2'], applied_clubs=['club-3']),
+    )
+
+
+def _time_ms(func, num_repeats):
+    func()
+
+    start = time.perf_counter()
+    for _ in range(num_repeats):
+        func()
+
+    return (time.perf_counter() - start) * 1000 / num_repeats
+
+
+def _benchmark(name, goodjson_func, direct_func, num_repeats, num_docs = 1):
+    assert json.dumps(goodjson_func()) == json.dumps(direct_func()), f'The outputs of "{name}" differ'
+
+    goodjson_ms = _time_ms(goodjson_func, num_repeats)
+    direct_ms = _time_ms(direct_func, num_repeats)
+
+    return {
+        'name': name,
+        'goodjson_ms': goodjson_ms,
+        'direct_ms': direct_ms,
+        'docs_per_sec': num_docs * 1000 / direct_ms,
+    }
+
+
+def benchmark_documents(num_repeats):
+    officer = generate_officer(0)
+    student = generate_student()
+
+    return [
+        _benchmark('club profile', lambda: json.loads(officer.club.to_json()), lambda: query_to_objects(officer.club), num_repeats),
+        _benchmark('officer user', lambda: json.loads(officer.to_json()), lambda: query_to_objects(officer), num_repeats),
+        _benchmark(
+            'student profile (full)',
+            lambda: json.loads(student.to_json(follow_reference=True)),
+            lambda: query_to_objects_full(student),
+            num_repeats
+        ),
+    ]
+
+
+def benchmark_catalog_query(mongo_uri, num_clubs, num_repeats):
+    mongo.connect(SCRATCH_DATABASE_NAME, host=mongo_uri, alias='default')
+
+    try:
+        for tag in TAGS + NUM_USERS_TAGS:
+            tag.save()
+
+        NewOfficerUser.objects.insert([generate_officer(i) for i in range(num_clubs)], load_bulk=False)
+
+        query = NewOfficerUser.objects \
+            .filter(confirmed=True) \
+            .filter(club__reactivated=True) \
+            .only(*CATALOG_VIEW_FIELDS) \
+            .order_by('club.name', 'id')
+
+        return [_benchmark(
+            f'catalog query ({num_clubs} clubs)',
+            lambda: json.loads(query.clone().to_json()),
+            lambda: query_to_objects(query.clone()),
+            num_repeats,
+            num_docs=num_clubs
+        )]
+    finally:
+        mongo.get_connection().drop_database(SCRATCH_DATABASE_NAME)
+        mongo.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark converting MongoDB documents into JSON-ready dictionaries')
+    parser.add_argument('--mongo-uri', default=None, help='A MongoDB server to benchmark the catalog query on')
+    parser.add_argument('--clubs', type=int, default=1000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    results = benchmark_documents(args.repeats)
+    if args.mongo_uri is not None:
+        results += benchmark_catalog_query(args.mongo_uri, args.clubs, max(1, args.repeats // 20))
+    else:
+        print('No MongoDB server given (--mongo-uri), so the catalog query is not benchmarked\n')
+
+    print(f"{'document':<28} {'goodjson (ms)':>14} {'direct (ms)':>12} {'speedup':>8} {'docs/sec':>10}")
+
+    for result in results:
+        speedup = result['goodjson_ms'] / result['direct_ms']
+        print(f"{result['name']:<28} {result['goodjson_ms']:>14.3f} {result['direct_ms']:>12.3f} {speedup:>7.1f}x {result['docs_per_sec']:>10.0f}")
@@ -0,0 +1,232 @@
+"""
+This file is a CLI script to evaluate the similar clubs recommender offline, both for speed and quality. It generates
+a synthetic corpus of clubs, loads it into an in-memory database (see 'in_memory_db.py') and then:
+
+* Times each training stage: fetching the clubs, cleaning the descriptions, training the word embeddings and
+  building the nearest neighbors model
+* Times 'ClubRecommender.recommend' over a sample of clubs and reports the latency distribution
+* Computes the tag-overlap precision@k, i.e the fraction of recommended clubs that share at least one tag with
+  the club they were recommended for. Since 'recommend' already filters by tags, this is also computed for the
+  top 'k' neighbors from the embeddings alone, which measures the quality of the embeddings themselves.
+
+Each synthetic club gets 1 to 3 tags out of '--num-tags' tag IDs (like the 'Tag' collection's integer IDs), and its
+description is made of words drawn mostly from the vocabularies of its tags, plus some words shared by every club
+and some stopwords. That way, clubs with the same tags have similar descriptions, like real clubs do.
+
+The results are printed and written as JSON ('--output'), along with the current git commit, so that runs can be
+compared across commits.
+
+To use it, run the command 'python -m benchmarks.recommender_harness' from the root of the project.
+"""
+
+import argparse
+import datetime
+import json
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.in_memory_db import InMemoryDatabase
+from recommenders import ClubRecommender
+
+WORDS_PER_TAG = 40
+NUM_SHARED_WORDS = 200
+STOPWORDS = ['the', 'a', 'and', 'of', 'to', 'in', 'we', 'our', 'is', 'for', 'uc', 'berkeley']
+
+
+def _make_words(prefix, num_words):
+    return [f'{prefix}{i}' for i in range(num_words)]
+
+
+def generate_clubs(num_clubs, num_tags, description_length, seed = 42):
+    """
+    Generates the officer user documents of a synthetic corpus of clubs.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    tag_words = [_make_words(f'tag{tag_id}word', WORDS_PER_TAG) for tag_id in range(num_tags)]
+    shared_words = _make_words('shared', NUM_SHARED_WORDS)
+
+    users = []
+    for i in range(num_clubs):
+        tags = sorted(rng.choice(num_tags, size=rng.integers(1, 4), replace=False).tolist())
+
+        words = []
+        for _ in range(description_length):
+            source = rng.random()
+            if source < 0.6:
+                words += [rng.choice(tag_words[rng.choice(tags)])]
+            elif source < 0.85:
+                words += [rng.choice(shared_words)]
+            else:
+                words += [rng.choice(STOPWORDS)]
+
+        users += [{
+            'role': 'officer',
+            'confirmed': True,
+            'club': {
+                'name': f'Club {i}',
+                'link_name': f'club-{i}',
+                'about_us': ' '.join(words).capitalize() + '.',
+                'tags': tags,
+                'logo_url': None,
+                'reactivated': True,
+                'last_updated': None,
+                'reactivated_last': None,
+            }
+        }]
+
+    return users
+
+
+def _time(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def tag_precision_at_k(model, recommendations):
+    """
+    Returns the fraction of recommended clubs that share at least one tag with the club they were recommended for.
+    """
+
+    num_recommended = 0
+    num_relevant = 0
+
+    for (link_name, recommended_link_names) in recommendations.items():
+        club_tags = set(model.club_tags[model.club_rows[link_name]])
+
+        for recommended_link_name in recommended_link_names:
+            num_recommended += 1
+            num_relevant += len(club_tags & set(model.club_tags[model.club_rows[recommended_link_name]])) > 0
+
+    return num_relevant / num_recommended if num_recommended > 0 else 0.0
+
+
+def evaluate(num_clubs, num_tags, description_length, k, num_queries, num_workers, neighbor_index_type, seed = 42):
+    """
+    Trains the recommender on a synthetic corpus and measures its speed and quality.
+
+    Output: A dictionary with the results
+    """
+
+    db = InMemoryDatabase()
+    db['new_base_user'].insert_many(generate_clubs(num_clubs, num_tags, description_length, seed))
+
+    with tempfile.TemporaryDirectory() as model_folder:
+        club_recommender = ClubRecommender(db, model_folder, num_workers=num_workers, neighbor_index_type=neighbor_index_type)
+
+        clubs_table, fetch_secs = _time(club_recommender._fetch_data)
+        cleaned_table, clean_secs = _time(club_recommender._clean_data, clubs_table)
+        (vectorized_table, word_vectors), embed_secs = _time(club_recommender._train_model_vectors, cleaned_table, yield_model=True)
+        model, matrix_secs = _time(club_recommender._generate_model, vectorized_table, None, word_vectors)
+
+        club_recommender.model = model
+
+        rng = np.random.default_rng(seed)
+        query_link_names = [model.link_names[row] for row in rng.choice(len(model), min(num_queries, len(model)), replace=False)]
+
+        latencies_ms = []
+        recommendations = {}
+        embedding_recommendations = {}
+
+        for link_name in query_link_names:
+            start = time.perf_counter()
+            recommendations[link_name] = club_recommender.recommend(link_name, k)
+            latencies_ms += [(time.perf_counter() - start) * 1000]
+
+            neighbors = model.neighbor_indices[model.club_rows[link_name], :k]
+            embedding_recommendations[link_name] = [model.link_names[row] for row in neighbors if row >= 0]
+
+        _, batch_secs = _time(club_recommender.recommend_many, query_link_names, k)
+
+    return {
+        'config': {
+            'num_clubs': num_clubs,
+            'num_tags': num_tags,
+            'description_length': description_length,
+            'k': k,
+            'num_queries': len(query_link_names),
+            'num_workers': num_workers,
+            'neighbor_index_type': neighbor_index_type,
+            'seed': seed,
+        },
+        'training_secs': {
+            'fetch': fetch_secs,
+            'clean': clean_secs,
+            'embed': embed_secs,
+            'matrix': matrix_secs,
+            'total': fetch_secs + clean_secs + embed_secs + matrix_secs,
+        },
+        'recommend_latency_ms': {
+            'mean': float(np.mean(latencies_ms)),
+            'p50': float(np.percentile(latencies_ms, 50)),
+            'p90': float(np.percentile(latencies_ms, 90)),
+            'p99': float(np.percentile(latencies_ms, 99)),
+            'max': float(np.max(latencies_ms)),
+        },
+        'recommend_many_ms_per_club': batch_secs * 1000 / len(query_link_names),
+        'quality': {
+            'vocabulary_size': len(word_vectors),
+            f'tag_precision_at_{k}': tag_precision_at_k(model, recommendations),
+            f'embedding_tag_precision_at_{k}': tag_precision_at_k(model, embedding_recommendations),
+        },
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate the similar clubs recommender on synthetic clubs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 10000])
+    parser.add_argument('--num-tags', type=int, default=40)
+    parser.add_argument('--description-length', type=int, default=60)
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--neighbor-index', choices=['auto', 'exact', 'ivf'], default='auto')
+    parser.add_argument('--output', default='recommender-harness-results.json')
+    args = parser.parse_args()
+
+    runs = []
+
+    for num_clubs in args.sizes:
+        result = evaluate(
+            num_clubs, args.num_tags, args.description_length, args.k,
+            args.queries, args.workers, args.neighbor_index
+        )
+        runs += [result]
+
+        training_secs = result['training_secs']
+        latency = result['recommend_latency_ms']
+
+        print(f'{num_clubs} clubs:')
+        print(
+            f"  training (s): fetch {training_secs['fetch']:.2f}, clean {training_secs['clean']:.2f}, "
+            f"embed {training_secs['embed']:.2f}, matrix {training_secs['matrix']:.2f}, total {training_secs['total']:.2f}"
+        )
+        print(
+            f"  recommend (ms): mean {latency['mean']:.3f}, p50 {latency['p50']:.3f}, p90 {latency['p90']:.3f}, "
+            f"p99 {latency['p99']:.3f}, batched {result['recommend_many_ms_per_club']:.3f} per club"
+        )
+        print(
+            f"  tag precision@{args.k}: {result['quality'][f'tag_precision_at_{args.k}']:.3f} "
+            f"(embeddings only: {result['quality'][f'embedding_tag_precision_at_{args.k}']:.3f})"
+        )
+
+    with open(args.output, 'w') as output_file:
+        json.dump({
+            'commit': _git_commit(),
+            'ran_at': datetime.datetime.now().isoformat(),
+            'runs': runs,
+        }, output_file, indent=2)
+
+    print(f'Results written to {args.output}')
@@ -0,0 +1,90 @@
+"""
+This file is a CLI script to benchmark the club recommender's similarity engine against the original pairwise
+loop, using randomly generated club vectors.
+
+The original loop calls 'scipy.spatial.distance.cosine' once per pair of clubs, which takes hours at the larger
+sizes. Because of that, the loop is only timed over a sample of rows ('--legacy-rows') and its total time is
+extrapolated from there. The matrix engine is always timed over the full set of clubs.
+
+To use it, run the command 'python -m benchmarks.similarity_engine' from the root of the project.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import scipy.spatial
+
+from recommenders.similarity import cosine_similarity_matrix
+
+VECTOR_SIZE = 100
+
+
+def legacy_similarity_rows(vectors, num_rows):
+    """
+    The original double loop from 'ClubRecommender._generate_dist_table', limited to the first 'num_rows' rows.
+    """
+
+    distance_list = []
+
+    for vector_1 in vectors[:num_rows]:
+        distance_dictionary = {}
+
+        for (j, vector_2) in enumerate(vectors):
+            distance_dictionary[j] = 1 - scipy.spatial.distance.cosine(vector_1, vector_2)
+
+        distance_list += [distance_dictionary]
+
+    return distance_list
+
+
+def benchmark(num_clubs, legacy_rows, seed=42):
+    """
+    Times both engines for a synthetic set of 'num_clubs' clubs and returns the results as a dictionary.
+    """
+
+    rng = np.random.default_rng(seed)
+    vectors = [vector for vector in rng.standard_normal((num_clubs, VECTOR_SIZE))]
+
+    num_rows = min(legacy_rows, num_clubs)
+    start = time.perf_counter()
+    legacy_similarity_rows(vectors, num_rows)
+    legacy_secs = (time.perf_counter() - start) * num_clubs / num_rows
+
+    start = time.perf_counter()
+    similarity_matrix = cosine_similarity_matrix(vectors)
+    matrix_secs = time.perf_counter() - start
+
+    # Sanity check that both engines agree on a few pairs of clubs
+    for (i, j) in rng.integers(0, num_clubs, size=(5, 2)):
+        expected = 1 - scipy.spatial.distance.cosine(vectors[i], vectors[j])
+        assert abs(similarity_matrix[i, j] - expected) < 1e-4
+
+    return {
+        'num_clubs': num_clubs,
+        'legacy_secs': legacy_secs,
+        'legacy_extrapolated': num_rows < num_clubs,
+        'matrix_secs': matrix_secs,
+        'matrix_mb': similarity_matrix.nbytes / (1024 * 1024),
+        'speedup': legacy_secs / matrix_secs,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the club similarity engine')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--legacy-rows', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'clubs':>8} {'legacy (s)':>14} {'matrix (s)':>12} {'matrix (MB)':>12} {'speedup':>10}")
+
+    for num_clubs in args.sizes:
+        result = benchmark(num_clubs, args.legacy_rows)
+        legacy_col = f"{result['legacy_secs']:.2f}{'*' if result['legacy_extrapolated'] else ''}"
+
+        print(
+            f"{result['num_clubs']:>8} {legacy_col:>14} {result['matrix_secs']:>12.3f} "
+            f"{result['matrix_mb']:>12.1f} {result['speedup']:>9.0f}x"
+        )
+
+    print(f'* extrapolated from the first {args.legacy_rows} rows')
@@ -24,6 +24,19 @@ _fetch_gallery_media_list = lambda user: [query_to_objects(gallery_media) for ga
 _fetch_question_list = lambda user: [query_to_objects(question) for question in user.club.faq]
 
 
+@admin_blueprint.after_request
+def invalidate_catalog_snapshot(response):
+    """
+    This is a post-request hook that invalidates the catalog snapshot after every successful change to a club,
+    so that the catalog reflects the change on the next read.
+    """
+
+    if request.method != 'GET' and response.status_code < 400:
+        flask_exts.catalog_snapshot.invalidate()
+
+    return response
+
+
 @admin_blueprint.route('/profile', methods=['GET'])
 @jwt_required
 @role_required(roles=['officer'])
@@ -88,9 +101,9 @@ def edit_profile():
         if key == 'is_reactivating':
             continue
         if key == 'tags':
-            user.club['tags'] = Tag.objects.filter(id__in=json['tags'])
+            user.club['tags'] = flask_exts.metadata_registry.get_many('tags', json['tags'])
         elif key == 'num_users':
-            user.club['num_users'] = NumUsersTag.objects.filter(id=json['num_users']).first()
+            user.club['num_users'] = flask_exts.metadata_registry.get('num_user_tags', json['num_users'])
         elif key == 'social_media_links':
             user.update(club__social_media_links=json['social_media_links'])
         else:
@@ -1,6 +1,7 @@
 from flask import Blueprint, g, request
 from flask_json import as_json, JsonError
-from flask_utils import validate_json, query_to_objects, role_required
+from flask_utils import validate_json, role_required, fetch_catalog_club, fetch_catalog_club_version
+from flask_utils import make_etag, is_not_modified, not_modified_response, cached_json_response
 from flask_jwt_extended import jwt_optional, get_current_user
 from init_app import flask_exts
 
@@ -10,12 +11,6 @@ from app_config import CurrentConfig
 
 catalog_blueprint = Blueprint('catalog', __name__, url_prefix='/api/catalog')
 
-CATALOG_VIEW_FIELDS = [
-    'club.name', 'club.link_name', 'club.about_us',
-    'club.tags', 'club.app_required', 'club.new_members', 'club.num_users',
-    'club.logo_url', 'club.banner_url', 'club.last_updated', 'club.apply_deadline_end', 'club.recruiting_end'
-]
-
 def to_int_safe(s, default):
     """
     A safe string to integer function that returns a default if it fails.
@@ -49,68 +44,131 @@ def _random_generic_club_recommendations(size):
     return random_recommended_clubs
 
 
-def _fetch_recommended_club_info(link_names):
+def _org_etag(org_link_name):
     """
-    Given a set of clubs' link names, fetch the relevant club information for the club view page.
+    Computes the ETag of a club's page out of its last updated date (which every edit of the club updates) and
+    whether it's accepting new members, along with the version of the recommender model that its recommended
+    clubs come from. Both fields are read from the database on every request (a single indexed lookup), so that
+    an edit made through any worker changes the ETag right away.
+
+    It's None when the page can't be cached, i.e when the club isn't in the catalog, the model isn't saved (and
+    thus has no version) or the recommendations are random (in debug mode).
     """
 
-    random_recommended_users = NewOfficerUser.objects \
-        .filter(club__link_name__in=link_names)
+    if CurrentConfig.DEBUG:
+        return None
 
-    random_recommended_clubs = []
-    for user in random_recommended_users:
-        random_recommended_clubs += [{
-            'link_name': user['club']['link_name'],
-            'name':      user['club']['name'],
-            'logo_url':  user['club']['logo_url'],
-            'about_us':  user['club']['about_us'],
-        }]
+    model = flask_exts.club_recommender.current_model()
+    if model is None or model.version is None:
+        return None
 
-    return random_recommended_clubs
+    club_version = fetch_catalog_club_version(org_link_name)
+    if club_version is None:
+        return None
+
+    return make_etag(org_link_name, club_version.get('last_updated'), club_version.get('new_members'), model.version)
+
+
+def _record_visit(org_link_name):
+    """
+    Saves the club as part of the current student's visiting history of clubs, if there's a student logged in.
+    """
+
+    current_user = get_current_user()
+
+    if current_user and current_user.role == 'student':
+        # Save the club as part of the student's visiting history of clubs
+        current_user.visited_clubs += [org_link_name]
+        current_user.save()
 
 
 @catalog_blueprint.route('/tags', methods=['GET'])
-@as_json
 def get_tags():
     """
-    GET endpoint that fetches the set of club tags.
+    GET endpoint that fetches the set of club tags. It's served from memory with an ETag, so repeat requests
+    get a 304 (Not Modified) without touching the database.
     """
 
-    return query_to_objects(Tag.objects.all())
+    return flask_exts.metadata_registry.respond('tags')
 
 
 @catalog_blueprint.route('/num-user-tags', methods=['GET'])
-@as_json
 def get_num_user_tags():
     """
-    GET endpoint that fetches the set of "# of users" tags.
+    GET endpoint that fetches the set of "# of users" tags, which is cached just like the club tags.
     """
 
-    return query_to_objects(NumUsersTag.objects.all())
+    return flask_exts.metadata_registry.respond('num_user_tags')
 
 
 @catalog_blueprint.route('/organizations', methods=['GET'])
 def get_organizations():
     """
-    GET endpoint that fetches the list of organizations without filters, sorted alphabetically.
+    GET endpoint that fetches the list of organizations without filters, sorted alphabetically. The page is
+    sliced out of the in-memory catalog snapshot (see 'catalog_snapshot.py').
+
+    Pages are either fetched by offset ('skip') or, if the 'cursor' parameter is given, right after the cursor
+    returned as 'next_cursor' with the previous page (where an empty cursor means the first page). Cursors don't
+    skip or repeat organizations when organizations are added or removed in between pages.
     """
 
     limit = to_int_safe( request.args.get('limit'), 50)
     skip = to_int_safe( request.args.get('skip'), 0)
+    cursor = request.args.get('cursor')
 
-    query = NewOfficerUser.objects \
-        .filter(confirmed=True) \
-        .filter(club__reactivated=True) \
-        .only(*CATALOG_VIEW_FIELDS) \
-        .order_by('club.name') \
-        .limit(limit) \
-        .skip(skip)
+    if cursor is None:
+        results, num_results, next_cursor = flask_exts.catalog_snapshot.page(skip, limit)
+    else:
+        try:
+            results, num_results, next_cursor = flask_exts.catalog_snapshot.page_after(cursor or None, limit)
+        except ValueError:
+            raise JsonError(status='error', reason='The requested cursor is invalid!', status_=400)
 
-    results = [obj['club'] for obj in query_to_objects(query)]
+    return {
+        'results': results,
+        'num_results': num_results,
+        'next_cursor': next_cursor
+    }
+
+
+@catalog_blueprint.route('/organizations/search', methods=['POST'])
+@validate_json(schema={
+    'search': {'type': 'string', 'maxlength': 200, 'default': ''},
+    'tags': {'type': 'list', 'schema': {'type': 'integer'}, 'default': []},
+    'app_required': {'type': 'boolean', 'nullable': True, 'default': None},
+    'new_members': {'type': 'boolean', 'nullable': True, 'default': None},
+    'num_users': {'type': 'list', 'schema': {'type': 'integer'}, 'default': []},
+    'limit': {'type': 'integer', 'min': 0, 'default': 50},
+    'skip': {'type': 'integer', 'min': 0, 'default': 0},
+})
+@as_json
+def search_organizations():
+    """
+    POST endpoint that searches the organizations by name and about us (by words or word prefixes), while
+    filtering them by tags (any of them), whether an application is required, whether they're accepting new
+    members and their number of users (any of them). The results are sorted by relevance if there's search text,
+    and alphabetically otherwise. See 'catalog_search.py' for how the search index works.
+
+    Along with the results, it returns how many of all the matching organizations have each tag, each number of
+    users, require an application and are accepting new members.
+    """
+
+    json = g.clean_json
+
+    results, num_results, facet_counts = flask_exts.catalog_snapshot.search_index().search(
+        json['search'],
+        tags=json['tags'],
+        app_required=json['app_required'],
+        new_members=json['new_members'],
+        num_users=json['num_users'],
+        skip=json['skip'],
+        limit=json['limit'],
+    )
 
     return {
         'results': results,
-        'num_results': query.count()
+        'num_results': num_results,
+        'facets': facet_counts
     }
 
 
@@ -119,36 +177,58 @@ def get_organizations():
 def get_org_by_id(org_link_name):
     """
     GET endpoint that fetches all information of the requested club organization, including
-    its similarly recommended clubs.
+    its similarly recommended clubs. The club is read straight from pymongo (see 'catalog_queries.py').
+
+    The response has an ETag, so a client that already has the current version of the club gets a 304 (Not
+    Modified) before the club is fetched from the database. The client is still asked to revalidate every time,
+    so that the student's visit is always recorded.
     """
 
-    user = NewOfficerUser.objects(
-        club__link_name=org_link_name,
-        confirmed=True,
-        club__reactivated=True,
-    ).first()
+    etag = _org_etag(org_link_name)
+    if etag is not None and is_not_modified(etag):
+        _record_visit(org_link_name)
+        return not_modified_response(etag)
 
-    if user is None:
-        raise JsonError(status='error', reason='The requested club does not exist!', status_=404)
+    club_obj = fetch_catalog_club(org_link_name)
 
-    club_obj = query_to_objects(user.club)
+    if club_obj is None:
+        raise JsonError(status='error', reason='The requested club does not exist!', status_=404)
 
     for event in club_obj['events']:
         del event['_cls']
 
-
-    current_user = get_current_user()
-
-    if current_user and current_user.role == 'student':
-        # Save the club as part of the student's visiting history of clubs
-        current_user.visited_clubs += [org_link_name]
-        current_user.save()
+    _record_visit(org_link_name)
 
     if CurrentConfig.DEBUG:
         club_obj['recommended_clubs'] = _random_generic_club_recommendations(3)
     else:
-        recommended_club_link_names = flask_exts.club_recommender.recommend(org_link_name)
-        club_obj['recommended_clubs'] = _fetch_recommended_club_info(recommended_club_link_names)
+        club_obj['recommended_clubs'] = flask_exts.club_recommender.recommend_cards(org_link_name)
+
+    if etag is None:
+        return club_obj
+
+    return cached_json_response(club_obj, etag)
+
 
+@catalog_blueprint.route('/organizations/recommendations', methods=['POST'])
+@validate_json(schema={
+    'clubs': {'type': 'list', 'schema': {'type': 'string'}, 'required': True, 'empty': False, 'maxlength': 500},
+    'k': {'type': 'integer', 'min': 1, 'max': 20, 'default': 3},
+})
+@as_json
+def get_orgs_recommendations():
+    """
+    POST endpoint that fetches the similarly recommended clubs of many club organizations at once, such as
+    for showing "similar clubs" on a list of clubs. Clubs that don't exist have no recommended clubs.
+    """
+
+    json = g.clean_json
+    org_link_names = json['clubs']
+    k = json['k']
+
+    if CurrentConfig.DEBUG:
+        recommended_clubs = {link_name: _random_generic_club_recommendations(k) for link_name in org_link_names}
+    else:
+        recommended_clubs = flask_exts.club_recommender.recommend_cards_many(org_link_names, k)
 
-    return club_obj
+    return {'results': recommended_clubs}
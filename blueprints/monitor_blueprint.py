@@ -10,6 +10,7 @@ from flask_csv import send_csv
 from flask_utils import validate_json, query_to_objects, role_required, mongo_aggregations, confirmed_account_required
 from flask_jwt_extended import jwt_required, jwt_refresh_token_required, get_jwt_identity, create_access_token, create_refresh_token, get_jti
 
+from init_app import flask_exts
 from app_config import CurrentConfig
 
 from models import *
@@ -389,6 +390,8 @@ def delete_club(email):
         raise JsonError(status='error', reason='The user does not exist!')
 
     user.delete()
+    flask_exts.catalog_snapshot.invalidate()
+
     return {'status': 'success'}
 
 
@@ -450,6 +453,7 @@ def add_tag():
     tag = Tag.objects(name=tag_name).first()
     if tag is None:
         Tag(id=new_tag_id, name=tag_name).save()
+        flask_exts.metadata_registry.invalidate('tags')
         return {'status': 'success'}
     else:
         raise JsonError(status='error', reason='Specified tag already exists!')
@@ -478,6 +482,7 @@ def edit_tag(tag_id):
 
     old_tag.name = new_tag_name
     old_tag.save()
+    flask_exts.metadata_registry.invalidate('tags')
     return {'status': 'success'}
 
 
@@ -503,4 +508,24 @@ def remove_tag(tag_id):
     else:
         tag = Tag.objects(id=int(tag_id)).first()
         tag.delete()
+        flask_exts.metadata_registry.invalidate('tags')
         return {'status': 'success'}
+
+
+@monitor_blueprint.route('/ready', methods=['GET'])
+@as_json
+def readiness_check():
+    """
+    GET endpoint that reports whether this process is ready to serve requests, along with the state of the similar
+    clubs recommender and how long booting took. It's public so that health checks can reach it, and it returns a
+    503 until a recommender model (even a degraded one) is being served.
+    """
+
+    recommender_status = flask_exts.club_recommender.status()
+    is_ready = recommender_status['state'] != 'empty'
+
+    return {
+        'ready': is_ready,
+        'recommender': recommender_status,
+        'boot_timings': flask_exts.boot_timings,
+    }, 200 if is_ready else 503
@@ -4,7 +4,7 @@ from passlib.hash import pbkdf2_sha512 as hash_manager
 
 from init_app import flask_exts
 from flask import Blueprint, request, g, make_response, jsonify
-from flask_json import as_json, JsonError
+from flask_json import JsonError
 from flask_utils import validate_json, query_to_objects, query_to_objects_full, role_required, confirmed_account_required
 from flask_jwt_extended import jwt_required, get_current_user
 
@@ -76,8 +76,13 @@ def _fetch_user_profile(user):
     if CurrentConfig.DEBUG:
         recommended_clubs = _random_smart_club_recommendations(3)
     else:
-        # TODO: Implement "smart" club recommendations.
-        recommended_clubs = _random_smart_club_recommendations(3)
+        recommended_clubs = flask_exts.student_recommender.recommend_cards(
+            str(user.id),
+            interests=[interest['id'] for interest in user_obj['interests']],
+            favorited_clubs=user.favorited_clubs,
+            visited_clubs=user.visited_clubs,
+            k=3
+        )
 
     return {
         'full_name': user.full_name,
@@ -202,9 +207,9 @@ def finish_register():
     if potential_user is not None:
         raise JsonError(status='error', reason='The student account for this email already exists!', status_=404)
 
-    potential_user.majors = Major.objects.filter(id__in=student_majors)
-    potential_user.minors = Minor.objects.filter(id__in=student_minors)
-    potential_user.interests = Tag.objects.filter(id__in=student_interests)
+    potential_user.majors = flask_exts.metadata_registry.get_many('majors', student_majors)
+    potential_user.minors = flask_exts.metadata_registry.get_many('minors', student_minors)
+    potential_user.interests = flask_exts.metadata_registry.get_many('tags', student_interests)
 
     potential_user.save()
 
@@ -281,33 +286,31 @@ def revoke_refresh():
 
 
 @student_blueprint.route('/majors', methods=['GET'])
-@as_json
 def get_majors():
     """
-    GET endpoint that fetches the set of majors in UC Berkeley.
+    GET endpoint that fetches the set of majors in UC Berkeley. It's served from memory with an ETag, so repeat
+    requests get a 304 (Not Modified) without touching the database.
     """
 
-    return query_to_objects(Major.objects.all())
+    return flask_exts.metadata_registry.respond('majors')
 
 
 @student_blueprint.route('/minors', methods=['GET'])
-@as_json
 def get_minors():
     """
-    GET endpoint that fetches the set of minors in UC Berkeley.
+    GET endpoint that fetches the set of minors in UC Berkeley, which is cached just like the majors.
     """
 
-    return query_to_objects(Minor.objects.all())
+    return flask_exts.metadata_registry.respond('minors')
 
 
 @student_blueprint.route('/years', methods=['GET'])
-@as_json
 def get_student_years():
     """
-    GET endpoint that fetches the set of student years.
+    GET endpoint that fetches the set of student years, which is cached just like the majors.
     """
 
-    return query_to_objects(StudentYear.objects.all())
+    return flask_exts.metadata_registry.respond('years')
 
 
 @student_blueprint.route('/profile', methods=['GET'])
@@ -340,9 +343,9 @@ def edit_profile():
     user = get_current_user()
     json = g.clean_json
 
-    user.majors = Major.objects.filter(id__in=json['majors'])
-    user.minors = Minor.objects.filter(id__in=json['minors'])
-    user.interests = Tag.objects.filter(id__in=json['interests'])
+    user.majors = flask_exts.metadata_registry.get_many('majors', json['majors'])
+    user.minors = flask_exts.metadata_registry.get_many('minors', json['minors'])
+    user.interests = flask_exts.metadata_registry.get_many('tags', json['interests'])
 
     user.save()
 
@@ -116,10 +116,10 @@ def register():
         name=club_name,
         link_name=slugify(club_name, max_length=70),
 
-        tags=Tag.objects.filter(id__in=club_tag_ids),
+        tags=flask_exts.metadata_registry.get_many('tags', club_tag_ids),
         app_required=app_required,
         new_members=new_members,
-        num_users=NumUsersTag.objects.filter(id=num_users_id).first(),
+        num_users=flask_exts.metadata_registry.get('num_user_tags', num_users_id),
 
         social_media_links=SocialMediaLinks(contact_email=club_email),
 
@@ -213,6 +213,8 @@ def confirm_email(token):
     potential_user.confirmed_on = confirmed_on
     potential_user.save()
 
+    flask_exts.catalog_snapshot.invalidate()
+
     return redirect(LOGIN_URL + LOGIN_CONFIRMED_EXT)
 
 
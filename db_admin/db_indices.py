@@ -86,5 +86,13 @@ ALL_INDICES = [
         'collection': 'new_base_user',
         'key': 'club.name',
         'name': 'club-name'
+    },
+    {
+        'collection': 'new_base_user',
+        'key': [
+            ('club.name', pymongo.ASCENDING),
+            ('_id', pymongo.ASCENDING),
+        ],
+        'name': 'club-name-and-id'
     }
 ]
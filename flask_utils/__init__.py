@@ -3,17 +3,24 @@ __all__ = [
     'validate_json', 'mongo_aggregations',
     'role_required', 'confirmed_account_required',
     'query_to_objects', 'query_to_objects_full',
+    'CatalogSnapshot', 'CATALOG_VIEW_FIELDS', 'fetch_catalog_clubs', 'fetch_catalog_club',
+    'CATALOG_VERSION_FIELDS', 'fetch_catalog_club_version',
+    'MetadataRegistry', 'METADATA_COLLECTIONS',
+    'PayloadCache', 'make_etag', 'cached_json_response', 'is_not_modified', 'not_modified_response',
+    'APIJSONEncoder', 'ORJSONEncoder', 'json_encoder_class', 'JSON_ENCODER_BACKENDS',
 ]
 
-import json
-
 from flask_utils.email_manager import EmailVerifier, EmailSender
 from flask_utils.image_manager import ImageManager
 from flask_utils.password_enforcer import PasswordEnforcer
 from flask_utils.schema_validator import validate_json
 from flask_utils.role_enforcer import role_required
 from flask_utils.confirm_enforcer import confirmed_account_required
+from flask_utils.catalog_queries import CATALOG_VIEW_FIELDS, fetch_catalog_clubs, fetch_catalog_club
+from flask_utils.catalog_queries import CATALOG_VERSION_FIELDS, fetch_catalog_club_version
+from flask_utils.catalog_snapshot import CatalogSnapshot
+from flask_utils.conditional_get import PayloadCache, make_etag, cached_json_response, is_not_modified, not_modified_response
+from flask_utils.metadata_registry import MetadataRegistry, METADATA_COLLECTIONS
+from flask_utils.json_encoder import APIJSONEncoder, ORJSONEncoder, json_encoder_class, JSON_ENCODER_BACKENDS
+from flask_utils.mongo_objects import query_to_objects, query_to_objects_full
 from flask_utils import mongo_aggregations
-
-query_to_objects = lambda query: json.loads(query.to_json())
-query_to_objects_full = lambda query: json.loads(query.to_json(follow_reference=True))
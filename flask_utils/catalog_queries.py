@@ -0,0 +1,91 @@
+import mongoengine as mongo
+
+from models import NewOfficerUser, NewClub
+from flask_utils.mongo_objects import son_to_object, raw_document_to_object
+
+# The club fields shown in the catalog
+CATALOG_VIEW_FIELDS = [
+    'club.name', 'club.link_name', 'club.about_us',
+    'club.tags', 'club.app_required', 'club.new_members', 'club.num_users',
+    'club.logo_url', 'club.banner_url', 'club.last_updated', 'club.apply_deadline_end', 'club.recruiting_end'
+]
+
+# The club fields that tell whether a club's page has changed (every edit of the club updates its last updated date)
+CATALOG_VERSION_FIELDS = ['club.last_updated', 'club.new_members']
+
+
+def _catalog_users():
+    """
+    Returns the query of the officers whose clubs are shown in the catalog, i.e the confirmed and reactivated ones.
+    """
+
+    return NewOfficerUser.objects \
+        .filter(confirmed=True) \
+        .filter(club__reactivated=True)
+
+
+def _raw_documents(query):
+    """
+    Returns the raw documents of a query as pymongo returns them, without instantiating any document.
+    """
+
+    return mongo.QuerySet.as_pymongo(query)
+
+
+def fetch_catalog_clubs():
+    """
+    Fetches the catalog info of every club in the catalog, sorted by name and then by ID, straight from pymongo.
+
+    Output: A tuple of the clubs' catalog info and their sort keys (name and ID), in the same order
+    """
+
+    query = _catalog_users() \
+        .only(*CATALOG_VIEW_FIELDS) \
+        .order_by('club.name', 'id')
+
+    clubs = []
+    sort_keys = []
+
+    for son in _raw_documents(query):
+        club = son_to_object(son['club'])
+
+        clubs += [club]
+        sort_keys += [(club['name'], str(son['_id']))]
+
+    return clubs, sort_keys
+
+
+def fetch_catalog_club(link_name):
+    """
+    Fetches all the information of a club in the catalog straight from pymongo, in the same shape as converting
+    the club's document (see 'raw_document_to_object').
+
+    Output: A dictionary with the club's information, or None if the club isn't in the catalog
+    """
+
+    son = _raw_documents(_catalog_users().filter(club__link_name=link_name).only('club')).first()
+    if son is None:
+        return None
+
+    return raw_document_to_object(NewClub, son['club'])
+
+
+def fetch_catalog_club_version(link_name):
+    """
+    Fetches the fields of a club in the catalog that tell whether its page has changed (see
+    'CATALOG_VERSION_FIELDS') straight from pymongo. It's a single indexed lookup of a couple of fields, so it's
+    cheap enough to run before every view of the club's page.
+
+    Output: A dictionary with the club's last updated date and whether it's accepting new members, or None if the
+    club isn't in the catalog
+    """
+
+    query = _catalog_users() \
+        .filter(club__link_name=link_name) \
+        .only(*CATALOG_VERSION_FIELDS)
+
+    son = _raw_documents(query).first()
+    if son is None:
+        return None
+
+    return son_to_object(son.get('club', {}))
@@ -0,0 +1,261 @@
+import re
+import bisect
+import collections
+
+import numpy as np
+
+# Words are runs of lowercase letters and digits
+TOKEN_REGEX = re.compile(r'[a-z0-9]+')
+
+# How much a word in a club's name counts, compared to a word in its about us
+NAME_WEIGHT = 3.0
+
+
+def _tokenize(text):
+    return TOKEN_REGEX.findall(text.lower()) if text else []
+
+
+def _reference_id(value):
+    """
+    Returns the ID of a referenced document (e.g a tag), whether it's serialized as its ID or as a document.
+    """
+
+    if isinstance(value, dict):
+        return value.get('id', value.get('_id'))
+    return value
+
+
+class CatalogSearchIndex:
+    """
+    This class is an in-memory inverted index over the catalog (see 'catalog_snapshot.py'), which supports searching
+    the clubs' names and about us by words or word prefixes, filtering by facets and ordering by relevance.
+
+    * The text index maps each word to the sorted rows of the clubs that contain it (its "posting list"), along with
+      a score per club. All the posting lists are stored back to back in a single array, ordered by word, so all the
+      words starting with a prefix are a single contiguous slice of it (found by binary search over the words).
+    * The facets (tags, application required, accepting new members and number of users) are stored as boolean
+      arrays (a matrix with a column per tag for the tags), so filters are combined with vectorized ANDs and ORs
+      and the number of results with each facet value is counted in a single pass (see 'facet_counts').
+
+    A club's score for a word grows with how often it appears (saturating quickly), counts NAME_WEIGHT times as
+    much in the name and is scaled by how rare the word is across clubs. Exact word matches count twice as much
+    as prefix matches. Clubs with the same score stay in catalog (name) order.
+
+    The index is never modified once built. When the catalog changes, a new index is built from the new catalog
+    and the previous index, which only re-tokenizes the clubs whose name or about us changed.
+
+    Example:
+
+    search_index = CatalogSearchIndex(catalog_snapshot.clubs())
+
+    clubs, num_clubs, facet_counts = search_index.search('robot', tags=[4, 7], new_members=True, skip=0, limit=20)
+    """
+
+    def __init__(self, clubs, previous_index = None):
+        """
+        Input:
+        * clubs - The catalog info of the clubs, in catalog order (see 'CatalogSnapshot.clubs')
+        * previous_index - The index of a previous version of the catalog, to reuse the unchanged clubs' words from
+        """
+
+        self.clubs = clubs
+        num_clubs = len(clubs)
+
+        # Step 1: Find the (weighted) words of each club, reusing the ones of clubs whose text hasn't changed
+        previous_club_words = previous_index.club_words if previous_index is not None else {}
+        self.club_words = {}
+
+        club_word_weights = []
+        for club in clubs:
+            text_key = (club.get('link_name'), club.get('name'), club.get('about_us'))
+
+            word_weights = previous_club_words.get(text_key)
+            if word_weights is None:
+                word_weights = self._word_weights(club)
+
+            self.club_words[text_key] = word_weights
+            club_word_weights += [word_weights]
+
+        # Step 2: Build the posting lists, by sorting every (word, club) pair by word and then by club
+        self.words = sorted(set(word for word_weights in club_word_weights for word in word_weights))
+        word_ids = {word: i for (i, word) in enumerate(self.words)}
+
+        num_pairs = sum(len(word_weights) for word_weights in club_word_weights)
+        pair_rows = np.repeat(np.arange(num_clubs, dtype=np.int32), [len(word_weights) for word_weights in club_word_weights])
+        pair_word_ids = np.fromiter((word_ids[word] for word_weights in club_word_weights for word in word_weights), dtype=np.int64, count=num_pairs)
+        pair_weights = np.fromiter((weight for word_weights in club_word_weights for weight in word_weights.values()), dtype=np.float32, count=num_pairs)
+
+        order = np.lexsort((pair_rows, pair_word_ids))
+        num_clubs_per_word = np.bincount(pair_word_ids, minlength=len(self.words))
+        inverse_frequencies = np.log1p(num_clubs / np.maximum(num_clubs_per_word, 1)).astype(np.float32)
+
+        self.word_offsets = np.concatenate([[0], np.cumsum(num_clubs_per_word)]).astype(np.int64)
+        self.posting_rows = pair_rows[order]
+        self.posting_scores = (pair_weights * inverse_frequencies[pair_word_ids])[order]
+
+        # Step 3: Build the facets
+        tag_rows = collections.defaultdict(list)
+        for (row, club) in enumerate(clubs):
+            for tag in club.get('tags') or []:
+                tag_rows[_reference_id(tag)] += [row]
+
+        self.tag_ids = sorted(tag_rows)
+        self.tag_columns = {tag_id: i for (i, tag_id) in enumerate(self.tag_ids)}
+        self.tag_membership = np.zeros((num_clubs, len(self.tag_ids)), dtype=bool)
+
+        for (tag_id, rows) in tag_rows.items():
+            self.tag_membership[rows, self.tag_columns[tag_id]] = True
+
+        self.app_required = np.array([bool(club.get('app_required')) for club in clubs], dtype=bool)
+        self.new_members = np.array([bool(club.get('new_members')) for club in clubs], dtype=bool)
+
+        # The "# of users" tag of each club, as the position of its ID in 'num_users_ids' (or -1 if it has none)
+        num_users = [_reference_id(club.get('num_users')) for club in clubs]
+        self.num_users_ids = sorted(set(value for value in num_users if value is not None))
+
+        num_users_columns = {num_users_id: i for (i, num_users_id) in enumerate(self.num_users_ids)}
+        self.num_users_columns = np.array([num_users_columns.get(value, -1) for value in num_users], dtype=np.int64)
+
+
+    def __len__(self):
+        return len(self.clubs)
+
+
+    @staticmethod
+    def _word_weights(club):
+        """
+        Returns the weight of each word of a club's name and about us, which saturates as a word repeats.
+        """
+
+        counts = collections.Counter()
+
+        for word in _tokenize(club.get('name')):
+            counts[word] += NAME_WEIGHT
+
+        for word in _tokenize(club.get('about_us')):
+            counts[word] += 1.0
+
+        return {word: count / (count + 1.0) for (word, count) in counts.items()}
+
+
+    def _word_scores(self, word):
+        """
+        Scores every club for a single query word, which matches all the words it's a prefix of.
+
+        Output: A float array with the score of each club, which is 0 for the clubs without any match
+        """
+
+        start = bisect.bisect_left(self.words, word)
+        end = bisect.bisect_left(self.words, word + '\uffff', start)
+
+        posting_start, posting_end = self.word_offsets[start], self.word_offsets[end]
+        scores = np.bincount(
+            self.posting_rows[posting_start:posting_end],
+            weights=self.posting_scores[posting_start:posting_end],
+            minlength=len(self)
+        )
+
+        # Exact matches count twice as much (i.e once more on top of matching as a prefix)
+        if start < end and self.words[start] == word:
+            posting_end = self.word_offsets[start + 1]
+            scores += np.bincount(
+                self.posting_rows[posting_start:posting_end],
+                weights=self.posting_scores[posting_start:posting_end],
+                minlength=len(self)
+            )
+
+        return scores
+
+
+    def filter_mask(self, tags = None, app_required = None, new_members = None, num_users = None):
+        """
+        Finds the clubs matching all the given facet filters. Filters that are None (or empty) aren't applied.
+
+        Input:
+        * tags - A list of tag IDs, of which a club needs to have at least one
+        * app_required - Whether a club requires an application
+        * new_members - Whether a club is accepting new members
+        * num_users - A list of "# of users" tag IDs, one of which a club needs to have
+
+        Output: A boolean array of which clubs match, in catalog order
+        """
+
+        mask = np.ones(len(self), dtype=bool)
+
+        if tags:
+            columns = [self.tag_columns[tag_id] for tag_id in set(tags) if tag_id in self.tag_columns]
+            mask &= np.any(self.tag_membership[:, columns], axis=1)
+
+        if app_required is not None:
+            mask &= self.app_required if app_required else ~self.app_required
+
+        if new_members is not None:
+            mask &= self.new_members if new_members else ~self.new_members
+
+        if num_users:
+            columns = [i for (i, num_users_id) in enumerate(self.num_users_ids) if num_users_id in set(num_users)]
+            mask &= np.isin(self.num_users_columns, columns)
+
+        return mask
+
+
+    def facet_counts(self, mask):
+        """
+        Counts how many of the given clubs have each facet value, e.g to show "Tech (42)" next to each tag filter.
+
+        Input:
+        * mask - A boolean array of which clubs to count (i.e the results of a search), in catalog order
+
+        Output: A dictionary with the counts of each tag and "# of users" tag (as lists of IDs and counts, including
+        the values no club has in the results) and the number of clubs that require an application and that are
+        accepting new members
+        """
+
+        tag_counts = np.count_nonzero(self.tag_membership[mask], axis=0)
+
+        num_users_columns = self.num_users_columns[mask]
+        num_users_counts = np.bincount(num_users_columns[num_users_columns >= 0], minlength=len(self.num_users_ids))
+
+        return {
+            'tags': [{'id': tag_id, 'count': int(count)} for (tag_id, count) in zip(self.tag_ids, tag_counts)],
+            'num_users': [{'id': num_users_id, 'count': int(count)} for (num_users_id, count) in zip(self.num_users_ids, num_users_counts)],
+            'app_required': int(np.count_nonzero(self.app_required & mask)),
+            'new_members': int(np.count_nonzero(self.new_members & mask)),
+        }
+
+
+    def search(self, query = '', tags = None, app_required = None, new_members = None, num_users = None, skip = 0, limit = 50):
+        """
+        Searches the catalog for the clubs that match every word of the query (as a word or a word prefix) and
+        all the facet filters (see 'filter_mask').
+
+        Input:
+        * query - The search text, where an empty query matches every club
+        * skip - The number of matching clubs to skip
+        * limit - The largest number of matching clubs to return, where 0 means no limit
+
+        Output: A tuple of the catalog info of the page's clubs, from most to least relevant (or in catalog order if
+        there's no query), the total number of matching clubs and the facet counts of all the matching clubs (see
+        'facet_counts')
+        """
+
+        mask = self.filter_mask(tags, app_required, new_members, num_users)
+        query_words = list(dict.fromkeys(_tokenize(query)))
+
+        if len(query_words) > 0:
+            scores = np.zeros(len(self), dtype=np.float64)
+
+            for word in query_words:
+                word_scores = self._word_scores(word)
+                mask &= word_scores > 0
+                scores += word_scores
+
+            rows = np.flatnonzero(mask)
+            rows = rows[np.argsort(-scores[rows], kind='stable')]
+        else:
+            rows = np.flatnonzero(mask)
+
+        skip = max(skip, 0)
+        end = skip + limit if limit > 0 else len(rows)
+
+        return [self.clubs[row] for row in rows[skip:end]], len(rows), self.facet_counts(mask)
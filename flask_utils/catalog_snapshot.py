@@ -0,0 +1,195 @@
+import json
+import time
+import base64
+import bisect
+import datetime
+import threading
+
+from flask_utils.catalog_search import CatalogSearchIndex
+from flask_utils.catalog_queries import fetch_catalog_clubs
+
+
+def encode_cursor(sort_key):
+    """
+    Encodes the sort key of a club (its name and ID) into an opaque cursor, which points right after that club.
+    """
+
+    return base64.urlsafe_b64encode(json.dumps(list(sort_key)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor made by 'encode_cursor' back into a sort key, or raises a ValueError if it's not valid.
+    """
+
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+
+    if not isinstance(sort_key, list) or len(sort_key) != 2 or not all(isinstance(value, str) for value in sort_key):
+        raise ValueError('Invalid cursor')
+
+    return tuple(sort_key)
+
+
+class CatalogSnapshot:
+    """
+    This class keeps an in-process snapshot of the catalog, i.e the catalog info of every confirmed and reactivated
+    club, sorted by name. The catalog is read far more often than it changes, so instead of querying (and counting)
+    the clubs for every page, a page is just a slice of the snapshot. The snapshot also provides a search index over
+    the same clubs (see 'catalog_search.py'), which is only built once it's searched.
+
+    Pages can also be fetched with cursors (see 'page_after'), which point right after the last club of the previous
+    page by its name and ID. Unlike offsets, they don't skip or repeat clubs when clubs are added or removed in
+    between pages. The clubs are sorted by name and then by ID, which the 'club-name-and-id' index covers.
+
+    The snapshot is rebuilt on the next read after it's invalidated, which is done by every request that can change
+    a club's catalog info in this process. Since each process (e.g each gunicorn worker) has its own snapshot, it's
+    also rebuilt once it's older than 'max_age', so that changes made through other processes show up eventually.
+
+    Example:
+
+    catalog_snapshot = CatalogSnapshot(max_age=datetime.timedelta(minutes=1))
+
+    clubs, num_clubs, next_cursor = catalog_snapshot.page(skip=0, limit=50)
+    clubs, num_clubs, next_cursor = catalog_snapshot.page_after(next_cursor, limit=50)
+    clubs, num_clubs, facet_counts = catalog_snapshot.search_index().search('robot', tags=[4], skip=0, limit=50)
+
+    ...
+
+    # After a club's profile was edited
+    catalog_snapshot.invalidate()
+    """
+
+    def __init__(self, max_age = datetime.timedelta(minutes=1)):
+        """
+        Input:
+        * max_age - How long the snapshot is used for before being rebuilt, even if it wasn't invalidated
+        """
+
+        self.max_age_secs = max_age.total_seconds()
+
+        self._catalog = None
+        self._built_at = None
+        self._built_generation = None
+        self._generation = 0
+        self._refresh_lock = threading.Lock()
+
+        self._search_index = None
+
+
+    def _fetch_clubs(self):
+        """
+        Fetches the catalog info of every confirmed and reactivated club, sorted by name and then by ID.
+
+        Output: A tuple of the clubs' catalog info and their sort keys (name and ID), in the same order
+        """
+
+        return fetch_catalog_clubs()
+
+
+    def _is_fresh(self):
+        return self._catalog is not None and self._built_generation == self._generation \
+            and time.monotonic() - self._built_at < self.max_age_secs
+
+
+    def invalidate(self):
+        """
+        Marks the snapshot as outdated, so that it's rebuilt on the next read. A rebuild that's already running
+        when this is called doesn't count as fresh either, since it may have missed the change.
+        """
+
+        self._generation += 1
+
+
+    def _current_catalog(self):
+        """
+        Returns the clubs and their sort keys, while rebuilding the snapshot first if needed. Only one thread
+        rebuilds it at a time, and the others wait for it instead of querying the clubs again.
+        """
+
+        if not self._is_fresh():
+            with self._refresh_lock:
+                if not self._is_fresh():
+                    generation = self._generation
+                    built_at = time.monotonic()
+
+                    self._catalog = self._fetch_clubs()
+                    self._built_at = built_at
+                    self._built_generation = generation
+
+        return self._catalog
+
+
+    def clubs(self):
+        """
+        Returns the catalog info of all the clubs, sorted by name.
+
+        Note that the returned list (and its clubs) is shared, so it must not be modified.
+        """
+
+        return self._current_catalog()[0]
+
+
+    def page(self, skip, limit):
+        """
+        Returns a page of the catalog.
+
+        Input:
+        * skip - The number of clubs to skip
+        * limit - The largest number of clubs to return, where 0 means no limit
+
+        Output: A tuple of the catalog info of the page's clubs, the total number of clubs and the cursor of the next
+        page (or None if it's the last page)
+        """
+
+        clubs, sort_keys = self._current_catalog()
+
+        skip = min(max(skip, 0), len(clubs))
+        end = min(skip + abs(limit), len(clubs)) if limit != 0 else len(clubs)
+
+        return clubs[skip:end], len(clubs), self._next_cursor(sort_keys, end)
+
+
+    def page_after(self, cursor, limit):
+        """
+        Returns the page of the catalog that starts right after the given cursor, which is found by binary search.
+
+        Input:
+        * cursor - The cursor returned with the previous page, or None for the first page
+        * limit - The largest number of clubs to return, where 0 means no limit
+
+        Output: Same as 'page'. A ValueError is raised if the cursor isn't valid.
+        """
+
+        clubs, sort_keys = self._current_catalog()
+
+        start = bisect.bisect_right(sort_keys, decode_cursor(cursor)) if cursor is not None else 0
+        end = min(start + abs(limit), len(clubs)) if limit != 0 else len(clubs)
+
+        return clubs[start:end], len(clubs), self._next_cursor(sort_keys, end)
+
+
+    def _next_cursor(self, sort_keys, end):
+        return encode_cursor(sort_keys[end - 1]) if 0 < end < len(sort_keys) else None
+
+
+    def search_index(self):
+        """
+        Returns the search index over the current snapshot's clubs. When the snapshot was rebuilt since the index
+        was last built, a new index is built from the previous one (see 'CatalogSearchIndex').
+        """
+
+        clubs = self.clubs()
+
+        search_index = self._search_index
+        if search_index is None or search_index.clubs is not clubs:
+            with self._refresh_lock:
+                search_index = self._search_index
+
+                if search_index is None or search_index.clubs is not clubs:
+                    search_index = CatalogSearchIndex(clubs, previous_index=search_index)
+                    self._search_index = search_index
+
+        return search_index
@@ -0,0 +1,144 @@
+import json
+import time
+import hashlib
+import datetime
+import threading
+
+from flask import request, Response
+from flask_json import json_response
+from werkzeug.http import is_resource_modified, quote_etag
+
+
+def make_etag(*parts):
+    """
+    Computes a strong ETag out of anything JSON-serializable (e.g a payload or the version info of a resource),
+    which is the same in every process for the same parts.
+    """
+
+    serialized = json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:32]
+
+
+def _cache_headers(etag, cache_control):
+    return {'ETag': quote_etag(etag), 'Cache-Control': cache_control}
+
+
+def is_not_modified(etag):
+    """
+    Checks whether the client already has the current version of a resource, per the request's 'If-None-Match'
+    header. Only GET and HEAD requests can be answered this way.
+
+    There's no 'Last-Modified' date to compare 'If-Modified-Since' with, since the ETags are content hashes and
+    every process would only know when it fetched the resource, not when it changed.
+    """
+
+    if request.method not in ('GET', 'HEAD'):
+        return False
+
+    return not is_resource_modified(request.environ, etag=etag)
+
+
+def not_modified_response(etag, cache_control = 'no-cache'):
+    """
+    Returns an empty 304 (Not Modified) response, along with the resource's caching headers.
+    """
+
+    return Response(status=304, headers=_cache_headers(etag, cache_control))
+
+
+def cached_json_response(payload, etag, cache_control = 'no-cache'):
+    """
+    Returns a JSON response of the payload along with its caching headers, or a 304 (Not Modified) response if
+    the client already has this version of it.
+
+    Input:
+    * payload - The JSON-serializable payload
+    * etag - The (unquoted) ETag of the payload, see 'make_etag'
+    * cache_control - The 'Cache-Control' header, which defaults to making clients revalidate every time
+    """
+
+    if is_not_modified(etag):
+        return not_modified_response(etag, cache_control)
+
+    return json_response(data_=payload, headers_=_cache_headers(etag, cache_control))
+
+
+class PayloadCache:
+    """
+    This class caches the JSON payloads of endpoints whose data rarely changes (e.g the list of tags), so that
+    they're served from memory and repeat requests are answered with a 304 (Not Modified) without touching the
+    database. Each payload's ETag is a hash of its content, so it's the same across processes.
+
+    A payload is fetched again once it's older than 'max_age' or after it's invalidated (e.g when a tag is
+    added), which only changes its ETag if its content actually changed.
+
+    Example:
+
+    payload_cache = PayloadCache(max_age=datetime.timedelta(minutes=5))
+
+    @catalog_blueprint.route('/tags', methods=['GET'])
+    def get_tags():
+        return payload_cache.respond('tags', lambda: query_to_objects(Tag.objects.all()))
+
+    ...
+
+    # After a tag was added
+    payload_cache.invalidate('tags')
+    """
+
+    def __init__(self, max_age = datetime.timedelta(minutes=5), client_max_age = datetime.timedelta(minutes=5)):
+        """
+        Input:
+        * max_age - How long a payload is served from memory before being fetched again
+        * client_max_age - How long browsers and CDNs can reuse a payload without revalidating it
+        """
+
+        self.max_age_secs = max_age.total_seconds()
+        self.cache_control = f'public, max-age={int(client_max_age.total_seconds())}'
+
+        self._entries = {}
+        self._lock = threading.Lock()
+
+
+    def invalidate(self, key):
+        """
+        Makes the next request for the given payload fetch it again.
+        """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = dict(entry, fetched_at=None)
+
+
+    def get(self, key, fetch_func):
+        """
+        Returns the cached payload under the given key, fetching it first if needed.
+
+        Output: A dictionary with the 'payload' and its 'etag'
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None and entry['fetched_at'] is not None \
+                and time.monotonic() - entry['fetched_at'] < self.max_age_secs:
+            return entry
+
+        fetched_at = time.monotonic()
+        payload = fetch_func()
+        etag = make_etag(payload)
+
+        entry = {'payload': payload, 'etag': etag, 'fetched_at': fetched_at}
+
+        with self._lock:
+            self._entries[key] = entry
+
+        return entry
+
+
+    def respond(self, key, fetch_func):
+        """
+        Returns the response for a request of the given payload (see 'cached_json_response').
+        """
+
+        entry = self.get(key, fetch_func)
+        return cached_json_response(entry['payload'], entry['etag'], self.cache_control)
@@ -0,0 +1,219 @@
+import re
+import decimal
+import itertools
+
+import bson
+from flask_json import JSONEncoderEx
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The JSON encoders that can serialize the responses, where 'auto' picks orjson if it's installed
+JSON_ENCODER_BACKENDS = ['auto', 'orjson', 'stdlib']
+
+# The range of floats that the standard library writes without an exponent, and orjson writes the same way
+_MIN_PLAIN_FLOAT = 1e-4
+_MAX_PLAIN_FLOAT = 1e16
+
+# The types of the values the floats are looked for in, where the scalars can't have any float in them
+_FLOAT_TYPES = {float}
+_DICT_TYPES = {dict}
+_SEQUENCE_TYPES = {list, tuple}
+_SCALAR_TYPES = {str, int, bool, type(None)}
+_KNOWN_TYPES = _FLOAT_TYPES | _DICT_TYPES | _SEQUENCE_TYPES | _SCALAR_TYPES
+
+# The characters outside the Basic Multilingual Plane escaped by the 'backslashreplace' error handler, e.g '\U0001f600'
+_ASTRAL_ESCAPE_REGEX = re.compile(rb'\\U([0-9a-f]{8})')
+
+
+def _is_unmatched_float(value):
+    return value != 0.0 and not _MIN_PLAIN_FLOAT <= abs(value) < _MAX_PLAIN_FLOAT
+
+
+def _base_value(value):
+    """
+    Converts a value whose type is a subclass of a float, a dictionary or a sequence (e.g mongoengine's 'BaseDict'
+    and 'BaseList') into its base type, or into None if it's any other type (which is left to 'default').
+    """
+
+    if type(value) in _KNOWN_TYPES:
+        return value
+    elif isinstance(value, float):
+        return float(value)
+    elif isinstance(value, dict):
+        return dict(value)
+    elif isinstance(value, (list, tuple)):
+        return list(value)
+
+    return None
+
+
+def _has_unmatched_floats(value):
+    """
+    Checks whether a value has any float that orjson doesn't write the same way as the standard library, i.e NaN,
+    infinity (which orjson writes as null) and the floats written with an exponent (e.g 1e-05 or 1e+16).
+
+    Since it runs before every response, it goes through the value one level of nesting at a time, where the values
+    of a level are sorted by type and gathered with the built-in functions, so that only the floats are looked at
+    one by one.
+    """
+
+    stack = [[value]]
+
+    while stack:
+        values = stack.pop()
+
+        value_types = set(map(type, values))
+        if value_types <= _SCALAR_TYPES:
+            continue
+
+        if not value_types <= _KNOWN_TYPES:
+            values = list(map(_base_value, values))
+            value_types = set(map(type, values))
+
+        if float in value_types:
+            floats = itertools.compress(values, map(_FLOAT_TYPES.__contains__, map(type, values)))
+            if any(map(_is_unmatched_float, floats)):
+                return True
+
+        if dict in value_types:
+            dicts = values if value_types == _DICT_TYPES \
+                else itertools.compress(values, map(_DICT_TYPES.__contains__, map(type, values)))
+            stack.append(list(itertools.chain.from_iterable(map(dict.values, dicts))))
+
+        if not value_types.isdisjoint(_SEQUENCE_TYPES):
+            sequences = values if value_types <= _SEQUENCE_TYPES \
+                else itertools.compress(values, map(_SEQUENCE_TYPES.__contains__, map(type, values)))
+            stack.append(list(itertools.chain.from_iterable(sequences)))
+
+    return False
+
+
+def _astral_escape_to_surrogates(match):
+    code = int(match.group(1), 16) - 0x10000
+    return b'\\u%04x\\u%04x' % (0xd800 | (code >> 10), 0xdc00 | (code & 0x3ff))
+
+
+def _escape_non_ascii(encoded):
+    """
+    Escapes the non-ASCII characters (and DEL) of a JSON output the same way the standard library does, i.e as
+    '\\u' escapes, with surrogate pairs for the characters outside the Basic Multilingual Plane.
+
+    The escaped backslashes are set aside as NUL characters (which are always escaped in JSON) first, so that the
+    only '\\x' and '\\U' escapes left are the ones of the 'backslashreplace' error handler.
+
+    Output: The escaped output, as a string
+    """
+
+    text = encoded.replace(b'\\\\', b'\x00').replace(b'\x7f', b'\\u007f').decode('utf-8')
+    escaped = text.encode('ascii', 'backslashreplace').replace(b'\\x', b'\\u00')
+
+    if b'\\U' in escaped:
+        escaped = _ASTRAL_ESCAPE_REGEX.sub(_astral_escape_to_surrogates, escaped)
+
+    return escaped.replace(b'\x00', b'\\\\').decode('ascii')
+
+
+class APIJSONEncoder(JSONEncoderEx):
+    """
+    This is the JSON encoder of every response (i.e 'jsonify', '@as_json', 'json_response' and the 'JsonError'
+    handlers), with the standard library's 'json' module. On top of what 'flask_json' supports (e.g datetimes as
+    ISO 8601 strings), ObjectIds become strings, like in the documents converted by 'query_to_objects'.
+
+    NOTE: Decimals become numbers (i.e floats), like in the documents saved by mongoengine's 'DecimalField'. This
+    is a deliberate change, since serializing a decimal used to raise a TypeError.
+    """
+
+    def default(self, o):
+        if isinstance(o, bson.ObjectId):
+            return str(o)
+        elif isinstance(o, decimal.Decimal):
+            return float(o)
+
+        return super().default(o)
+
+
+class ORJSONEncoder(APIJSONEncoder):
+    """
+    Same as 'APIJSONEncoder', except that compact responses (i.e when the app isn't in debug mode) are serialized
+    by orjson, which is several times faster on large payloads like a club's page or the catalog. The output is
+    byte for byte the same as with the standard library:
+
+    * Datetimes, dataclasses and anything orjson doesn't support natively go through 'default', so that they're
+      converted the exact same way.
+    * The keys are sorted, and non-ASCII characters are escaped like the standard library does (unless
+      'JSON_AS_ASCII' is off).
+    * Payloads orjson can't serialize the same way are serialized by the standard library instead, which also raises
+      the same errors as before for the payloads that aren't serializable at all. These are the payloads with
+      non-string keys (which the standard library converts and sorts by their original value), integers that
+      don't fit in 64 bits, and floats that are NaN, infinite or written with an exponent (see
+      '_has_unmatched_floats').
+
+    Example:
+
+    app.json_encoder = json_encoder_class(app.config['JSON_ENCODER_BACKEND'])
+
+    ...
+
+    @catalog_blueprint.route('/organizations/<org_link_name>', methods=['GET'])
+    @as_json
+    def get_org_by_id(org_link_name):
+        return fetch_catalog_club(org_link_name)
+    """
+
+    def _orjson_default(self, o):
+        value = self.default(o)
+
+        # Makes orjson give up, so that the payload is serialized by the standard library
+        if _has_unmatched_floats(value):
+            raise TypeError('The float can\'t be serialized the same way as the standard library')
+
+        return value
+
+
+    def encode(self, o):
+        if self.indent is not None or self.skipkeys or (self.item_separator, self.key_separator) != (',', ':'):
+            return super().encode(o)
+
+        if _has_unmatched_floats(o):
+            return super().encode(o)
+
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+
+        try:
+            encoded = orjson.dumps(o, default=self._orjson_default, option=options)
+        except orjson.JSONEncodeError:
+            return super().encode(o)
+
+        # orjson writes non-ASCII characters (and DEL) as they are, which can only appear inside strings
+        if self.ensure_ascii and (not encoded.isascii() or b'\x7f' in encoded):
+            return _escape_non_ascii(encoded)
+
+        return encoded.decode('utf-8')
+
+
+def json_encoder_class(backend = 'auto'):
+    """
+    Returns the JSON encoder class of the given backend, to be set as the app's 'json_encoder'.
+
+    Input:
+    * backend - One of JSON_ENCODER_BACKENDS, where 'auto' is orjson if it's installed and the standard library
+      otherwise
+
+    Output: 'ORJSONEncoder' or 'APIJSONEncoder'
+    """
+
+    if backend not in JSON_ENCODER_BACKENDS:
+        raise Exception(f'Invalid JSON encoder backend: "{backend}"')
+
+    if backend == 'orjson' and orjson is None:
+        raise Exception('The "orjson" JSON encoder backend requires the orjson package')
+
+    if backend != 'stdlib' and orjson is not None:
+        return ORJSONEncoder
+
+    return APIJSONEncoder
@@ -0,0 +1,162 @@
+import datetime
+
+from models import Tag, NumUsersTag, Major, Minor, StudentYear
+from flask_utils.conditional_get import PayloadCache
+from flask_utils.mongo_objects import query_to_objects
+
+# The metadata collections, by key, along with the field that names each of their entries
+METADATA_COLLECTIONS = {
+    'tags': (Tag, 'name'),
+    'num_user_tags': (NumUsersTag, 'value'),
+    'majors': (Major, 'major'),
+    'minors': (Minor, 'minor'),
+    'years': (StudentYear, 'year'),
+}
+
+
+class MetadataRegistry:
+    """
+    This class keeps the metadata collections (tags, "# of users" tags, majors, minors and student years) in memory,
+    indexed by ID and by name. They're tiny and rarely change, so the endpoints that list them and the profile
+    edits that reference them (e.g setting a club's tags) are served without querying the database.
+
+    Each collection is loaded on its first use, and its JSON payload is served with an ETag (see 'PayloadCache').
+    It's loaded again once it's older than 'max_age' or after it's invalidated, which is done by the endpoints
+    that edit it in this process. Since each process has its own registry, 'max_age' also bounds how long a change
+    made through another process takes to show up in the payloads. The lookups by ID or name don't wait that long:
+    if an entry isn't found (e.g a tag that was just added through another process), the collection is loaded
+    again right away before giving up on it.
+
+    Example:
+
+    metadata_registry = MetadataRegistry(max_age=datetime.timedelta(minutes=5))
+
+    club.tags = metadata_registry.get_many('tags', [1, 4])
+    club.num_users = metadata_registry.get('num_user_tags', 2)
+
+    @catalog_blueprint.route('/tags', methods=['GET'])
+    def get_tags():
+        return metadata_registry.respond('tags')
+
+    ...
+
+    # After a tag was added
+    metadata_registry.invalidate('tags')
+    """
+
+    def __init__(self, max_age = datetime.timedelta(minutes=5), client_max_age = datetime.timedelta(minutes=5)):
+        """
+        Input:
+        * max_age - How long a collection is used for before being loaded again, even if it wasn't invalidated
+        * client_max_age - How long browsers and CDNs can reuse a collection's payload without revalidating it
+        """
+
+        self._payload_cache = PayloadCache(max_age=max_age, client_max_age=client_max_age)
+        self._indices = {}
+
+
+    @staticmethod
+    def _fetch(key):
+        document_class, _ = METADATA_COLLECTIONS[key]
+        return query_to_objects(document_class.objects.all())
+
+
+    def _index(self, key):
+        """
+        Returns the documents of the given collection along with their indices by ID and by name, which are
+        rebuilt whenever the collection is loaded again.
+        """
+
+        entry = self._payload_cache.get(key, lambda: self._fetch(key))
+
+        index = self._indices.get(key)
+        if index is None or index['entry'] is not entry:
+            document_class, name_field = METADATA_COLLECTIONS[key]
+            documents = [document_class(**obj) for obj in entry['payload']]
+
+            index = {
+                'entry': entry,
+                'documents': documents,
+                'by_id': {document.id: document for document in documents},
+                'by_name': {getattr(document, name_field): document for document in documents},
+            }
+            self._indices[key] = index
+
+        return index
+
+
+    def _index_with(self, key, index_key, values):
+        """
+        Same as '_index', except that the collection is loaded again if any of the given values (e.g IDs) is missing
+        from the given index (e.g 'by_id'), in case it was added since the collection was loaded.
+        """
+
+        index = self._index(key)
+
+        if any(value not in index[index_key] for value in values if value is not None):
+            self.invalidate(key)
+            index = self._index(key)
+
+        return index
+
+
+    def invalidate(self, key):
+        """
+        Makes the next use of the given collection load it again.
+        """
+
+        self._payload_cache.invalidate(key)
+
+
+    def payload(self, key):
+        """
+        Returns the JSON payload of the given collection, i.e all of its entries.
+
+        Note that the returned list is shared, so it must not be modified.
+        """
+
+        return self._index(key)['entry']['payload']
+
+
+    def respond(self, key):
+        """
+        Returns the response for a request of the given collection's payload, which is a 304 (Not Modified) if the
+        client already has its current version (see 'cached_json_response').
+        """
+
+        return self._payload_cache.respond(key, lambda: self._fetch(key))
+
+
+    def all(self, key):
+        """
+        Returns the documents of the given collection, in the same order as in the database.
+        """
+
+        return list(self._index(key)['documents'])
+
+
+    def get(self, key, id):
+        """
+        Returns the document with the given ID from the given collection, or None if it doesn't exist.
+        """
+
+        return self._index_with(key, 'by_id', [id])['by_id'].get(id)
+
+
+    def get_by_name(self, key, name):
+        """
+        Returns the document with the given name (e.g a tag's name or a major) from the given collection, or None if
+        it doesn't exist.
+        """
+
+        return self._index_with(key, 'by_name', [name])['by_name'].get(name)
+
+
+    def get_many(self, key, ids):
+        """
+        Returns the documents with any of the given IDs from the given collection, in the same order as in the
+        database. IDs that don't exist are skipped, just like with an 'id__in' query.
+        """
+
+        ids = set(ids)
+        return [document for document in self._index_with(key, 'by_id', ids)['documents'] if document.id in ids]
@@ -0,0 +1,268 @@
+import json
+import uuid
+import datetime
+
+import bson
+import mongoengine as mongo
+from mongoengine.base import get_document
+from mongoengine_goodjson.document import Helper as GoodJSONHelper
+from mongoengine_goodjson.encoder import GoodJSONEncoder
+
+# The types that are already JSON-ready as they are
+_JSON_SCALAR_TYPES = (str, int, float, bool, type(None))
+
+# How many levels of references 'query_to_objects_full' follows, same as 'mongoengine_goodjson'
+MAX_REFERENCE_DEPTH = 3
+
+
+def _json_key(key):
+    """
+    Converts a dictionary key the same way 'json.dumps' does, i.e strings stay as they are while numbers, booleans
+    and None become their JSON representation.
+    """
+
+    return key if type(key) is str else json.dumps(key)
+
+
+def son_to_object(value):
+    """
+    Converts a raw MongoDB value (e.g a document returned by pymongo or by 'to_mongo') into a JSON-ready value, the
+    same way 'mongoengine_goodjson' serializes it: ObjectIds and UUIDs become strings and datetimes become ISO 8601
+    strings. The rarer BSON types (e.g binary data or DBRefs) are converted by the 'mongoengine_goodjson' encoder
+    itself.
+    """
+
+    if type(value) in _JSON_SCALAR_TYPES:
+        return value
+    elif isinstance(value, dict):
+        return {_json_key(key): son_to_object(item) for (key, item) in value.items()}
+    elif isinstance(value, (list, tuple)):
+        return [son_to_object(item) for item in value]
+    elif isinstance(value, datetime.datetime):
+        return value.isoformat()
+    elif isinstance(value, (bson.ObjectId, uuid.UUID)):
+        return str(value)
+    elif isinstance(value, _JSON_SCALAR_TYPES):
+        return value
+
+    # Wrapped in a list, so that the encoder converts it like any nested value
+    return json.loads(json.dumps([value], cls=GoodJSONEncoder))[0]
+
+
+def _with_id_last(obj):
+    """
+    Renames the '_id' key of a raw document to 'id', as its last key.
+    """
+
+    renamed = {key: value for (key, value) in obj.items() if key != '_id'}
+    renamed['id'] = obj['_id']
+    return renamed
+
+
+def _rename_field_ids(field, value):
+    """
+    Renames the '_id' key of a raw field value to 'id' if it's a document (or a list of them) without an 'id' key,
+    the same way 'mongoengine_goodjson' does for the fields of queried documents.
+    """
+
+    if isinstance(field, mongo.ListField):
+        return [_rename_field_ids(field.field, item) for item in value]
+
+    if isinstance(value, dict) and 'id' not in value and '_id' in value:
+        return _with_id_last(value)
+
+    return value
+
+
+def _queryset_to_objects(queryset):
+    """
+    Converts the raw documents of a queryset, with their '_id' renamed to 'id' (see '_rename_field_ids').
+    """
+
+    fields = queryset._document._fields
+    objs = []
+
+    for son in mongo.QuerySet.as_pymongo(queryset):
+        obj = {}
+
+        for (key, value) in son.items():
+            if key != '_id':
+                field = fields.get(key)
+                obj[_json_key(key)] = son_to_object(_rename_field_ids(field, value) if field is not None else value)
+
+        obj['id'] = son_to_object(son['_id'])
+        objs += [obj]
+
+    return objs
+
+
+def _referenced_object(field, document, max_depth, current_depth):
+    """
+    Converts a referenced (or embedded) document while following its own references, after fetching it if it's
+    only a DBRef.
+    """
+
+    if isinstance(document, bson.DBRef):
+        document = field.document_type.objects(id=document.id).get()
+
+    if issubclass(field.document_type, GoodJSONHelper):
+        return _document_to_object(document, True, max_depth, current_depth + 1)
+
+    # Documents that don't use 'mongoengine_goodjson' are converted as they're stored, with their '_id' as 'id'
+    son = document.to_mongo()
+    if '_id' in son:
+        son = dict(id=son['_id'], **{key: value for (key, value) in son.items() if key not in ('_id', 'id')})
+
+    return son_to_object(son)
+
+
+def _followed_references(document, son, max_depth, current_depth):
+    """
+    Converts every reference (and embedded document) field of a document, including lists and dictionaries of them.
+
+    Output: A dictionary from the field names to their converted values
+    """
+
+    followed = {}
+
+    for name in document:
+        field = document._fields.get(name)
+        is_list = isinstance(field, mongo.ListField)
+        is_dict = isinstance(field, mongo.DictField)
+        target = field.field if is_list or is_dict else field
+
+        if not isinstance(target, (mongo.ReferenceField, mongo.EmbeddedDocumentField)):
+            continue
+
+        if is_list:
+            followed[name] = [
+                _referenced_object(target, item, max_depth, current_depth)
+                for item in getattr(document, name, [])
+            ]
+        elif is_dict:
+            followed[name] = {
+                key: _referenced_object(target, item, max_depth, current_depth)
+                for (key, item) in getattr(document, name).items()
+            }
+        else:
+            try:
+                item = getattr(document, name, None)
+            except mongo.DoesNotExist:
+                item = target.document_type.objects(id=son.get(name)).get()
+
+            if item:
+                followed[name] = _referenced_object(target, item, max_depth, current_depth)
+
+    return followed
+
+
+def _shaped_son(document_class, son):
+    """
+    Reshapes a raw document the same way loading it into the given document class and saving it back with
+    'to_mongo' would: its fields are put in the class' order (after its '_cls' if it's inherited), missing fields
+    get their default values (or None if they're nullable) and unknown keys are left out.
+    """
+
+    if document_class._meta.get('allow_inheritance'):
+        document_class = get_document(son.get('_cls', document_class._class_name))
+
+    shaped = {'_cls': document_class._class_name}
+
+    for name in document_class._fields_ordered:
+        field = document_class._fields[name]
+        value = son.get(field.db_field)
+
+        if value is not None:
+            value = _shaped_field_value(field, value)
+        elif not field.null and field.default is not None:
+            value = field.to_mongo(field.default() if callable(field.default) else field.default)
+
+        if value is not None or field.null:
+            shaped[field.db_field] = value
+
+    # Only inherited documents keep their class name, even if it's one of their fields
+    if not document_class._meta.get('allow_inheritance'):
+        del shaped['_cls']
+
+    return shaped
+
+
+def _shaped_field_value(field, value):
+    if isinstance(field, mongo.EmbeddedDocumentField) and isinstance(value, dict):
+        return _shaped_son(field.document_type, value)
+    elif isinstance(field, mongo.ListField) and field.field is not None and isinstance(value, list):
+        return [_shaped_field_value(field.field, item) for item in value]
+
+    return value
+
+
+def _document_to_object(document, follow_reference, max_depth, current_depth):
+    son = document.to_mongo(use_db_field=True)
+
+    followed = {}
+    if follow_reference and not (0 < (max_depth or 0) <= current_depth):
+        followed = _followed_references(document, son, max_depth, current_depth)
+
+    return _son_to_document_object(son, followed)
+
+
+def _son_to_document_object(son, followed):
+    # The ID comes first, and the referenced fields replace the raw ones (or come last if they weren't set)
+    obj = {}
+    if '_id' in son or 'id' in son:
+        obj['id'] = followed['id'] if 'id' in followed else son_to_object(son['id'] if 'id' in son else son['_id'])
+
+    for (key, value) in son.items():
+        if key not in ('_id', 'id'):
+            obj[_json_key(key)] = followed[key] if key in followed else son_to_object(value)
+
+    for (key, value) in followed.items():
+        if key not in obj:
+            obj[key] = value
+
+    return obj
+
+
+def query_to_objects(query):
+    """
+    Converts a queryset or a (possibly embedded) document into JSON-ready dictionaries in a single pass, which is
+    the same output as serializing it with 'mongoengine_goodjson' and parsing the JSON back (i.e
+    'json.loads(query.to_json())'): the '_id' of each document is renamed to 'id', ObjectIds become strings,
+    datetimes become ISO 8601 strings and everything else (e.g the '_cls' of inherited documents) is kept as is.
+
+    Input:
+    * query - A queryset, or a document
+
+    Output: A list of dictionaries for a queryset, or a dictionary for a document
+    """
+
+    if isinstance(query, mongo.QuerySet):
+        return _queryset_to_objects(query)
+
+    return _document_to_object(query, False, MAX_REFERENCE_DEPTH, 0)
+
+
+def raw_document_to_object(document_class, son):
+    """
+    Converts a raw document, as returned by pymongo (or 'as_pymongo'), into the same JSON-ready dictionary as
+    'query_to_objects' gives for it once it's loaded into the given document class, but without instantiating any
+    document (see '_shaped_son'). Its references aren't followed.
+
+    Input:
+    * document_class - The class of the document (e.g 'NewClub'), which can be embedded
+    * son - The raw document
+
+    Output: A dictionary
+    """
+
+    return _son_to_document_object(_shaped_son(document_class, son), {})
+
+
+def query_to_objects_full(query):
+    """
+    Same as 'query_to_objects' for a document, except that its references are followed (up to MAX_REFERENCE_DEPTH
+    levels), i.e the referenced documents are included instead of their IDs, like with
+    'json.loads(query.to_json(follow_reference=True))'.
+    """
+
+    return _document_to_object(query, True, MAX_REFERENCE_DEPTH, 0)
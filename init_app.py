@@ -3,6 +3,7 @@ This file contains the setup process for the Flask app, by initializing and atta
 """
 
 import os
+import time
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -20,9 +21,10 @@ from scout_apm.flask import ScoutApm
 from flask_compress import Compress
 
 from app_config import CurrentConfig
-from flask_utils import EmailVerifier, EmailSender, ImageManager, PasswordEnforcer
+from flask_utils import EmailVerifier, EmailSender, ImageManager, PasswordEnforcer, CatalogSnapshot, MetadataRegistry, \
+    json_encoder_class
 
-from recommenders import ClubRecommender
+from recommenders import ClubRecommender, StudentRecommender
 
 import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
@@ -65,12 +67,18 @@ class FlaskExtensions(object):
     """
 
     def __init__(self, app):
+        init_start = time.perf_counter()
+
         self.cors = CORS(app)
         self.talisman = Talisman(app)
         self.jwt = JWTManager(app)
         self.email_sender = EmailSender(app)
         self.email_verifier = EmailVerifier(app)
         self.json = FlaskJSON(app)
+
+        # Serialize every JSON response with orjson if it's installed, which is much faster on large payloads
+        app.json_encoder = json_encoder_class(app.config['JSON_ENCODER_BACKEND'])
+
         self.img_manager = ImageManager(app)
         self.password_checker = PasswordEnforcer()
         self.scout_apm = ScoutApm(app)
@@ -81,8 +89,25 @@ class FlaskExtensions(object):
         self.mongo = mongo
         self.mongo.connect(host=os.getenv('MONGO_URI'))
 
-        self.club_recommender = ClubRecommender(self.pymongo_db, f'ml-models/club-model-{CurrentConfig.MODE}.pkl')
-        self.club_recommender.train_or_load_model(force_train=True)
+        # Serve the catalog from memory, which gets invalidated whenever a club's catalog info changes
+        self.catalog_snapshot = CatalogSnapshot(max_age=app.config['CATALOG_SNAPSHOT_MAX_AGE'])
+
+        # Serve the metadata (e.g tags and majors) from memory too, with ETags so repeat requests get a 304
+        self.metadata_registry = MetadataRegistry(
+            max_age=app.config['METADATA_CACHE_MAX_AGE'],
+            client_max_age=app.config['METADATA_CACHE_MAX_AGE']
+        )
+
+        # Serve the last saved model (or a tag-only model) right away, and train a new one in a separate process
+        self.club_recommender = ClubRecommender(
+            self.pymongo_db, f'ml-models/club-model-{CurrentConfig.MODE}',
+            num_workers=app.config['RECOMMENDER_TRAINING_WORKERS']
+        )
+        self.club_recommender.warm_start(train_out_of_process=True)
+
+        self.student_recommender = StudentRecommender(self.club_recommender)
+
+        self.boot_timings = {'extensions_secs': time.perf_counter() - init_start}
 
         # redis_url = urlparse.urlparse(os.environ.get('REDIS_URI'))
         # self.redis = walrus.Database(host=redis_url.hostname, port=redis_url.port, password=redis_url.password, db=0, decode_responses=True)
@@ -1,7 +1,8 @@
 __all__ = [
-    'ClubRecommender'
+    'ClubRecommender', 'StudentRecommender'
 ]
 
 from recommenders.club_recommender import ClubRecommender
+from recommenders.student_recommender import StudentRecommender
 
 # NOTE TO SELF/TODO/HACK: Isolate training process in separate env?
@@ -0,0 +1,214 @@
+import os
+import json
+import datetime
+
+import numpy as np
+
+from recommenders.tag_index import TagIndex
+from recommenders.word_vectors import WordVectors
+from recommenders.text_cleaner import CleanedDescriptions
+
+ARRAY_NAMES = ['vectors', 'neighbor_indices', 'neighbor_scores']
+
+# The version of the on-disk layout written by 'ClubModel.save'. Version 1 models (without the link names table
+# and array header) can still be loaded, but newer versions can't.
+FORMAT_VERSION = 2
+
+# The arrays that can be stored with a smaller float type (the neighbor indices and tag index are always exact)
+FLOAT_ARRAY_NAMES = ['vectors', 'neighbor_scores', 'word_vectors']
+FLOAT_DTYPES = ['float32', 'float16']
+
+
+class ClubModel:
+    """
+    This class holds everything the similar clubs recommender needs to serve recommendations without going
+    back to the database: the clubs' vectors, their most similar clubs, their tags and the club info that's
+    shown on the club view page. Each row of the arrays corresponds to the club at the same position in
+    'link_names'.
+
+    A model is never modified after it's built (its arrays are even made read-only). Instead, a newly trained
+    model replaces the previous one in 'ClubRecommender' with a single assignment, which also throws away the
+    previous model's club info. The 'version' is assigned when the model is saved (see 'model_store.py').
+
+    A model is saved as a folder of raw NumPy arrays (plus the club info and metadata as JSON), so that loading
+    it memory-maps the arrays instead of reading them in. That way, all the processes serving the same model
+    share a single copy of it through the OS page cache. The float arrays can be saved as float16 to halve their
+    size on disk, in which case they're converted back to float32 when loaded (and aren't shared anymore).
+
+    Example:
+
+    model.save('ml-models/club-model-dev/v000012', float_dtype='float16')
+    model = ClubModel.load('ml-models/club-model-dev/v000012')
+    """
+
+    def __init__(self, link_names, club_tags, cards, vectors, neighbor_indices, neighbor_scores, built_at = None, tag_index = None, word_vectors = None, corpus_hash = None, cleaned_descriptions = None):
+        """
+        Input:
+        * link_names - The link names of all the clubs
+        * club_tags - The list of tag IDs of each club
+        * cards - The club info shown for each recommended club (link name, name, logo URL and about us)
+        * vectors - The unit-length description vector of each club, as a 2D float32 array
+        * neighbor_indices - A 2D int32 array with the row indices of each club's most similar clubs
+        * neighbor_scores - A 2D float32 array with the cosine similarities of said clubs
+        * built_at - When the club data used for this model was fetched, which is used to find the clubs that
+          have changed since then
+        * tag_index - An already built tag index, in which case 'club_tags' can be None
+        * word_vectors - The word vectors used to vectorize the descriptions (see 'word_vectors.py'), which are
+          needed to add clubs to the model later on
+        * corpus_hash - A hash of the club data the model was built from, to tell whether two models were built
+          from the same clubs (see 'ClubRecommender._corpus_hash')
+        * cleaned_descriptions - The words of the descriptions cleaned while building the model (see
+          'text_cleaner.py'), so that the next training doesn't have to tokenize them again
+        """
+
+        self.link_names = list(link_names)
+        self.club_rows = {link_name: i for (i, link_name) in enumerate(self.link_names)}
+
+        if tag_index is None:
+            self.club_tags = list(club_tags)
+            self.tag_index = TagIndex(self.club_tags)
+        else:
+            self.club_tags = list(club_tags) if club_tags is not None else tag_index.club_tags()
+            self.tag_index = tag_index
+
+        self.cards = list(cards)
+        self.vectors = vectors
+        self.neighbor_indices = neighbor_indices
+        self.neighbor_scores = neighbor_scores
+
+        self.word_vectors = word_vectors
+        self.cleaned_descriptions = cleaned_descriptions
+
+        self.built_at = built_at
+        self.corpus_hash = corpus_hash
+        self.version = None
+
+        for array in (self.vectors, self.neighbor_indices, self.neighbor_scores, self.tag_index.membership):
+            array.flags.writeable = False
+
+
+    def __len__(self):
+        return len(self.link_names)
+
+
+    def save(self, folder, float_dtype = 'float32'):
+        """
+        Saves the model's arrays, club info and metadata into the given (existing) folder.
+
+        Input:
+        * folder - The folder to save the model into
+        * float_dtype - Either 'float32' or 'float16', the type the vectors and scores are saved with
+        """
+
+        if float_dtype not in FLOAT_DTYPES:
+            raise ValueError(f'Unsupported float type: "{float_dtype}"')
+
+        arrays = {array_name: getattr(self, array_name) for array_name in ARRAY_NAMES}
+        arrays['tag_ids'] = np.array(self.tag_index.tag_ids, dtype=np.int64)
+        arrays['tag_membership'] = self.tag_index.membership
+
+        if self.word_vectors is not None:
+            arrays['word_vectors'] = self.word_vectors.vectors
+
+        if self.cleaned_descriptions is not None:
+            arrays['description_keys'] = self.cleaned_descriptions.keys
+            arrays['description_offsets'] = self.cleaned_descriptions.offsets
+            arrays['description_word_rows'] = self.cleaned_descriptions.word_rows
+
+        for array_name in FLOAT_ARRAY_NAMES:
+            if array_name in arrays:
+                arrays[array_name] = np.asarray(arrays[array_name]).astype(float_dtype, copy=False)
+
+        for (array_name, array) in arrays.items():
+            np.save(os.path.join(folder, f'{array_name}.npy'), array)
+
+        with open(os.path.join(folder, 'link_names.json'), 'w') as link_names_file:
+            json.dump(self.link_names, link_names_file)
+
+        with open(os.path.join(folder, 'cards.json'), 'w') as cards_file:
+            json.dump(self.cards, cards_file)
+
+        if self.word_vectors is not None:
+            with open(os.path.join(folder, 'words.json'), 'w') as words_file:
+                json.dump(self.word_vectors.words, words_file)
+
+        if self.cleaned_descriptions is not None:
+            with open(os.path.join(folder, 'description_vocabulary.json'), 'w') as vocabulary_file:
+                json.dump(self.cleaned_descriptions.vocabulary, vocabulary_file)
+
+        with open(os.path.join(folder, 'meta.json'), 'w') as meta_file:
+            json.dump({
+                'format_version': FORMAT_VERSION,
+                'version': self.version,
+                'built_at': self.built_at.isoformat() if self.built_at is not None else None,
+                'corpus_hash': self.corpus_hash,
+                'num_clubs': len(self),
+                'arrays': {
+                    array_name: {'dtype': str(array.dtype), 'shape': list(array.shape)}
+                    for (array_name, array) in arrays.items()
+                },
+            }, meta_file)
+
+
+    @classmethod
+    def load(cls, folder, mmap_mode = 'r'):
+        """
+        Loads a model saved with 'save', memory-mapping its arrays by default (except for float16 arrays, which
+        are read in as float32).
+        """
+
+        with open(os.path.join(folder, 'meta.json'), 'r') as meta_file:
+            meta = json.load(meta_file)
+
+        format_version = meta.get('format_version', 1)
+        if format_version > FORMAT_VERSION:
+            raise ValueError(f'Model format version {format_version} is newer than the supported version {FORMAT_VERSION}')
+
+        def load_array(array_name):
+            array = np.load(os.path.join(folder, f'{array_name}.npy'), mmap_mode=mmap_mode)
+            return array.astype(np.float32) if array.dtype == np.float16 else array
+
+        with open(os.path.join(folder, 'cards.json'), 'r') as cards_file:
+            cards = json.load(cards_file)
+
+        if format_version >= 2:
+            with open(os.path.join(folder, 'link_names.json'), 'r') as link_names_file:
+                link_names = json.load(link_names_file)
+        else:
+            link_names = [card['link_name'] for card in cards]
+
+        arrays = {array_name: load_array(array_name) for array_name in ARRAY_NAMES}
+
+        tag_index = TagIndex.from_arrays(np.load(os.path.join(folder, 'tag_ids.npy')), load_array('tag_membership'))
+
+        word_vectors = None
+        if os.path.exists(os.path.join(folder, 'words.json')):
+            with open(os.path.join(folder, 'words.json'), 'r') as words_file:
+                words = json.load(words_file)
+
+            word_vectors = WordVectors(words, load_array('word_vectors'))
+
+        cleaned_descriptions = None
+        if os.path.exists(os.path.join(folder, 'description_vocabulary.json')):
+            with open(os.path.join(folder, 'description_vocabulary.json'), 'r') as vocabulary_file:
+                vocabulary = json.load(vocabulary_file)
+
+            cleaned_descriptions = CleanedDescriptions(
+                load_array('description_keys'), vocabulary,
+                load_array('description_offsets'), load_array('description_word_rows')
+            )
+
+        model = cls(
+            link_names=link_names,
+            club_tags=None,
+            cards=cards,
+            built_at=datetime.datetime.fromisoformat(meta['built_at']) if meta['built_at'] is not None else None,
+            tag_index=tag_index,
+            word_vectors=word_vectors,
+            corpus_hash=meta.get('corpus_hash'),
+            cleaned_descriptions=cleaned_descriptions,
+            **arrays
+        )
+        model.version = meta['version']
+
+        return model
@@ -1,18 +1,44 @@
 import os.path
-import json, re
+import sys
+import json
+import time
+import subprocess
+import datetime
+import hashlib
+import threading
 
 import pymongo
 
 import numpy as np
 import pandas as pd
-import scipy
-
-import nltk
-nltk.download('stopwords')
-from nltk.corpus import stopwords
 
 import gensim
 
+from recommenders.similarity import normalize_vectors, update_top_k_neighbors
+from recommenders.neighbor_index import build_neighbor_index
+from recommenders.club_model import ClubModel
+from recommenders.tag_index import TagIndex
+from recommenders.word_vectors import WordVectors
+from recommenders.text_cleaner import TextCleaner
+from recommenders.model_store import ModelStore
+from recommenders.legacy_model import read_legacy_table, convert_legacy_model
+
+from utils import pst_right_now
+
+# How often (in seconds) to check whether another process has published a newer model
+RELOAD_CHECK_INTERVAL = 60
+
+# The only club fields needed for training, and how many clubs to fetch per round trip
+CLUB_DATA_PROJECTION = {
+    '_id': 0,
+    'club.name': 1,
+    'club.link_name': 1,
+    'club.about_us': 1,
+    'club.tags': 1,
+    'club.logo_url': 1,
+}
+FETCH_BATCH_SIZE = 500
+
 
 class ClubRecommender:
     """
@@ -20,70 +46,90 @@ class ClubRecommender:
     and optimized for use with backend.
     """
 
-    def __init__(self, mongo_database, model_file_loc, debug = False):
+    def __init__(self, mongo_database, model_file_loc, num_neighbors = 50, num_workers = 1, neighbor_index_type = 'auto', model_float_dtype = 'float32', debug = False):
+        """
+        Input:
+        * mongo_database - The pymongo database to fetch the clubs from
+        * model_file_loc - The folder to save the versioned models in (see 'model_store.py')
+        * num_neighbors - The number of most similar clubs to keep per club
+        * num_workers - The number of threads gensim trains the word2vec model with. Note that the training is
+          only reproducible with a single thread.
+        * neighbor_index_type - How to find each club's most similar clubs, either 'exact', 'ivf' (approximate) or
+          'auto' to pick based on the number of clubs (see 'neighbor_index.py')
+        * model_float_dtype - Either 'float32' or 'float16', the type the models' vectors and scores are saved
+          with (see 'club_model.py')
+        """
+
         self.db = mongo_database
         self.model_file_loc = model_file_loc
+        self.model_store = ModelStore(model_file_loc, float_dtype=model_float_dtype)
+        self.legacy_model_file_loc = f'{os.path.normpath(model_file_loc)}.pkl'
+        self.num_neighbors = num_neighbors
+        self.num_workers = num_workers
+        self.neighbor_index_type = neighbor_index_type
         self.debug = debug
 
+        self.model = None
+        self.previous_model = None
+        self.text_cleaner = TextCleaner()
+        self.training_lock = threading.Lock()
+        self.last_reload_check = time.monotonic()
+
+        self.is_training = False
+        self.last_error = None
+        self.boot_timings = {}
+
     ######################
     ### TRAINING STEPS ###
     ######################
 
-    def _fetch_list_of_club_tags(self):
-        """
-        Utility method to fetch the list of club tags as a 2D array, with each entry in the outer
-        array being a list of club tags itself (i.e a numeric list of tag IDs).
+    def _fetch_data(self, link_names = None):
         """
+        Fetches all the raw data from the database specified and stores it in a pandas DataFrame. Only the fields
+        used for training are fetched, and they're streamed in batches straight into columns.
 
-        list_of_tags = []
+        Input:
+        * link_names - If given, only fetch the clubs with these link names
 
-        for user in self.db['new_base_user'].find({
+        Output: A DataFrame with all the needed *raw* club data for training the model (still needs processing)
+        """
+
+        club_query = {
             'role': 'officer',
             'confirmed': True,
             'club.reactivated': True
-        }):
-            club_tags = user['club']['tags']
-            list_of_tags += [club_tags]
+        }
 
-        return list_of_tags
+        if link_names is not None:
+            club_query['club.link_name'] = {'$in': list(link_names)}
 
+        # Only fetch the fields that are used, instead of the whole club document (events, gallery, FAQ, etc.)
+        club_cursor = self.db['new_base_user'].find(club_query, CLUB_DATA_PROJECTION, batch_size=FETCH_BATCH_SIZE)
 
-    def _fetch_data(self):
-        """
-        Fetches all the raw data from the database specified and stores it in a pandas DataFrame.
+        columns = {column: [] for column in ['name', 'link_name', 'description', 'tags', 'logo_url', 'about_us']}
 
-        Input: Nothing
+        for user in club_cursor:
+            club = user.get('club', {})
 
-        Output: A DataFrame with all the needed *raw* club data for training the model (still needs processing)
-        """
+            club_name = club.get('name')
+            club_link_name = club.get('link_name')
+            club_about_us = club.get('about_us')
+            club_tags = club.get('tags')
 
-        club_info_db = []
+            if club_name is None or club_link_name is None or club_about_us is None or club_tags is None:
+                continue
 
-        for user in self.db['new_base_user'].find({
-            'role': 'officer',
-            'confirmed': True,
-            'club.reactivated': True
-        }):
-            club_name = user['club']['name'].strip()
-            club_link_name = user['club']['link_name'].strip()
-            club_description = user['club']['about_us'].strip()
-            club_tags = user['club']['tags']
-            
-            club_info_db += [{
-                'name': club_name,
-                'link_name': club_link_name,
-                'description': club_description,
-                'tags': club_tags,
-            }]
-            
-        club_db_df = pd.DataFrame(club_info_db)
-        club_db_df = club_db_df.dropna(axis=0, how='any', thresh=None, subset=None, inplace=False)
-        club_db_df = club_db_df.reset_index(drop = True)
+            club_name = club_name.strip()
+            club_description = club_about_us.strip()
 
-        for (i, row) in club_db_df.iterrows():
-            row['description'] = row['description'] if len(row['description']) != 0 else row['name']
+            columns['name'] += [club_name]
+            columns['link_name'] += [club_link_name.strip()]
+            columns['description'] += [club_description if len(club_description) != 0 else club_name]
+            columns['tags'] += [club_tags]
+            columns['logo_url'] += [club.get('logo_url')]
+            columns['about_us'] += [club_about_us]
 
-        return club_db_df
+        return pd.DataFrame(columns)
 
 
     def _clean_data(self, table):
@@ -94,43 +140,12 @@ class ClubRecommender:
         * table - The raw DataFrame containing all the club data
 
         Output: A copy of the input DataFrame with a new column containing a list of the significant words
-        from each club's original description.
+        from each club's original description (see 'text_cleaner.py').
         """
-        
-        def clean_description(description):
-            """
-            Clean single description into lists of significant words.
 
-            Input:
-            * description - The club description string
+        # Large batches are split across as many processes as the word2vec model is trained with
+        clean_descriptions = self.text_cleaner.clean_many(table['description'].tolist(), num_processes=self.num_workers)
 
-            Output: A list of significant words from input description.
-            """
-            
-            try: 
-                # Remove punctuation
-                new_description = re.sub("[^a-zA-Z]", " ", description)
-
-                # Tokenize into words (all lower case)
-                new_description = new_description.lower().split()
-
-                # Remove stopwords
-                eng_stopwords = set(stopwords.words("english"))
-                new_description = [w for w in new_description if not w in eng_stopwords]
-
-                # Remove "uc" and "berkeley"
-                uc_berkeley = ['uc', 'berkeley', 'also', 'providing', 'various', 'well', 'provide', 'one']
-                new_description = [w for w in new_description if not w in uc_berkeley]
-            except TypeError:
-                return [""]
-
-            return new_description
-        
-        clean_descriptions = []
-        
-        for i in np.arange(len(table)):
-            clean_descriptions += [clean_description(table['description'][i])]
-            
         cleaned_table = table.drop(['description'], axis=1)
         cleaned_table['clean_description'] = clean_descriptions
         
@@ -146,15 +161,14 @@ class ClubRecommender:
         * table - Processed DataFrame with *all* required data for training the model.
 
         Output: A copy of the input table with a new column containing a word-embedding vector of
-        size VECTOR_SIZE for each club.
+        size VECTOR_SIZE for each club. If 'yield_model' is true, the word vectors of the trained model
+        (see 'word_vectors.py') are returned along with it.
         """
 
         MIN_WORD_COUNT = 20
         VECTOR_SIZE = 100
         CONTEXT_WINDOW_SIZE = 10
         
-        list_vectors = []
-        
         model = gensim.models.Word2Vec(
             table['clean_description'],
             min_count=MIN_WORD_COUNT,
@@ -162,10 +176,34 @@ class ClubRecommender:
             window=CONTEXT_WINDOW_SIZE,
             compute_loss=True,
             sample=1e-3 / 2,
-            workers=1,
+            workers=self.num_workers,
             seed=42
         )
+
+        word_vectors = WordVectors.from_word2vec(model)
+        vectorized_table = self._vectorize_descriptions(table, word_vectors)
         
+        if yield_model:
+            return vectorized_table, word_vectors
+        else:
+            return vectorized_table
+
+
+    def _vectorize_descriptions(self, table, model):
+        """
+        Uses an already trained word2vec model to turn each cleaned description into a single vector, by adding up
+        the vectors of its words. This is also used on its own to update the vectors of clubs that have changed,
+        without having to retrain the word2vec model.
+
+        Input:
+        * table - Processed DataFrame with a 'clean_description' column
+        * model - The word vectors of the trained word2vec model (see 'word_vectors.py')
+
+        Output: A copy of the input table with a new column containing a word-embedding vector for each club.
+        """
+
+        list_vectors = []
+
         for i in range(len(table)):
             ith_description = table['clean_description'][i]    
             
@@ -175,7 +213,7 @@ class ClubRecommender:
                     ith_vector_list += [model[ith_description_word]]
             
             if len(ith_vector_list) == 0:
-                description_sum_vector = [1e-6] * VECTOR_SIZE
+                description_sum_vector = [1e-6] * model.vector_size
             else:
                 description_sum_vector = sum(np.array(ith_vector_list))
                 
@@ -183,160 +221,771 @@ class ClubRecommender:
             
         vectorized_table = table.copy()
         vectorized_table['vector_sum'] = list_vectors
-        
-        if yield_model:
-            return vectorized_table, model
-        else:
-            return vectorized_table
 
+        return vectorized_table
+
+
+    def _generate_cards(self, table):
+        """
+        Extracts the club info shown for each recommended club (link name, name, logo URL and about us).
+        """
+
+        return [{
+            'link_name': row['link_name'],
+            'name':      row['name'],
+            'logo_url':  row['logo_url'],
+            'about_us':  row['about_us'],
+        } for row in table[['link_name', 'name', 'logo_url', 'about_us']].to_dict('records')]
+
+
+    def _corpus_hash(self, table, previous_hash = None, removed_link_names = ()):
+        """
+        Hashes the club data a model is built from, so that models built from the same clubs can be told apart
+        from the rest. When updating a model, the hash of the changes is chained onto the previous model's hash.
+
+        Input:
+        * table - The raw DataFrame containing the (changed) club data
+        * previous_hash - The corpus hash of the model being updated, if any
+        * removed_link_names - The link names of the clubs dropped from the model being updated
+
+        Output: The hexadecimal SHA-256 hash
+        """
 
-    def _generate_dist_table(self, table):
+        hasher = hashlib.sha256()
+
+        if previous_hash is not None:
+            hasher.update(previous_hash.encode('utf-8'))
+
+        for club in table[['link_name', 'name', 'description', 'tags', 'logo_url']].itertuples(index=False):
+            hasher.update(repr(tuple(club)).encode('utf-8'))
+
+        for link_name in removed_link_names:
+            hasher.update(repr(link_name).encode('utf-8'))
+
+        return hasher.hexdigest()
+
+
+    def _generate_model(self, table, built_at = None, word_vectors = None, corpus_hash = None, cleaned_descriptions = None):
         """
-        Uses a vectorized table to create a 2D distance table containing distances between each club.
+        Uses a vectorized table to find the most similar clubs for each club, based on their descriptions.
 
         Input:
         * table - DataFrame with word-embedding vectors from descriptions
+        * built_at - When the club data in the table was fetched
+        * word_vectors - The word vectors the table was vectorized with
+        * corpus_hash - The hash of the club data in the table (see '_corpus_hash')
+        * cleaned_descriptions - The cached words of the cleaned descriptions (see 'text_cleaner.py')
 
-        Output:
-        * A 2D table of cosine distance between each and every club based on their descriptions. If two clubs
-        are very similar, their distance will be close to 1, and otherwise the distance will be close to 0.
+        Output: A 'ClubModel' with each club's 'num_neighbors' most similar clubs, along with everything else
+        needed to serve recommendations from memory (see 'club_model.py').
         """
-            
-        dict = table[['link_name','vector_sum']].set_index('link_name')['vector_sum'].to_dict()
-        distance_list = []
-        
-        for club_1 in dict:
-            vector_1 = dict[club_1]
-            distance_dictionary = {}
-            
-            for club_2 in dict:
-                vector_2 = dict[club_2]
-                
-                cosine_sim = 1 - scipy.spatial.distance.cosine(vector_1, vector_2)
-                distance_dictionary[club_2] = cosine_sim
-                
-            distance_list += [distance_dictionary]
-            
-        distance_table = pd.DataFrame(data=distance_list)
-        distance_table.index = table['link_name']
-        
-        return distance_table
+
+        vectors = normalize_vectors(table['vector_sum'].tolist())
+        neighbor_indices, neighbor_scores = build_neighbor_index(vectors, self.neighbor_index_type).all_neighbors(self.num_neighbors)
+
+        return ClubModel(
+            link_names=table['link_name'].tolist(),
+            club_tags=table['tags'].tolist(),
+            cards=self._generate_cards(table),
+            vectors=vectors,
+            neighbor_indices=neighbor_indices,
+            neighbor_scores=neighbor_scores,
+            built_at=built_at,
+            word_vectors=word_vectors,
+            corpus_hash=corpus_hash,
+            cleaned_descriptions=cleaned_descriptions,
+        )
+
+
+    def _generate_tag_model(self, table):
+        """
+        Builds a degraded model that only compares clubs by their tags, for serving recommendations while the
+        full model is being trained. It only needs the raw club data, so it's ready within a database query.
+        This model is never saved, so it doesn't have a version.
+
+        Input:
+        * table - The raw DataFrame containing all the club data
+
+        Output: A 'ClubModel' whose vectors are the clubs' (normalized) tag memberships
+        """
+
+        club_tags = table['tags'].tolist()
+        tag_index = TagIndex(club_tags)
+
+        vectors = normalize_vectors(tag_index.membership.astype(np.float32))
+        neighbor_indices, neighbor_scores = build_neighbor_index(vectors, self.neighbor_index_type).all_neighbors(self.num_neighbors)
+
+        return ClubModel(
+            link_names=table['link_name'].tolist(),
+            club_tags=club_tags,
+            cards=self._generate_cards(table),
+            vectors=vectors,
+            neighbor_indices=neighbor_indices,
+            neighbor_scores=neighbor_scores,
+            tag_index=tag_index,
+        )
+
+
+    def _publish_model(self, model):
+        """
+        Saves the given model as a new version and then swaps it in for the current model. The swap is a single
+        assignment, so a request that's already being served keeps using the model it started with and never
+        sees a half-updated model.
+        """
+
+        self.model_store.save(model)
+
+        self.previous_model = self.model
+        self.model = model
 
 
     def train_or_load_model(self, force_train = False):
         """
         A convenient function to either load a previously trained model or train a new model from scratch.
 
-        Note that the so-called model is actually a distance table that 'models' the relationships between
-        each of the clubs via its descriptions.
+        Note that the so-called model is actually a table of each club's most similar clubs that 'models' the
+        relationships between each of the clubs via its descriptions.
+        """
+
+        # Search for the current model version given the folder and load it...otherwise generate a new one.
+        if not force_train:
+            model = self.model_store.load()
+
+            if model is not None:
+                self.model = model
+                return
+
+        with self.model_store.training_lock(blocking=False) as acquired:
+            if not acquired:
+                # Another process (e.g another gunicorn worker) is already training, so wait for it to finish
+                # and load its model instead of training the same model twice
+                with self.model_store.training_lock():
+                    pass
+
+                self.reload_model()
+                return
+
+            with self.training_lock:
+                # Step 1: Fetch raw data, while noting when it was fetched for the incremental updates
+                built_at = pst_right_now()
+                clubs_table = self._fetch_data()
+
+                # Step 2: Clean raw data
+                cleaned_table = self._clean_data(clubs_table)
+
+                # Step 3: Train model vectors from table
+                vectorized_table, word_vectors = self._train_model_vectors(cleaned_table, yield_model=True)
+
+                # Step 4: Generate the nearest neighbors table from vectors
+                corpus_hash = self._corpus_hash(clubs_table)
+                cleaned_descriptions = self.text_cleaner.cached_descriptions()
+                model = self._generate_model(vectorized_table, built_at, word_vectors, corpus_hash, cleaned_descriptions)
+
+                # Step 5: Save the new model as a new version and swap it in, all at once
+                self._publish_model(model)
+
+
+    def load_cleaned_descriptions(self):
         """
+        Loads the cleaned descriptions saved with the current model into the text cleaner, so that retraining
+        the model doesn't tokenize the descriptions that haven't changed since then. This is meant for a new
+        training process (see 'train.py'), whose text cleaner starts out empty.
+
+        Output: The number of cleaned descriptions loaded
+        """
+
+        model = self.model if self.model is not None else self.model_store.load()
+        if model is None or model.cleaned_descriptions is None:
+            return 0
+
+        self.text_cleaner.load_cached_descriptions(model.cleaned_descriptions)
+        return len(model.cleaned_descriptions)
+
 
-        list_of_club_tags = self._fetch_list_of_club_tags()
-        self.club_tags_list = list_of_club_tags
+    def train_in_subprocess(self, mode = 'full'):
+        """
+        Runs the training in a separate Python process (see 'train.py') and waits for it to finish, so that the
+        training doesn't compete with the request threads of this process for the GIL. Once it's done, the model
+        it published is loaded (memory-mapped) into this process.
+
+        Input:
+        * mode - Either 'full' to fully retrain the model or 'incremental' to only update the changed clubs
+
+        Output: True if a new model was loaded, False otherwise
+        """
+
+        training_process = subprocess.Popen([
+            sys.executable, '-m', 'recommenders.train',
+            '--mode', mode,
+            '--workers', str(self.num_workers),
+            '--folder', self.model_file_loc,
+        ])
+
+        return_code = training_process.wait()
+        if return_code != 0:
+            raise RuntimeError(f'Training process exited with code {return_code}')
+
+        return self.reload_model()
+
+
+    def import_legacy_model(self, pickle_file_loc):
+        """
+        Converts a legacy pickled model (see 'legacy_model.py') and publishes it as a new version, using the
+        current club data for the clubs' tags and info. Clubs that aren't active anymore are left out.
+
+        Output: The version of the converted model
+        """
+
+        link_names, similarities = read_legacy_table(pickle_file_loc)
+        clubs_table = self._fetch_data(link_names)
+
+        model = convert_legacy_model(
+            link_names, similarities, clubs_table, self._generate_cards(clubs_table),
+            self.num_neighbors, self.neighbor_index_type
+        )
+
+        with self.model_store.training_lock(), self.training_lock:
+            self._publish_model(model)
+
+        return model.version
+
+
+    def warm_start(self, train_in_background = True, max_model_age = datetime.timedelta(hours=1), train_out_of_process = False):
+        """
+        Gets the recommender serving as soon as possible when the app boots, without training anything in the
+        foreground. The current saved model is loaded if there's one, or else the legacy pickled model (next to
+        the model folder, e.g 'club-model-dev.pkl') is converted if there's one, or else a degraded tag-only model
+        is built.
+        Then, unless the loaded model is recent enough, a full model is trained in a background thread and
+        swapped in once it's done.
+
+        Input:
+        * train_in_background - Whether to train a full model in the background at all
+        * max_model_age - How old a loaded model can be before it gets retrained
+        * train_out_of_process - Whether the background training runs in a separate process (see 'train_in_subprocess')
+
+        Output: The background training thread, or None if no training was started
+        """
+
+        start = time.perf_counter()
+
+        try:
+            model = self.model_store.load()
+
+            if model is not None:
+                self.model = model
+                self.boot_timings['load_secs'] = time.perf_counter() - start
+            elif os.path.exists(self.legacy_model_file_loc):
+                self.import_legacy_model(self.legacy_model_file_loc)
+                self.boot_timings['legacy_conversion_secs'] = time.perf_counter() - start
+            else:
+                self.model = self._generate_tag_model(self._fetch_data())
+                self.boot_timings['tag_model_secs'] = time.perf_counter() - start
+        except Exception as ex:
+            self.last_error = repr(ex)
+
+        model = self.model
+        is_model_fresh = model is not None and model.version is not None and model.built_at is not None \
+            and pst_right_now() - model.built_at < max_model_age
+
+        if not train_in_background or is_model_fresh:
+            return None
+
+        training_thread = threading.Thread(
+            target=self._train_in_background,
+            args=(train_out_of_process,),
+            name='club-recommender-training',
+            daemon=True
+        )
+        training_thread.start()
+
+        return training_thread
+
+
+    def _train_in_background(self, train_out_of_process = False):
+        """
+        Fully trains a new model while recording how long it took, or the error if it failed.
+        """
 
-        # Search for the model given the file location and load it...otherwise generate a new one.
-        if not force_train and self.model_file_loc and os.path.exists(self.model_file_loc):
-            self.distance_table = pd.read_pickle(self.model_file_loc)
+        start = time.perf_counter()
+        self.is_training = True
+
+        try:
+            if train_out_of_process:
+                self.train_in_subprocess('full')
+            else:
+                self.train_or_load_model(force_train=True)
+
+            self.boot_timings['train_secs'] = time.perf_counter() - start
+            self.last_error = None
+        except Exception as ex:
+            self.last_error = repr(ex)
+        finally:
+            self.is_training = False
+
+
+    @property
+    def model_state(self):
+        """
+        The state of the model being served: 'empty' if there's no model yet, 'degraded' if it's the tag-only
+        model (the only one that's never saved, and thus has no version) or 'ready' otherwise.
+        """
+
+        model = self.model
+
+        if model is None:
+            return 'empty'
+        elif model.version is None:
+            return 'degraded'
         else:
-            # Step 1: Fetch raw data
-            clubs_table = self._fetch_data()
+            return 'ready'
+
+
+    def status(self):
+        """
+        Returns a JSON-friendly summary of the model being served, whether a model is being trained and how long
+        each startup step took.
+        """
+
+        model = self.model
+
+        return {
+            'state': self.model_state,
+            'training': self.is_training,
+            'version': model.version if model is not None else None,
+            'num_clubs': len(model) if model is not None else 0,
+            'built_at': model.built_at.isoformat() if model is not None and model.built_at is not None else None,
+            'boot_timings': dict(self.boot_timings),
+            'last_error': self.last_error,
+        }
+
+
+    def reload_model(self):
+        """
+        Loads the current model version from disk if it's not the one being served, i.e when another process
+        has published a newer model (or rolled back). Since the arrays are memory-mapped, this is cheap and
+        shares the model's memory with the other processes.
+
+        Output: True if a different model was swapped in, False otherwise
+        """
+
+        self.last_reload_check = time.monotonic()
+
+        version = self.model_store.current_version()
+        if version is None or (self.model is not None and self.model.version == version):
+            return False
+
+        model = self.model_store.load(version)
+        if model is None:
+            return False
+
+        self.previous_model = self.model
+        self.model = model
+
+        return True
+
+
+    def _maybe_reload_model(self):
+        """
+        Calls 'reload_model' at most once every RELOAD_CHECK_INTERVAL seconds.
+        """
+
+        if time.monotonic() - self.last_reload_check >= RELOAD_CHECK_INTERVAL:
+            try:
+                self.reload_model()
+            except (OSError, ValueError):
+                # Keep serving the current model if the new one can't be read
+                pass
+
+
+    def _fetch_changed_clubs(self, model):
+        """
+        Finds which clubs have changed since the given model was built, by only fetching the clubs' link names
+        and timestamps. A club counts as changed if its profile was updated or it was reactivated since then,
+        or if it's not part of the model at all (i.e it was created or confirmed since then).
+
+        Output: A tuple of the link names of the changed clubs and the link names of the clubs that are part of
+        the model but aren't active anymore.
+        """
+
+        active_link_names = set()
+        changed_link_names = []
+
+        for user in self.db['new_base_user'].find({
+            'role': 'officer',
+            'confirmed': True,
+            'club.reactivated': True
+        }, {
+            'club.link_name': 1,
+            'club.last_updated': 1,
+            'club.reactivated_last': 1,
+        }):
+            club_link_name = user['club']['link_name'].strip()
+            last_updated = user['club'].get('last_updated')
+            reactivated_last = user['club'].get('reactivated_last')
+
+            active_link_names.add(club_link_name)
+
+            if club_link_name not in model.club_rows \
+                    or (last_updated is not None and last_updated >= model.built_at) \
+                    or (reactivated_last is not None and reactivated_last >= model.built_at):
+                changed_link_names += [club_link_name]
+
+        removed_link_names = [link_name for link_name in model.link_names if link_name not in active_link_names]
+
+        return changed_link_names, removed_link_names
+
+
+    def update_model(self):
+        """
+        Incrementally updates the model with only the clubs that have changed since it was built. Their descriptions
+        are vectorized with the model's word vectors, and only their rows and columns of the nearest neighbors
+        table get recomputed. Clubs that aren't active anymore are dropped from the model.
+
+        If there's no model (or word vectors) to update from, this falls back to fully retraining the model.
+        If another process is already training, this does nothing.
+
+        Output: True if the model was updated, or False if nothing has changed.
+        """
+
+        with self.model_store.training_lock(blocking=False) as acquired:
+            if not acquired:
+                # Another process is already training, and its model will be picked up by 'reload_model'
+                return False
+
+            self.reload_model()
+
+            with self.training_lock:
+                model = self.model
+
+                if model is not None and model.built_at is not None and model.word_vectors is not None:
+                    built_at = pst_right_now()
+                    changed_link_names, removed_link_names = self._fetch_changed_clubs(model)
+
+                    if len(changed_link_names) == 0 and len(removed_link_names) == 0:
+                        return False
+
+                    # Step 1: Fetch, clean and vectorize only the changed clubs (carrying over the cleaned descriptions)
+                    if model.cleaned_descriptions is not None:
+                        self.text_cleaner.load_cached_descriptions(model.cleaned_descriptions)
+
+                    changed_table = self._fetch_data(changed_link_names)
+
+                    # The changed clubs that are now missing a required field aren't fetched, so they're dropped too
+                    fetched_link_names = set(changed_table['link_name'])
+                    removed_link_names += [link_name for link_name in changed_link_names
+                                           if link_name not in fetched_link_names and link_name in model.club_rows]
+
+                    corpus_hash = self._corpus_hash(changed_table, model.corpus_hash, removed_link_names)
+
+                    changed_table = self._clean_data(changed_table)
+                    changed_table = self._vectorize_descriptions(changed_table, model.word_vectors)
+
+                    # Step 2: Keep the unchanged clubs in their current order and append the changed clubs after them
+                    dropped_link_names = set(removed_link_names) | set(changed_link_names)
+                    kept_rows = np.array([i for (i, link_name) in enumerate(model.link_names) if link_name not in dropped_link_names], dtype=np.int64)
+
+                    new_rows = np.full(len(model), -1, dtype=np.int32)
+                    new_rows[kept_rows] = np.arange(len(kept_rows))
+
+                    if len(changed_table) > 0:
+                        changed_vectors = normalize_vectors(changed_table['vector_sum'].tolist())
+                    else:
+                        changed_vectors = np.zeros((0, model.vectors.shape[1]), dtype=np.float32)
+
+                    vectors = np.concatenate([model.vectors[kept_rows], changed_vectors], axis=0)
+
+                    # Step 3: Point the kept neighbors to their new rows, and clear the ones that were dropped
+                    old_indices = model.neighbor_indices[kept_rows]
+                    neighbor_indices = np.where(old_indices >= 0, new_rows[np.maximum(old_indices, 0)], -1).astype(np.int32)
+                    neighbor_scores = np.where(neighbor_indices >= 0, model.neighbor_scores[kept_rows], -np.inf).astype(np.float32)
+
+                    # Step 4: Only recompute the rows and columns of the changed clubs
+                    neighbor_indices = np.concatenate([neighbor_indices, np.full((len(changed_table), neighbor_indices.shape[1]), -1, dtype=np.int32)])
+                    neighbor_scores = np.concatenate([neighbor_scores, np.full((len(changed_table), neighbor_scores.shape[1]), -np.inf, dtype=np.float32)])
+
+                    changed_rows = np.arange(len(kept_rows), len(vectors))
+                    neighbor_indices, neighbor_scores = update_top_k_neighbors(vectors, neighbor_indices, neighbor_scores, changed_rows)
+
+                    new_model = ClubModel(
+                        link_names=[model.link_names[i] for i in kept_rows] + changed_table['link_name'].tolist(),
+                        club_tags=[model.club_tags[i] for i in kept_rows] + changed_table['tags'].tolist(),
+                        cards=[model.cards[i] for i in kept_rows] + self._generate_cards(changed_table),
+                        vectors=vectors,
+                        neighbor_indices=neighbor_indices,
+                        neighbor_scores=neighbor_scores,
+                        built_at=built_at,
+                        word_vectors=model.word_vectors,
+                        corpus_hash=corpus_hash,
+                        cleaned_descriptions=self.text_cleaner.cached_descriptions(),
+                    )
+
+                    # Step 5: Save the new model as a new version and swap it in, all at once
+                    self._publish_model(new_model)
+
+                    return True
+
+        self.train_or_load_model(force_train=True)
+        return True
+
+
+    def rollback(self):
+        """
+        Rolls back to the newest saved model version that's older than the current model, and makes it the
+        current version on disk as well. Since each model is saved with its own word vectors, the next update
+        builds on top of the older model.
+
+        Output: The version that was rolled back to, or None if there's no older version
+        """
+
+        with self.model_store.training_lock(), self.training_lock:
+            current_version = self.model.version if self.model is not None else self.model_store.current_version()
+            older_versions = [version for version in self.model_store.versions() if current_version is None or version < current_version]
+
+            if len(older_versions) == 0:
+                return None
 
-            # Step 2: Clean raw data
-            cleaned_table = self._clean_data(clubs_table)
+            version = older_versions[-1]
+
+            if self.previous_model is not None and self.previous_model.version == version:
+                model = self.previous_model
+            else:
+                model = self.model_store.load(version)
 
-            # Step 3: Train model vectors from table
-            vectorized_table = self._train_model_vectors(cleaned_table)
+            self.model_store.set_current(version)
 
-            # Step 4: Generate distance table from vectors
-            distance_table = self._generate_dist_table(vectorized_table)
-            self.distance_table = distance_table
+            self.model = model
+            self.previous_model = None
 
-            # Step 5: Save distance table as pickle file
-            os.makedirs(os.path.dirname(self.model_file_loc), exist_ok=True)
-            self.distance_table.to_pickle(self.model_file_loc)
+            return version
 
 
     ###################
     ### INFERENCING ###
     ###################
 
-    def _count_tags(self, a, b, num_tags):
+    def current_model(self):
+        """
+        Returns the model being served, after checking (at most every RELOAD_CHECK_INTERVAL seconds) whether
+        another process has published a newer one. The returned model should be used for the whole request,
+        since a new model may be swapped in at any time.
+        """
+
+        self._maybe_reload_model()
+        return self.model
+
+
+    def _filter_by_tag(self, model, club_tags, k):
         """
-        Returns if club A and B contain at least k tags in common.
+        Returns a boolean array of the clubs that share the most tags with the target club, while still leaving
+        at least 'k' clubs to recommend from. If that's not possible with at least one tag in common, all the
+        clubs are allowed.
 
         Input:
-        * a - list of club tags for club A
-        * b - list of club tags for club B
-        * num_tags - minimum number of tags required to match
+        * model - The model to filter the clubs from
+        * club_tags - The list of tag IDs of the target club
+        * k - The minimum number of clubs (besides the target club itself) that need to pass the filter
 
-        Output: The number of matching tags from the set intersection between 'a' and 'b'
+        Output: A boolean array based off of clubs filtered by tags, in the same order as the model
         """
 
-        matching_tags = len(set(a).intersection(set(b))) >= num_tags
-        return matching_tags
+        overlap_counts = model.tag_index.overlap_counts(club_tags)
+        num_clubs = len(overlap_counts)
 
+        if num_clubs <= k:
+            return np.ones(num_clubs, dtype=bool)
 
-    def _filter_by_tag(self, club_tags, k):
+        # The largest number of matching tags that at least 'k + 1' clubs (the target club included) have is
+        # simply the (k + 1)-th largest overlap count, so there's no need to try each number of tags in turn.
+        min_matching_tags = np.partition(overlap_counts, num_clubs - k - 1)[num_clubs - k - 1]
+
+        if min_matching_tags == 0:
+            return np.ones(num_clubs, dtype=bool)
+
+        return overlap_counts >= min_matching_tags
+
+
+    def _filter_by_tag_many(self, model, target_rows, k):
         """
-        Returns boolean list that contains max amount of matching tags that satisfies matching 'k' amount of clubs.
+        Same as '_filter_by_tag', except for many target clubs at once.
 
-        Input:
-        * club_tags - A 2D list of club tags, with each outer array entry being a list of club tags itself
-        * k - The num
+        Output: A 2D boolean array with one row per target club, and one column per club in the model
+        """
+
+        # Float matrix multiplications are much faster than integer ones, and the counts are still exact
+        membership = model.tag_index.membership.astype(np.float32)
+        overlap_counts = membership[target_rows] @ membership.T
+        num_clubs = overlap_counts.shape[1]
+
+        if num_clubs <= k:
+            return np.ones(overlap_counts.shape, dtype=bool)
+
+        min_matching_tags = np.partition(overlap_counts, num_clubs - k - 1, axis=1)[:, num_clubs - k - 1]
+
+        filtered_clubs = overlap_counts >= min_matching_tags[:, np.newaxis]
+        filtered_clubs[min_matching_tags == 0] = True
 
-        Output: - A list of booleans based off of clubs filtered by tags
+        return filtered_clubs
+
+
+    def _recommend_many_rows(self, model, target_rows, k, block_size = 1024):
         """
+        Same as '_recommend_rows', except for many target clubs at once. The tag filters and the precomputed
+        neighbors of a whole block of clubs are handled with array operations, and the clubs whose neighbors don't
+        contain enough clubs that pass the filter are all scored with a single matrix multiplication.
 
-        filtered_clubs = []
+        Output: A list with an array of the recommended clubs' rows for each target club
+        """
 
-        num_of_tags = len(club_tags)
-        while (np.count_nonzero(filtered_clubs) - 1 < k):
-            if num_of_tags == 0:
-                return [True] * len(self.club_tags_list)
+        recommended_rows = []
 
-            filtered_clubs = []
-            for other_club_tags in self.club_tags_list:
-                if self._count_tags(club_tags, other_club_tags, num_of_tags):
-                    filtered_clubs += [True]
-                else:
-                    filtered_clubs += [False]
-            num_of_tags -= 1
+        for start in range(0, len(target_rows), block_size):
+            block_rows = target_rows[start:start + block_size]
+            filtered_clubs = self._filter_by_tag_many(model, block_rows, k)
 
-        else:
-            return filtered_clubs
+            # Keep the neighbors that pass the filter, in their current (most to least similar) order
+            neighbors = model.neighbor_indices[block_rows]
+            is_valid = (neighbors >= 0) & np.take_along_axis(filtered_clubs, np.maximum(neighbors, 0), axis=1)
+            num_valid = np.count_nonzero(is_valid, axis=1)
+
+            order = np.argsort(~is_valid, axis=1, kind='stable')[:, :k]
+            top_neighbors = np.take_along_axis(neighbors, order, axis=1)
+
+            # Otherwise, score the filtered clubs directly against the target club
+            num_candidates = np.count_nonzero(filtered_clubs, axis=1) - 1
+            needs_scoring = np.flatnonzero((num_valid < k) & (num_candidates > num_valid))
+
+            if len(needs_scoring) > 0:
+                scoring_rows = block_rows[needs_scoring]
+                scores = model.vectors[scoring_rows] @ model.vectors.T
+
+                scores[~filtered_clubs[needs_scoring]] = -np.inf
+                scores[np.arange(len(scoring_rows)), scoring_rows] = -np.inf
+
+                scored_neighbors = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+                num_scored = np.count_nonzero(np.isfinite(np.take_along_axis(scores, scored_neighbors, axis=1)), axis=1)
+
+            block_recommended_rows = [top_neighbors[i, :min(k, num_valid[i])] for i in range(len(block_rows))]
+            for (j, i) in enumerate(needs_scoring):
+                block_recommended_rows[i] = scored_neighbors[j, :num_scored[j]]
+
+            recommended_rows += block_recommended_rows
+
+        return recommended_rows
+
+
+    def _recommend_rows(self, model, target_row, k):
+        """
+        Recommends up to 'k' similar clubs for the club at the given row of the model.
+
+        Output: An array with the rows of the recommended clubs, from most to least similar
+        """
+
+        filtered_clubs = self._filter_by_tag(model, model.club_tags[target_row], k)
+
+        # Most of the time, the precomputed neighbors already contain enough clubs that pass the tag filter
+        neighbors = model.neighbor_indices[target_row]
+        neighbors = neighbors[neighbors >= 0]
+        neighbors = neighbors[filtered_clubs[neighbors]]
+
+        # Otherwise, score the filtered clubs directly against the target club
+        if len(neighbors) < k and np.count_nonzero(filtered_clubs) - 1 > len(neighbors):
+            candidates = np.flatnonzero(filtered_clubs)
+            candidates = candidates[candidates != target_row]
+
+            scores = model.vectors[candidates] @ model.vectors[target_row]
+            neighbors = candidates[np.argsort(-scores, kind='stable')]
+
+        return neighbors[:k]
 
 
     def recommend(self, club_link_name, k = 3):
         """
         Description:
         Given a club's link name, recommend up to 'k' similar clubs, prioritizing first by matching tags and
-        then by description.
+        then by description. This is served entirely from the model in memory.
         
         Input:
         club_link_name - The link name of the club, which is typically the ID of the club when it was first created
         k - Number of similar clubs to recommend
         
-        Output: 'k' recommended clubs based on tags and description
+        Output: 'k' recommended clubs' link names based on tags and description, or None if the club isn't part
+        of the model (i.e it doesn't exist or it was created since the model was last trained)
         """
 
-        try:
-            club_info = self.db['new_base_user'].find({
-                'role': 'officer',
-                'confirmed': True,
-                'club.reactivated': True,
-                'club.link_name': club_link_name,
-            })[0]['club']
-        except IndexError:
+        # Hold onto the current model in case a new one gets swapped in midway
+        model = self.current_model()
+
+        target_row = model.club_rows.get(club_link_name) if model is not None else None
+        if target_row is None:
             return None
-        
-        target_club_name = club_info['link_name'].strip()
-        target_club_tags = club_info['tags']
 
-        filtered_clubs = self._filter_by_tag(target_club_tags, k)
-        
-        filtered_distances = self.distance_table[filtered_clubs]
-        club_distances = filtered_distances[target_club_name] 
-        sorted_club_distances = club_distances.sort_values(ascending = False, na_position = 'last')
-        recommendations = sorted_club_distances.keys()[1: k + 1]
-        
-        return list(recommendations)
+        return [model.link_names[row] for row in self._recommend_rows(model, target_row, k)]
+
+
+    def recommend_cards(self, club_link_name, k = 3):
+        """
+        Same as 'recommend', except that it returns the club info needed for the club view page (link name,
+        name, logo URL and about us) for each recommended club, which is also served from memory.
+
+        Output: A list of up to 'k' recommended clubs' info, which is empty if the club isn't part of the model
+        """
+
+        model = self.current_model()
+
+        target_row = model.club_rows.get(club_link_name) if model is not None else None
+        if target_row is None:
+            return []
+
+        return [dict(model.cards[row]) for row in self._recommend_rows(model, target_row, k)]
+
+
+    def _recommend_many(self, club_link_names, k, to_result):
+        """
+        Recommends clubs for each of the given clubs in one pass, and turns the recommended rows of each club into
+        a result with 'to_result(model, rows)'.
+
+        Output: A dictionary from each given link name to its result, or None if the club isn't part of the model
+        """
+
+        model = self.current_model()
+
+        results = {link_name: None for link_name in club_link_names}
+        if model is None:
+            return results
+
+        known_link_names = [link_name for link_name in results if link_name in model.club_rows]
+        target_rows = np.array([model.club_rows[link_name] for link_name in known_link_names], dtype=np.int64)
+
+        for (link_name, rows) in zip(known_link_names, self._recommend_many_rows(model, target_rows, k)):
+            results[link_name] = to_result(model, rows)
+
+        return results
+
+
+    def recommend_many(self, club_link_names, k = 3):
+        """
+        Same as 'recommend', except for many clubs at once, which is much faster than calling 'recommend' for
+        each club (e.g for precomputing the recommendations of every club).
+
+        Input:
+        club_link_names - The list of link names of the clubs
+        k - Number of similar clubs to recommend per club
+
+        Output: A dictionary from each given link name to its recommended clubs' link names, or None if the club
+        isn't part of the model
+        """
+
+        return self._recommend_many(club_link_names, k, lambda model, rows: [model.link_names[row] for row in rows])
+
+
+    def recommend_cards_many(self, club_link_names, k = 3):
+        """
+        Same as 'recommend_cards', except for many clubs at once.
+
+        Output: A dictionary from each given link name to its recommended clubs' info, which is empty if the club
+        isn't part of the model
+        """
+
+        results = self._recommend_many(club_link_names, k, lambda model, rows: [dict(model.cards[row]) for row in rows])
+        return {link_name: (cards if cards is not None else []) for (link_name, cards) in results.items()}
@@ -0,0 +1,150 @@
+"""
+This file converts the legacy similar clubs recommender model, a pickled pandas DataFrame with the cosine
+similarity between each and every club (with the clubs' link names as both its index and columns), into a
+'ClubModel' (see 'club_model.py'). That way, a deployment that still has a legacy model can start serving from it
+right away, without waiting for a new model to be trained.
+
+The legacy table doesn't contain the clubs' vectors, so they're recovered from the similarities themselves: since
+the similarity table is (up to rounding) the product of the unit-length description vectors with themselves, its
+largest eigenvectors scaled by the square root of their eigenvalues give vectors with the same similarities. The
+word vectors are lost though, so the converted model can't be incrementally updated and the next update fully
+retrains it.
+
+To convert a legacy model on its own, run the command 'python -m recommenders.legacy_model <pickle file>' from the
+root of the project. The app also converts it automatically when booting without any saved model (see
+'ClubRecommender.warm_start').
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from recommenders.similarity import normalize_vectors
+from recommenders.neighbor_index import build_neighbor_index
+from recommenders.club_model import ClubModel
+
+# The largest number of dimensions the recovered vectors have (the word2vec vectors had 100)
+MAX_VECTOR_SIZE = 100
+
+# How many extra dimensions and refining passes are used to find the largest eigenvectors of the similarity table
+NUM_OVERSAMPLES = 20
+NUM_POWER_ITERATIONS = 2
+
+
+def read_legacy_table(pickle_file_loc):
+    """
+    Reads a legacy model's similarity table.
+
+    Output: A tuple of the link names of the clubs and a 2D float64 array with their similarities
+    """
+
+    similarity_table = pd.read_pickle(pickle_file_loc)
+
+    link_names = [str(link_name) for link_name in similarity_table.index]
+    similarities = similarity_table[similarity_table.index].to_numpy(dtype=np.float64)
+
+    return link_names, similarities
+
+
+def recover_vectors(similarities, max_vector_size = MAX_VECTOR_SIZE, seed = 42):
+    """
+    Recovers unit-length vectors whose pairwise cosine similarities match the given similarity table.
+
+    Input:
+    * similarities - A square 2D array of cosine similarities, which may contain NaNs (treated as unrelated clubs)
+    * max_vector_size - The largest number of dimensions to keep
+    * seed - The random seed for finding the eigenvectors, so the conversion is reproducible
+
+    Output: A 2D float32 array with the normalized vector of each club
+    """
+
+    similarities = np.nan_to_num(np.asarray(similarities, dtype=np.float64))
+    similarities = (similarities + similarities.T) / 2
+    np.fill_diagonal(similarities, 1.0)
+
+    if len(similarities) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    # Only the largest few eigenvectors are needed, so find them within a random subspace (refined with a couple
+    # of power iterations) instead of fully decomposing the table, which is O(n^2) per pass instead of O(n^3)
+    subspace_size = min(len(similarities), max_vector_size + NUM_OVERSAMPLES)
+    rng = np.random.default_rng(seed)
+
+    basis, _ = np.linalg.qr(similarities @ rng.standard_normal((len(similarities), subspace_size)))
+    for _ in range(NUM_POWER_ITERATIONS):
+        basis, _ = np.linalg.qr(similarities @ basis)
+
+    eigenvalues, small_eigenvectors = np.linalg.eigh(basis.T @ similarities @ basis)
+    eigenvectors = basis @ small_eigenvectors
+
+    top = np.argsort(-eigenvalues, kind='stable')[:max_vector_size]
+    scales = np.sqrt(np.clip(eigenvalues[top], 0, None))
+
+    return normalize_vectors(eigenvectors[:, top] * scales)
+
+
+def convert_legacy_model(link_names, similarities, clubs_table, cards, num_neighbors = 50, neighbor_index_type = 'auto'):
+    """
+    Builds a model out of a legacy similarity table. Only the clubs that are still in the given club data are
+    kept, in the same order as the legacy table.
+
+    Input:
+    * link_names - The link names of the clubs in the legacy table
+    * similarities - The legacy similarity table (see 'read_legacy_table')
+    * clubs_table - The raw DataFrame with the current club data, for the clubs' tags (see 'ClubRecommender._fetch_data')
+    * cards - The club info shown for each club of 'clubs_table', in the same order
+    * num_neighbors - The number of most similar clubs to keep per club
+    * neighbor_index_type - How to find each club's most similar clubs (see 'neighbor_index.py')
+
+    Output: The converted 'ClubModel', which doesn't have any word vectors nor a build time
+    """
+
+    table_rows = {link_name: i for (i, link_name) in enumerate(clubs_table['link_name'])}
+    kept_rows = [i for (i, link_name) in enumerate(link_names) if link_name in table_rows]
+
+    similarities = np.asarray(similarities)[np.ix_(kept_rows, kept_rows)]
+    vectors = recover_vectors(similarities)
+    neighbor_indices, neighbor_scores = build_neighbor_index(vectors, neighbor_index_type).all_neighbors(num_neighbors)
+
+    kept_link_names = [link_names[i] for i in kept_rows]
+    club_tags = clubs_table['tags'].tolist()
+
+    return ClubModel(
+        link_names=kept_link_names,
+        club_tags=[club_tags[table_rows[link_name]] for link_name in kept_link_names],
+        cards=[cards[table_rows[link_name]] for link_name in kept_link_names],
+        vectors=vectors,
+        neighbor_indices=neighbor_indices,
+        neighbor_scores=neighbor_scores,
+    )
+
+
+if __name__ == '__main__':
+    import os
+    import time
+
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    import pymongo
+
+    from app_config import CurrentConfig
+    from recommenders.club_recommender import ClubRecommender
+
+    parser = argparse.ArgumentParser(description='Convert a legacy pickled recommender model into the model store')
+    parser.add_argument('pickle_file', help='The legacy model, e.g "ml-models/club-model-dev.pkl"')
+    parser.add_argument('--folder', default=f'ml-models/club-model-{CurrentConfig.MODE}')
+    parser.add_argument('--float-dtype', choices=['float32', 'float16'], default='float32')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    mongo_client = pymongo.MongoClient(os.getenv('MONGO_URI'))
+
+    try:
+        club_recommender = ClubRecommender(mongo_client[CurrentConfig.DATABASE_NAME], args.folder, model_float_dtype=args.float_dtype)
+        version = club_recommender.import_legacy_model(args.pickle_file)
+    finally:
+        mongo_client.close()
+
+    print(f'Published model version {version} from "{args.pickle_file}" in {time.perf_counter() - start:.1f}s')
@@ -0,0 +1,207 @@
+import os
+import re
+import shutil
+import tempfile
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from recommenders.club_model import ClubModel
+
+CURRENT_FILE_NAME = 'CURRENT'
+LOCK_FILE_NAME = '.train.lock'
+VERSION_FOLDER_REGEX = re.compile(r'^v(\d+)$')
+
+
+def _atomic_write(file_loc, write_func):
+    """
+    Writes a file by first writing to a temporary file in the same folder and then renaming it over the final
+    location, so that readers either see the previous file or the complete new file, and never a partial one.
+    """
+
+    folder = os.path.dirname(file_loc)
+    fd, temp_file_loc = tempfile.mkstemp(dir=folder, prefix='.tmp-')
+
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            write_func(temp_file)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        os.replace(temp_file_loc, file_loc)
+    except BaseException:
+        if os.path.exists(temp_file_loc):
+            os.remove(temp_file_loc)
+        raise
+
+
+class ModelStore:
+    """
+    This class stores versioned copies of the similar clubs recommender model inside a folder. Each saved model
+    gets a new version number and its own folder (e.g 'v000012/'), and a 'CURRENT' file points to the version
+    that should be served. Both are replaced atomically, so a model is never overwritten in place and the
+    previous versions stay around for rolling back.
+
+    The models are loaded memory-mapped (see 'club_model.py'), so every process on the same machine that loads
+    the same version shares its arrays. Removing an old version while a process still has it mapped is fine,
+    since the files are only freed once they're unmapped.
+
+    The store also provides a lock across processes (see 'training_lock'), so that only one process trains a
+    new model at a time.
+
+    Example:
+
+    model_store = ModelStore('ml-models/club-model-dev')
+
+    version = model_store.save(model)   # saves the model and makes it the current version
+    model = model_store.load()          # loads the current version
+
+    model_store.set_current(version - 1)  # rolls back to the previous version
+    """
+
+    def __init__(self, folder, max_versions = 5, float_dtype = 'float32'):
+        """
+        Input:
+        * folder - The folder to keep the model versions in
+        * max_versions - The number of most recent versions to keep around
+        * float_dtype - The type the models' float arrays are saved with (see 'ClubModel.save')
+        """
+
+        self.folder = folder
+        self.max_versions = max_versions
+        self.float_dtype = float_dtype
+
+
+    def _version_folder(self, version):
+        return os.path.join(self.folder, f'v{version:06d}')
+
+
+    def versions(self):
+        """
+        Returns the list of saved model versions, from oldest to newest.
+        """
+
+        if not os.path.isdir(self.folder):
+            return []
+
+        found_versions = []
+        for file_name in os.listdir(self.folder):
+            match = VERSION_FOLDER_REGEX.match(file_name)
+            if match:
+                found_versions += [int(match.group(1))]
+
+        return sorted(found_versions)
+
+
+    def current_version(self):
+        """
+        Returns the version that the 'CURRENT' file points to, or None if no model was saved yet.
+        """
+
+        try:
+            with open(os.path.join(self.folder, CURRENT_FILE_NAME), 'r') as current_file:
+                return int(current_file.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def set_current(self, version):
+        """
+        Points the 'CURRENT' file to an already saved version.
+        """
+
+        if not os.path.isdir(self._version_folder(version)):
+            raise FileNotFoundError(f'Model version {version} does not exist in "{self.folder}"')
+
+        _atomic_write(
+            os.path.join(self.folder, CURRENT_FILE_NAME),
+            lambda current_file: current_file.write(str(version).encode('utf-8'))
+        )
+
+
+    def save(self, model):
+        """
+        Saves the model under a new version, makes it the current version and removes the oldest versions
+        past 'max_versions'. The model's 'version' is set to the new version number.
+
+        Output: The new version number
+        """
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        saved_versions = self.versions()
+        version = saved_versions[-1] + 1 if len(saved_versions) > 0 else 1
+        model.version = version
+
+        # Write the model into a temporary folder and rename it once it's complete
+        temp_folder = tempfile.mkdtemp(dir=self.folder, prefix='.tmp-')
+
+        try:
+            model.save(temp_folder, self.float_dtype)
+
+            for file_name in os.listdir(temp_folder):
+                with open(os.path.join(temp_folder, file_name), 'rb') as model_file:
+                    os.fsync(model_file.fileno())
+
+            os.chmod(temp_folder, 0o755)
+            os.rename(temp_folder, self._version_folder(version))
+        except BaseException:
+            shutil.rmtree(temp_folder, ignore_errors=True)
+            raise
+
+        self.set_current(version)
+
+        for old_version in (saved_versions + [version])[:-self.max_versions]:
+            shutil.rmtree(self._version_folder(old_version), ignore_errors=True)
+
+        return version
+
+
+    def load(self, version = None):
+        """
+        Loads the given version of the model, or the current version if no version is given.
+
+        Output: The loaded model, or None if there's no such model
+        """
+
+        if version is None:
+            version = self.current_version()
+
+        if version is None or not os.path.isdir(self._version_folder(version)):
+            return None
+
+        return ClubModel.load(self._version_folder(version))
+
+
+    @contextlib.contextmanager
+    def training_lock(self, blocking = True):
+        """
+        Holds an exclusive lock on the store across processes (e.g all the gunicorn workers), for as long as the
+        'with' block runs. Where file locks aren't supported, the lock is always acquired.
+
+        Input:
+        * blocking - Whether to wait for the lock if another process holds it
+
+        Output: Yields True if the lock was acquired, or False if 'blocking' is False and another process holds it
+        """
+
+        if fcntl is None:
+            yield True
+            return
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        with open(os.path.join(self.folder, LOCK_FILE_NAME), 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
@@ -0,0 +1,267 @@
+"""
+This file contains the neighbor indices used by the club recommender to find each club's most similar clubs. Both
+indices share the same interface ('search' and 'all_neighbors'), so the recommender can pick one based on the number
+of clubs (see 'build_neighbor_index'):
+
+* ExactNeighborIndex compares each club against every other club, which is exact but takes O(n^2) time overall.
+* IVFNeighborIndex groups the clubs into clusters with k-means and only compares each club against the clubs in its
+  closest few clusters. It's approximate (some true neighbors can be missed), but it scales to tens of thousands
+  of clubs. See 'benchmarks/neighbor_index.py' for how its recall and latency compare to the exact index.
+"""
+
+import numpy as np
+
+from recommenders.similarity import normalize_vectors, top_k_rows
+
+# The largest number of clubs that the exact index is used for when picking automatically
+EXACT_MAX_CLUBS = 5000
+
+
+class ExactNeighborIndex:
+    """
+    This class finds the most similar clubs by brute force, one block of rows at a time.
+
+    Example:
+
+    index = ExactNeighborIndex(vectors)
+
+    neighbor_indices, neighbor_scores = index.search([0, 5], k=10)  # the 10 most similar clubs of clubs 0 and 5
+    neighbor_indices, neighbor_scores = index.all_neighbors(k=10)   # the 10 most similar clubs of every club
+    """
+
+    def __init__(self, vectors, block_size = 1024):
+        """
+        Input:
+        * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+        * block_size - The number of rows to compute at once
+        """
+
+        self.normalized = normalize_vectors(vectors)
+        self.block_size = block_size
+
+
+    def __len__(self):
+        return len(self.normalized)
+
+
+    def search(self, rows, k):
+        """
+        Finds the 'k' most similar clubs of each of the given clubs (which are never their own neighbors).
+
+        Output: A tuple of two (len(rows), k) arrays with the int32 row indices and float32 similarity scores of
+        each club's neighbors, sorted from most to least similar and padded with -1 (and -inf)
+        """
+
+        return top_k_rows(self.normalized, np.asarray(rows, dtype=np.int64), k, self.block_size)
+
+
+    def all_neighbors(self, k):
+        """
+        Same as 'search', for every club.
+        """
+
+        return self.search(np.arange(len(self)), k)
+
+
+class IVFNeighborIndex:
+    """
+    This class is an approximate "inverted file" index. The clubs are split into 'num_lists' clusters with spherical
+    k-means, and searching for a club's neighbors only scores the clubs in the 'num_probes' clusters whose centers
+    are the most similar to that club. More probes means better recall and slower searches.
+
+    Example:
+
+    index = IVFNeighborIndex(vectors, num_probes=16)
+
+    neighbor_indices, neighbor_scores = index.all_neighbors(k=50)
+    """
+
+    def __init__(self, vectors, num_lists = None, num_probes = 16, num_iterations = 10, max_training_points = 50000, seed = 42, block_size = 1024):
+        """
+        Input:
+        * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+        * num_lists - The number of clusters, which defaults to the square root of the number of clubs
+        * num_probes - The number of closest clusters to search per club
+        * num_iterations - The number of k-means iterations
+        * max_training_points - The largest number of clubs that k-means is run on (the rest are only assigned)
+        * seed - The random seed for k-means, so the index is reproducible
+        * block_size - The number of rows to compute at once
+        """
+
+        self.normalized = normalize_vectors(vectors)
+        self.block_size = block_size
+
+        num_clubs = len(self.normalized)
+        if num_lists is None:
+            num_lists = int(np.sqrt(num_clubs))
+
+        self.num_lists = max(1, min(num_lists, num_clubs, max_training_points))
+        self.num_probes = max(1, min(num_probes, self.num_lists))
+
+        rng = np.random.default_rng(seed)
+
+        if num_clubs == 0:
+            self.centroids = np.zeros((1, self.normalized.shape[1]), dtype=np.float32)
+        else:
+            training_rows = rng.choice(num_clubs, min(num_clubs, max_training_points), replace=False)
+            self.centroids = self._train_centroids(self.normalized[training_rows], num_iterations, rng)
+
+        # Store the clubs of each cluster as contiguous slices of a single array
+        assignments = self._assign(self.normalized)
+        self.list_members = np.argsort(assignments, kind='stable').astype(np.int64)
+        self.list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=self.num_lists))])
+
+
+    def __len__(self):
+        return len(self.normalized)
+
+
+    def _assign(self, normalized):
+        """
+        Returns the closest cluster of each of the given (normalized) vectors.
+        """
+
+        assignments = np.zeros(len(normalized), dtype=np.int64)
+
+        for start in range(0, len(normalized), self.block_size):
+            block_scores = normalized[start:start + self.block_size] @ self.centroids.T
+            assignments[start:start + self.block_size] = np.argmax(block_scores, axis=1)
+
+        return assignments
+
+
+    def _train_centroids(self, points, num_iterations, rng):
+        """
+        Runs spherical k-means (i.e with cosine similarity and unit-length centers) over the given points.
+        """
+
+        self.centroids = points[rng.choice(len(points), self.num_lists, replace=False)].copy()
+
+        for _ in range(num_iterations):
+            assignments = self._assign(points)
+            counts = np.bincount(assignments, minlength=self.num_lists)
+
+            # Add up the points of each cluster, by sorting them by cluster first
+            order = np.argsort(assignments, kind='stable')
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            non_empty = counts > 0
+
+            sums = np.zeros_like(self.centroids)
+            sums[non_empty] = np.add.reduceat(points[order], starts[non_empty], axis=0)
+
+            # Restart any empty cluster from a random point
+            num_empty = np.count_nonzero(~non_empty)
+            if num_empty > 0:
+                sums[~non_empty] = points[rng.choice(len(points), num_empty, replace=False)]
+
+            self.centroids = normalize_vectors(sums)
+
+        return self.centroids
+
+
+    def search(self, rows, k):
+        """
+        Finds (approximately) the 'k' most similar clubs of each of the given clubs. See 'ExactNeighborIndex.search'
+        for the format of the output.
+        """
+
+        rows = np.asarray(rows, dtype=np.int64)
+
+        neighbor_indices = np.full((len(rows), k), -1, dtype=np.int32)
+        neighbor_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+
+        for start in range(0, len(rows), self.block_size):
+            block_rows = rows[start:start + self.block_size]
+
+            centroid_scores = self.normalized[block_rows] @ self.centroids.T
+            probes = np.argpartition(-centroid_scores, self.num_probes - 1, axis=1)[:, :self.num_probes]
+
+            for (i, row) in enumerate(block_rows):
+                candidates = np.concatenate([
+                    self.list_members[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+                    for list_id in probes[i]
+                ])
+                candidates = candidates[candidates != row]
+
+                num_neighbors = min(k, len(candidates))
+                if num_neighbors == 0:
+                    continue
+
+                scores = self.normalized[candidates] @ self.normalized[row]
+
+                top = np.argpartition(-scores, num_neighbors - 1)[:num_neighbors]
+                top = top[np.argsort(-scores[top], kind='stable')]
+
+                neighbor_indices[start + i, :num_neighbors] = candidates[top]
+                neighbor_scores[start + i, :num_neighbors] = scores[top]
+
+        return neighbor_indices, neighbor_scores
+
+
+    def all_neighbors(self, k):
+        """
+        Same as 'search', for every club. Instead of probing the clusters of each club separately, the clubs of each
+        cluster are searched together against the clusters closest to their cluster's center, so that each cluster
+        only takes a single matrix multiplication.
+        """
+
+        neighbor_indices = np.full((len(self), k), -1, dtype=np.int32)
+        neighbor_scores = np.full((len(self), k), -np.inf, dtype=np.float32)
+
+        centroid_probes = np.argpartition(-(self.centroids @ self.centroids.T), self.num_probes - 1, axis=1)[:, :self.num_probes]
+
+        for list_id in range(self.num_lists):
+            members = self.list_members[self.list_offsets[list_id]:self.list_offsets[list_id + 1]]
+
+            candidates = np.concatenate([
+                self.list_members[self.list_offsets[probe_id]:self.list_offsets[probe_id + 1]]
+                for probe_id in centroid_probes[list_id]
+            ])
+
+            num_neighbors = min(k, len(candidates) - 1)
+            if len(members) == 0 or num_neighbors <= 0:
+                continue
+
+            candidate_vectors = self.normalized[candidates]
+
+            for start in range(0, len(members), self.block_size):
+                block_members = members[start:start + self.block_size]
+                block = self.normalized[block_members] @ candidate_vectors.T
+
+                # Make sure that a club is never its own neighbor
+                block[block_members[:, np.newaxis] == candidates[np.newaxis, :]] = -np.inf
+
+                top = np.argpartition(-block, num_neighbors - 1, axis=1)[:, :num_neighbors]
+                top_scores = np.take_along_axis(block, top, axis=1)
+
+                order = np.argsort(-top_scores, axis=1, kind='stable')
+                top_indices = candidates[np.take_along_axis(top, order, axis=1)]
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+                neighbor_indices[block_members, :num_neighbors] = np.where(np.isfinite(top_scores), top_indices, -1)
+                neighbor_scores[block_members, :num_neighbors] = top_scores
+
+        return neighbor_indices, neighbor_scores
+
+
+def build_neighbor_index(vectors, index_type = 'auto'):
+    """
+    Builds a neighbor index for the given club vectors.
+
+    Input:
+    * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+    * index_type - Either 'exact', 'ivf' or 'auto', which picks the exact index for up to EXACT_MAX_CLUBS clubs
+      and the IVF index otherwise
+
+    Output: The neighbor index
+    """
+
+    if index_type == 'auto':
+        index_type = 'exact' if len(vectors) <= EXACT_MAX_CLUBS else 'ivf'
+
+    if index_type == 'exact':
+        return ExactNeighborIndex(vectors)
+    elif index_type == 'ivf':
+        return IVFNeighborIndex(vectors)
+    else:
+        raise ValueError(f'Unknown neighbor index type: "{index_type}"')
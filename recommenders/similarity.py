@@ -0,0 +1,162 @@
+"""
+This file contains the vectorized similarity engine used by the club recommender. Instead of comparing every pair
+of clubs one at a time, the club vectors are stacked into a single matrix so that all of the pairwise similarities
+can be computed with one matrix multiplication.
+"""
+
+import numpy as np
+
+
+def normalize_vectors(vectors):
+    """
+    Stacks the given vectors into a float32 matrix and scales each row to unit length.
+
+    Input:
+    * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+
+    Output: A 2D float32 array where each row has a length of 1. Rows made entirely of zeros are left as zeros,
+    so they end up with a similarity of 0 to every club.
+    """
+
+    if isinstance(vectors, np.ndarray):
+        matrix = vectors.astype(np.float32, copy=True)
+    else:
+        matrix = np.array([np.asarray(vector, dtype=np.float32) for vector in vectors], dtype=np.float32)
+
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1) if len(matrix) > 0 else np.zeros((0, 0), dtype=np.float32)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+
+    matrix /= norms
+    return matrix
+
+
+def cosine_similarity_matrix(vectors):
+    """
+    Computes the cosine similarity between each and every club vector.
+
+    Input:
+    * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+
+    Output: A 2D float32 array of shape (n, n), where entry (i, j) is the cosine similarity between club i
+    and club j. Similar clubs will be close to 1, and otherwise the similarity will be close to 0.
+    """
+
+    normalized = normalize_vectors(vectors)
+    return normalized @ normalized.T
+
+
+def top_k_rows(normalized, rows, k, block_size=1024):
+    """
+    Finds the 'k' most similar clubs for only some of the clubs, one block of rows at a time.
+
+    Input:
+    * normalized - A 2D array with one row per club, already scaled by 'normalize_vectors'
+    * rows - An integer array of the rows to find the neighbors of
+    * k - The number of neighbors to keep per club
+    * block_size - The number of rows to compute at once
+
+    Output: Same as 'top_k_neighbors', except that there's only one row per given row (in the same order)
+    """
+
+    num_clubs = len(normalized)
+
+    neighbor_indices = np.full((len(rows), k), -1, dtype=np.int32)
+    neighbor_scores = np.full((len(rows), k), -np.inf, dtype=np.float32)
+
+    num_neighbors = min(k, num_clubs - 1)
+    if num_neighbors <= 0:
+        return neighbor_indices, neighbor_scores
+
+    for start in range(0, len(rows), block_size):
+        block_rows = rows[start:start + block_size]
+        block = normalized[block_rows] @ normalized.T
+
+        # Make sure that a club is never recommended to itself
+        block[np.arange(len(block_rows)), block_rows] = -np.inf
+
+        # Pick the top entries of each row in linear time and only sort those
+        top_indices = np.argpartition(-block, num_neighbors - 1, axis=1)[:, :num_neighbors]
+        top_scores = np.take_along_axis(block, top_indices, axis=1)
+
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        neighbor_indices[start:start + len(block_rows), :num_neighbors] = np.take_along_axis(top_indices, order, axis=1)
+        neighbor_scores[start:start + len(block_rows), :num_neighbors] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbor_indices, neighbor_scores
+
+
+def top_k_neighbors(vectors, k, block_size=1024):
+    """
+    Finds the 'k' most similar clubs for each club, without ever holding the full similarity matrix in memory.
+    The similarities are computed one block of rows at a time and only the best 'k' entries of each row are kept.
+
+    Input:
+    * vectors - A list of equally sized numeric vectors or a 2D array with one row per club
+    * k - The number of neighbors to keep per club
+    * block_size - The number of rows to compute at once, which bounds the memory used to (block_size x n) floats
+
+    Output: A tuple of two (n, k) arrays. The first holds the int32 row indices of each club's neighbors and the
+    second holds their float32 similarity scores, both sorted from most to least similar. A club is never its own
+    neighbor, and if there are fewer than 'k' other clubs, the remaining entries are padded with -1 (and -inf).
+    """
+
+    normalized = normalize_vectors(vectors)
+    return top_k_rows(normalized, np.arange(len(normalized)), k, block_size)
+
+
+def update_top_k_neighbors(vectors, neighbor_indices, neighbor_scores, changed_rows, block_size=1024):
+    """
+    Updates the most similar clubs of each club after the vectors of only a few clubs have changed, by only
+    computing the rows and columns of the similarity matrix that belong to those clubs.
+
+    The changed clubs get their neighbors recomputed from scratch. Every other club keeps its current neighbors
+    and merges in the changed clubs, if they're now similar enough. Any entry that pointed to a changed club must
+    already be cleared to -1 (and -inf) by the caller. Note that an unchanged club that lost some of its neighbors
+    that way won't get them back from other unchanged clubs until the next full rebuild.
+
+    Input:
+    * vectors - A 2D array with one row per club, including the changed clubs
+    * neighbor_indices - The current (n, k) int32 array of neighbors, as returned by 'top_k_neighbors'
+    * neighbor_scores - The current (n, k) float32 array of similarity scores
+    * changed_rows - The rows of the clubs whose vectors have changed (or that are new)
+    * block_size - The number of rows to compute at once
+
+    Output: A tuple of the updated (n, k) neighbor indices and scores, as new arrays.
+    """
+
+    normalized = normalize_vectors(vectors)
+    num_clubs, k = neighbor_indices.shape
+
+    changed_rows = np.unique(np.asarray(changed_rows, dtype=np.int64))
+    other_rows = np.setdiff1d(np.arange(num_clubs), changed_rows)
+
+    new_indices = np.array(neighbor_indices, dtype=np.int32)
+    new_scores = np.array(neighbor_scores, dtype=np.float32)
+
+    if len(changed_rows) == 0:
+        return new_indices, new_scores
+
+    # Columns: merge the changed clubs into the neighbors of every other club
+    changed_vectors = normalized[changed_rows]
+
+    for start in range(0, len(other_rows), block_size):
+        block_rows = other_rows[start:start + block_size]
+        block_scores = normalized[block_rows] @ changed_vectors.T
+
+        candidate_indices = np.concatenate([
+            new_indices[block_rows],
+            np.broadcast_to(changed_rows.astype(np.int32), block_scores.shape)
+        ], axis=1)
+        candidate_scores = np.concatenate([new_scores[block_rows], block_scores], axis=1)
+
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :k]
+        new_indices[block_rows] = np.take_along_axis(candidate_indices, order, axis=1)
+        new_scores[block_rows] = np.take_along_axis(candidate_scores, order, axis=1)
+
+    # Rows: recompute the neighbors of the changed clubs against everyone
+    new_indices[changed_rows], new_scores[changed_rows] = top_k_rows(normalized, changed_rows, k, block_size)
+
+    return new_indices, new_scores
@@ -0,0 +1,158 @@
+import hashlib
+import threading
+import collections
+
+import numpy as np
+
+# How much a favorited club counts towards a student's profile, compared to a single visit
+FAVORITE_WEIGHT = 3.0
+
+# How many of the most recent visits count towards a student's profile
+MAX_VISITED_CLUBS = 50
+
+# How much matching all of a student's interests counts, compared to a perfect description match
+INTERESTS_WEIGHT = 0.5
+
+
+class StudentRecommender:
+    """
+    This class contains the "smart" clubs recommender for students. It reuses the similar clubs recommender's model
+    (see 'club_recommender.py'), so it never has to go to the database:
+
+    * A profile vector is built by adding up the description vectors of the student's favorited clubs (which count
+      FAVORITE_WEIGHT times as much) and recently visited clubs (which count once per visit).
+    * Each club is scored by the cosine similarity between its vector and the profile vector, plus the fraction of
+      the student's interests that the club is tagged with (times INTERESTS_WEIGHT).
+    * The clubs with the highest scores are recommended, except for the ones the student already favorited.
+
+    Students without any of those signals get random clubs instead.
+
+    The results of each student are cached, along with a signature of their signals and the version of the model
+    used. A cached result is only used if both still match, so it's invalidated as soon as the student changes
+    their interests, favorites a club, visits a club or a new model gets published.
+
+    Example:
+
+    student_recommender = StudentRecommender(flask_exts.club_recommender)
+
+    recommended_clubs = student_recommender.recommend_cards(
+        str(user.id), interests=[1, 4], favorited_clubs=['robotics-club'], visited_clubs=['chess-club'], k=3
+    )
+    """
+
+    def __init__(self, club_recommender, max_cache_size = 10000):
+        """
+        Input:
+        * club_recommender - The similar clubs recommender whose model is used
+        * max_cache_size - The number of students to keep cached, dropping the least recently used ones
+        """
+
+        self.club_recommender = club_recommender
+        self.max_cache_size = max_cache_size
+
+        self._cache = collections.OrderedDict()
+        self._cache_lock = threading.Lock()
+
+
+    def _signature(self, interests, favorited_clubs, visited_clubs, k):
+        signals = repr((sorted(interests), list(favorited_clubs), list(visited_clubs[-MAX_VISITED_CLUBS:]), k))
+        return hashlib.blake2b(signals.encode('utf-8'), digest_size=16).digest()
+
+
+    def _score_clubs(self, model, interests, favorited_clubs, visited_clubs):
+        """
+        Scores every club of the model for a student (see the class description).
+
+        Output: A float32 array with the score of each club, in the same order as the model
+        """
+
+        weights = collections.Counter()
+
+        for link_name in favorited_clubs:
+            weights[link_name] += FAVORITE_WEIGHT
+
+        for link_name in visited_clubs[-MAX_VISITED_CLUBS:]:
+            weights[link_name] += 1.0
+
+        profile_rows = [model.club_rows[link_name] for link_name in weights if link_name in model.club_rows]
+        profile_weights = [weights[link_name] for link_name in weights if link_name in model.club_rows]
+
+        scores = np.zeros(len(model), dtype=np.float32)
+
+        if len(profile_rows) > 0:
+            profile_vector = np.asarray(profile_weights, dtype=np.float32) @ model.vectors[profile_rows]
+            profile_norm = np.linalg.norm(profile_vector)
+
+            if profile_norm > 0:
+                scores += model.vectors @ (profile_vector / profile_norm)
+
+        if len(interests) > 0:
+            scores += INTERESTS_WEIGHT * model.tag_index.overlap_counts(interests) / len(set(interests))
+
+        return scores
+
+
+    def _recommend_rows(self, model, interests, favorited_clubs, visited_clubs, k):
+        """
+        Recommends up to 'k' clubs for a student.
+
+        Output: An array with the rows of the recommended clubs, from best to worst
+        """
+
+        excluded_rows = [model.club_rows[link_name] for link_name in favorited_clubs if link_name in model.club_rows]
+
+        candidates = np.ones(len(model), dtype=bool)
+        candidates[excluded_rows] = False
+        candidates = np.flatnonzero(candidates)
+
+        has_signals = len(interests) > 0 or any(link_name in model.club_rows for link_name in favorited_clubs) \
+            or any(link_name in model.club_rows for link_name in visited_clubs[-MAX_VISITED_CLUBS:])
+
+        if not has_signals:
+            return np.random.default_rng().permutation(candidates)[:k]
+
+        scores = self._score_clubs(model, interests, favorited_clubs, visited_clubs)[candidates]
+        return candidates[np.argsort(-scores, kind='stable')[:k]]
+
+
+    def recommend_cards(self, student_id, interests, favorited_clubs, visited_clubs, k = 3):
+        """
+        Recommends clubs for a student based on their interests and the clubs they've favorited and visited,
+        which is served from the model in memory (or from the cache).
+
+        Input:
+        * student_id - A unique ID of the student, used for caching their results
+        * interests - The list of tag IDs the student is interested in
+        * favorited_clubs - The link names of the student's favorited clubs
+        * visited_clubs - The link names of the clubs the student visited, from oldest to newest
+        * k - Number of clubs to recommend
+
+        Output: A list of up to 'k' recommended clubs' info (link name, name, logo URL and about us)
+        """
+
+        model = self.club_recommender.current_model()
+        if model is None:
+            return []
+
+        signature = self._signature(interests, favorited_clubs, visited_clubs, k)
+
+        with self._cache_lock:
+            cached = self._cache.get(student_id)
+
+            if cached is not None and cached[0] == signature and cached[1] == model.version:
+                self._cache.move_to_end(student_id)
+                return [dict(card) for card in cached[2]]
+
+        recommended_cards = [
+            dict(model.cards[row])
+            for row in self._recommend_rows(model, interests, favorited_clubs, visited_clubs, k)
+        ]
+
+        with self._cache_lock:
+            self._cache[student_id] = (signature, model.version, recommended_cards)
+            self._cache.move_to_end(student_id)
+
+            while len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+
+        return [dict(card) for card in recommended_cards]
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class TagIndex:
+    """
+    This class is a precomputed tag membership matrix for a list of clubs, with one row per club and one column
+    per tag. It's built once when the recommender model is trained, so that the number of tags that a club has in
+    common with every other club can be computed with a single vectorized operation.
+
+    Example:
+
+    tag_index = TagIndex([[1, 2], [2, 3], [4]])
+
+    tag_index.overlap_counts([2, 3]) # will return array([1, 2, 0])
+    """
+
+    def __init__(self, club_tags):
+        """
+        Builds the membership matrix given the list of tag IDs of each club.
+        """
+
+        self.tag_ids = sorted({tag_id for tags in club_tags for tag_id in tags})
+        self.tag_columns = {tag_id: i for (i, tag_id) in enumerate(self.tag_ids)}
+
+        self.membership = np.zeros((len(club_tags), len(self.tag_ids)), dtype=bool)
+        for (row, tags) in enumerate(club_tags):
+            self.membership[row, [self.tag_columns[tag_id] for tag_id in tags]] = True
+
+
+    @classmethod
+    def from_arrays(cls, tag_ids, membership):
+        """
+        Rebuilds a tag index from its saved tag IDs and membership matrix (which may be memory-mapped).
+        """
+
+        tag_index = cls.__new__(cls)
+        tag_index.tag_ids = [int(tag_id) for tag_id in tag_ids]
+        tag_index.tag_columns = {tag_id: i for (i, tag_id) in enumerate(tag_index.tag_ids)}
+        tag_index.membership = membership
+
+        return tag_index
+
+
+    def __len__(self):
+        return len(self.membership)
+
+
+    def club_tags(self):
+        """
+        Returns the list of tag IDs of each club, in the same order as the index.
+        """
+
+        # Find all the memberships at once (sorted by club), then split them up per club
+        rows, columns = np.nonzero(np.asarray(self.membership))
+        tag_ids = np.asarray(self.tag_ids, dtype=np.int64)[columns].tolist()
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=len(self)))]).tolist()
+
+        return [tag_ids[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+
+    def overlap_counts(self, tag_ids):
+        """
+        Counts how many of the given tags each club has. Duplicate tags are only counted once and tags that
+        no club has are ignored.
+
+        Input:
+        * tag_ids - A list of tag IDs (i.e the tags of the target club)
+
+        Output: An int32 array with the number of matching tags for each club, in the same order as the index.
+        """
+
+        columns = [self.tag_columns[tag_id] for tag_id in set(tag_ids) if tag_id in self.tag_columns]
+        return np.count_nonzero(self.membership[:, columns], axis=1).astype(np.int32)
@@ -0,0 +1,270 @@
+import re
+import hashlib
+import collections
+import multiprocessing
+
+import numpy as np
+import nltk
+from nltk.corpus import stopwords
+
+# Words that show up in most club descriptions without saying anything about the club
+UC_BERKELEY_WORDS = ['uc', 'berkeley', 'also', 'providing', 'various', 'well', 'provide', 'one']
+
+# The smallest number of uncached descriptions worth splitting across a process pool
+MIN_PARALLEL_DESCRIPTIONS = 5000
+
+WORD_REGEX = re.compile(r'[a-zA-Z]+')
+
+# The size (in bytes) of the hash that cleaned descriptions are cached by
+CACHE_KEY_SIZE = 16
+
+_english_stopwords = None
+
+
+def english_stopwords():
+    """
+    Returns the set of English stopwords from NLTK. They're only downloaded the first time they're needed, and
+    only if they aren't installed already, so importing this file doesn't do any network I/O.
+    """
+
+    global _english_stopwords
+
+    if _english_stopwords is None:
+        try:
+            words = stopwords.words('english')
+        except LookupError:
+            nltk.download('stopwords', quiet=True)
+            words = stopwords.words('english')
+
+        _english_stopwords = frozenset(words)
+
+    return _english_stopwords
+
+
+def _tokenize(description, ignored_words):
+    """
+    Turns a single description into its list of significant words (see 'TextCleaner').
+    """
+
+    if not isinstance(description, str):
+        return [""]
+
+    return [word for word in (match.lower() for match in WORD_REGEX.findall(description)) if word not in ignored_words]
+
+
+def _tokenize_batch(args):
+    """
+    Tokenizes a batch of descriptions inside a process pool worker.
+    """
+
+    (descriptions, ignored_words) = args
+    return [_tokenize(description, ignored_words) for description in descriptions]
+
+
+class CleanedDescriptions:
+    """
+    This class is a compact copy of a 'TextCleaner' cache, i.e the significant words of each cleaned description
+    by the hash of the description. Like the word vectors, it's saved along with the recommender model (see
+    'club_model.py'), so that a new training process starts out with the words of every club that hasn't changed
+    instead of tokenizing all of them again (see 'ClubRecommender.load_cleaned_descriptions').
+
+    The words are stored as their rows in 'vocabulary', where the words of the i-th description are the rows
+    word_rows[offsets[i]:offsets[i + 1]].
+
+    Example:
+
+    cleaned_descriptions = text_cleaner.cached_descriptions()
+
+    ...
+
+    text_cleaner.load_cached_descriptions(cleaned_descriptions)
+    """
+
+    def __init__(self, keys, vocabulary, offsets, word_rows):
+        """
+        Input:
+        * keys - A 2D uint8 array with the hash of each description, one row per description
+        * vocabulary - The distinct words of all the descriptions
+        * offsets - A 1D int64 array with where the words of each description start in 'word_rows', plus where
+          the last one ends
+        * word_rows - A 1D int32 array with the row in 'vocabulary' of each word of each description
+        """
+
+        self.keys = keys
+        self.vocabulary = list(vocabulary)
+        self.offsets = offsets
+        self.word_rows = word_rows
+
+
+    @classmethod
+    def from_cache(cls, cache):
+        """
+        Copies a dictionary of cached descriptions (i.e a hash to a tuple of words), in the same order.
+        """
+
+        vocabulary_rows = {}
+        offsets = [0]
+        word_rows = []
+
+        for words in cache.values():
+            word_rows += [vocabulary_rows.setdefault(word, len(vocabulary_rows)) for word in words]
+            offsets += [len(word_rows)]
+
+        keys = np.frombuffer(b''.join(cache.keys()), dtype=np.uint8).reshape(len(cache), CACHE_KEY_SIZE)
+
+        return cls(keys, vocabulary_rows.keys(), np.array(offsets, dtype=np.int64), np.array(word_rows, dtype=np.int32))
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def items(self):
+        """
+        Yields the hash and the tuple of words of each description, in the same order as they were copied.
+        """
+
+        vocabulary = self.vocabulary
+        offsets = self.offsets.tolist()
+        word_rows = self.word_rows.tolist()
+
+        for (i, key) in enumerate(self.keys):
+            yield key.tobytes(), tuple(vocabulary[row] for row in word_rows[offsets[i]:offsets[i + 1]])
+
+
+class TextCleaner:
+    """
+    This class turns club descriptions into lists of significant words for the recommender, by keeping only the
+    words made of letters, lowercasing them and removing the stopwords (along with 'UC_BERKELEY_WORDS').
+
+    The set of ignored words and the regex are only built once, and the cleaned descriptions are cached by a hash
+    of the original description, so a description that hasn't changed is never tokenized twice. The cache can be
+    copied out and loaded back (see 'CleanedDescriptions'), so that it outlives the process.
+
+    Example:
+
+    text_cleaner = TextCleaner()
+
+    text_cleaner.clean('We build robots at UC Berkeley!')    # will return ['build', 'robots']
+    text_cleaner.clean_many(['Chess club', 'Film club'])     # will return [['chess', 'club'], ['film', 'club']]
+    """
+
+    def __init__(self, extra_stopwords = UC_BERKELEY_WORDS, max_cache_size = 50000):
+        """
+        Input:
+        * extra_stopwords - Words to ignore on top of NLTK's English stopwords
+        * max_cache_size - The number of cleaned descriptions to keep cached, dropping the least recently used ones
+        """
+
+        self.extra_stopwords = frozenset(extra_stopwords)
+        self.max_cache_size = max_cache_size
+
+        self._ignored_words = None
+        self._cache = collections.OrderedDict()
+
+
+    @property
+    def ignored_words(self):
+        """
+        The stopwords plus the extra stopwords, which are only loaded once they're first needed.
+        """
+
+        if self._ignored_words is None:
+            self._ignored_words = english_stopwords() | self.extra_stopwords
+
+        return self._ignored_words
+
+
+    def _cache_key(self, description):
+        return hashlib.blake2b(description.encode('utf-8'), digest_size=CACHE_KEY_SIZE).digest()
+
+
+    def _cache_put(self, key, words):
+        self._cache[key] = tuple(words)
+        self._cache.move_to_end(key)
+
+        while len(self._cache) > self.max_cache_size:
+            self._cache.popitem(last=False)
+
+
+    def cached_descriptions(self):
+        """
+        Returns a copy of the cached descriptions, from the least to the most recently used, to be saved along
+        with a model.
+        """
+
+        return CleanedDescriptions.from_cache(self._cache)
+
+
+    def load_cached_descriptions(self, cleaned_descriptions):
+        """
+        Adds previously cached descriptions (e.g the ones saved with the current model) to the cache, without
+        replacing the ones already cached.
+        """
+
+        for (key, words) in cleaned_descriptions.items():
+            if key not in self._cache:
+                self._cache_put(key, words)
+
+
+    def clean(self, description):
+        """
+        Cleans a single description into a list of significant words. Anything that's not a string is cleaned
+        into [""].
+        """
+
+        return self.clean_many([description])[0]
+
+
+    def clean_many(self, descriptions, num_processes = 1):
+        """
+        Cleans a batch of descriptions at once, only tokenizing the ones that aren't cached yet.
+
+        Input:
+        * descriptions - The list of descriptions
+        * num_processes - If more than 1, large batches (of at least MIN_PARALLEL_DESCRIPTIONS uncached descriptions)
+          are tokenized across a pool of that many processes
+
+        Output: The list of significant words of each description, in the same order
+        """
+
+        keys = [self._cache_key(description) if isinstance(description, str) else None for description in descriptions]
+
+        # Find the unique descriptions that still need to be tokenized
+        missing = {}
+        for (key, description) in zip(keys, descriptions):
+            if key is not None and key not in self._cache and key not in missing:
+                missing[key] = description
+
+        missing_keys = list(missing.keys())
+        missing_descriptions = list(missing.values())
+
+        if num_processes > 1 and len(missing_descriptions) >= MIN_PARALLEL_DESCRIPTIONS:
+            batch_size = -(-len(missing_descriptions) // num_processes)
+            batches = [
+                (missing_descriptions[start:start + batch_size], self.ignored_words)
+                for start in range(0, len(missing_descriptions), batch_size)
+            ]
+
+            with multiprocessing.Pool(num_processes) as pool:
+                missing_words = [words for batch_words in pool.map(_tokenize_batch, batches) for words in batch_words]
+        else:
+            missing_words = _tokenize_batch((missing_descriptions, self.ignored_words))
+
+        new_words = dict(zip(missing_keys, missing_words))
+
+        # The cached words are read before the new ones are cached, since caching them can evict any of them
+        cleaned_descriptions = []
+        for key in keys:
+            if key is None:
+                cleaned_descriptions += [[""]]
+            elif key in new_words:
+                cleaned_descriptions += [list(new_words[key])]
+            else:
+                self._cache.move_to_end(key)
+                cleaned_descriptions += [list(self._cache[key])]
+
+        for (key, words) in new_words.items():
+            self._cache_put(key, words)
+
+        return cleaned_descriptions
@@ -0,0 +1,67 @@
+"""
+This file is the standalone training entry point for the similar clubs recommender. It builds the model in its own
+process and publishes it to the model store (see 'model_store.py'), where the web workers pick it up without ever
+running the training themselves (see 'ClubRecommender.reload_model').
+
+It's started by the web process through 'ClubRecommender.train_in_subprocess', but it can also be run on its own
+(e.g from a cron job or a separate worker dyno) with the command 'python -m recommenders.train' from the root of
+the project. The operating mode is read from the 'MODE' environment variable, just like the app.
+
+Options:
+* --mode - Either 'full' to fully retrain the model or 'incremental' to only update the clubs that changed
+* --workers - The number of threads gensim trains the word2vec model with
+* --folder - The model store folder to publish to, which defaults to the app's folder for the current mode
+"""
+
+import os
+import argparse
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import pymongo
+
+from app_config import CurrentConfig
+from recommenders.club_recommender import ClubRecommender
+
+
+def train(mode = 'full', num_workers = 1, model_folder = None):
+    """
+    Trains (or updates) the model and publishes it as a new version.
+
+    Output: The version of the current model afterwards, or None if there's no model
+    """
+
+    if model_folder is None:
+        model_folder = f'ml-models/club-model-{CurrentConfig.MODE}'
+
+    mongo_client = pymongo.MongoClient(os.getenv('MONGO_URI'))
+
+    try:
+        club_recommender = ClubRecommender(mongo_client[CurrentConfig.DATABASE_NAME], model_folder, num_workers=num_workers)
+
+        if mode == 'full':
+            # This process starts with an empty text cleaner, so reuse the descriptions cleaned for the current model
+            club_recommender.load_cleaned_descriptions()
+            club_recommender.train_or_load_model(force_train=True)
+        else:
+            club_recommender.train_or_load_model()
+            club_recommender.update_model()
+
+        return club_recommender.model.version if club_recommender.model is not None else None
+    finally:
+        mongo_client.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the similar clubs recommender model')
+    parser.add_argument('--mode', choices=['full', 'incremental'], default='full')
+    parser.add_argument('--workers', type=int, default=CurrentConfig.RECOMMENDER_TRAINING_WORKERS)
+    parser.add_argument('--folder', default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    version = train(args.mode, args.workers, args.folder)
+
+    print(f'Published model version {version} ({args.mode}) in {time.perf_counter() - start:.1f}s')
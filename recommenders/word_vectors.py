@@ -0,0 +1,55 @@
+import numpy as np
+
+
+class WordVectors:
+    """
+    This class is a plain lookup table from each word of a trained word2vec model's vocabulary to its vector, which
+    is all that's needed to vectorize new club descriptions. Unlike the gensim model, it's saved along with the
+    recommender model (see 'club_model.py'), so that any process can update the model without retraining it.
+
+    Example:
+
+    word_vectors = WordVectors.from_word2vec(word2vec_model)
+
+    if 'robotics' in word_vectors:
+        vector = word_vectors['robotics']
+    """
+
+    def __init__(self, words, vectors):
+        """
+        Input:
+        * words - The words of the vocabulary
+        * vectors - A 2D float32 array with the vector of each word, in the same order as 'words'
+        """
+
+        self.words = list(words)
+        self.word_rows = {word: i for (i, word) in enumerate(self.words)}
+
+        self.vectors = vectors
+        self.vectors.flags.writeable = False
+
+
+    @classmethod
+    def from_word2vec(cls, model):
+        """
+        Extracts the vocabulary and word vectors of a trained gensim word2vec model.
+        """
+
+        return cls(model.wv.index2word, np.array(model.wv.vectors, dtype=np.float32))
+
+
+    @property
+    def vector_size(self):
+        return self.vectors.shape[1]
+
+
+    def __len__(self):
+        return len(self.words)
+
+
+    def __contains__(self, word):
+        return word in self.word_rows
+
+
+    def __getitem__(self, word):
+        return self.vectors[self.word_rows[word]]